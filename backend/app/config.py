@@ -34,6 +34,38 @@ class Settings(BaseSettings):
     google_docai_location: str = "us"
     google_docai_processor_id: str = ""
     google_application_credentials: str = ""
+    llm_fast_model: str = "claude-haiku-4-5-20251001"
+    llm_strong_model: str = "claude-sonnet-4-5-20250929"
+    llm_cascade_enabled: bool = True
+    llm_max_tokens: int = 16384
+    llm_max_continuations: int = 3
+    # Cascade windows: pages per text-parse request, and LLM requests in flight per document
+    llm_text_window_pages: int = 3
+    llm_max_concurrency: int = 4
+    llm_compact_output: bool = False
+    # Extract first, then categorize the batch: rules, merchant memory, n-grams and keywords
+    # resolve what they can and only the remaining merchants go to the LLM. Off, the
+    # extraction call categorizes every row, with the local resolvers as overrides afterwards.
+    llm_two_stage_categorization: bool = False
+    cascade_balance_tolerance: float = 0.02
+    cascade_max_error_ratio: float = 0.1
+    text_compaction_enabled: bool = True
+    page_classifier_enabled: bool = True
+    bill_skipped_pages: bool = True
+    local_categorizer_enabled: bool = False
+    category_keywords_file: str = ""
+    merchant_memory_enabled: bool = True
+    ngram_categorizer_enabled: bool = False
+    ngram_min_similarity: float = 0.8
+    # Keep parsed statements/transactions server-side so export and apply-rules can run by upload id
+    store_transactions_enabled: bool = True
+    # Gzip CSV exports of at least this many rows when the client accepts it (0 disables)
+    export_gzip_min_rows: int = 2000
+    # Worker processes rendering ZIP export members (0 renders in the request thread)
+    export_zip_workers: int = 2
+    # Rendered artifacts of export jobs, shared by the workers on a host (empty = system temp dir)
+    export_cache_dir: str = ""
+    export_cache_max_bytes: int = 1024 * 1024 * 1024
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
@@ -0,0 +1,37 @@
+"""add category_group_changes rule change log
+
+Revision ID: a5b6c7d8e9f0
+Revises: f4a5b6c7d8e9
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5b6c7d8e9f0'
+down_revision: Union[str, None] = 'f4a5b6c7d8e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'category_group_changes',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('group_id', sa.Uuid(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('changed_rules', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], ['category_groups.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_category_group_changes_group_version', 'category_group_changes', ['group_id', 'version'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_category_group_changes_group_version', table_name='category_group_changes')
+    op.drop_table('category_group_changes')
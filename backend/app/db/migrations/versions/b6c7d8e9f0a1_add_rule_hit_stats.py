@@ -0,0 +1,36 @@
+"""add rule hit counters and group rule evaluation timing
+
+Revision ID: b6c7d8e9f0a1
+Revises: a5b6c7d8e9f0
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6c7d8e9f0a1'
+down_revision: Union[str, None] = 'a5b6c7d8e9f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('category_rules', sa.Column('hit_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('category_rules', sa.Column('last_hit_at', sa.DateTime(), nullable=True))
+    op.add_column('category_groups', sa.Column('rule_eval_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('category_groups', sa.Column('rule_eval_transactions', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('category_groups', sa.Column('rule_eval_ms_total', sa.Float(), nullable=False, server_default='0'))
+    op.add_column('category_groups', sa.Column('rule_eval_ms_max', sa.Float(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('category_groups', 'rule_eval_ms_max')
+    op.drop_column('category_groups', 'rule_eval_ms_total')
+    op.drop_column('category_groups', 'rule_eval_transactions')
+    op.drop_column('category_groups', 'rule_eval_count')
+    op.drop_column('category_rules', 'last_hit_at')
+    op.drop_column('category_rules', 'hit_count')
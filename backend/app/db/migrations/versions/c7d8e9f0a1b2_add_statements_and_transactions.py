@@ -0,0 +1,63 @@
+"""add statements and transactions tables
+
+Revision ID: c7d8e9f0a1b2
+Revises: b6c7d8e9f0a1
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d8e9f0a1b2'
+down_revision: Union[str, None] = 'b6c7d8e9f0a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'statements',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('upload_id', sa.Uuid(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('filename', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('transaction_count', sa.Integer(), nullable=False),
+        sa.Column('total_debits', sa.Float(), nullable=False),
+        sa.Column('total_credits', sa.Float(), nullable=False),
+        sa.Column('page_count', sa.Integer(), nullable=False),
+        sa.Column('actual_pages', sa.Integer(), nullable=False),
+        sa.Column('processing_type', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['upload_id'], ['uploads.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_statements_upload_id', 'statements', ['upload_id'])
+
+    op.create_table(
+        'transactions',
+        sa.Column('upload_id', sa.Uuid(), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('statement_id', sa.Uuid(), nullable=False),
+        sa.Column('date', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('posting_date', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('description', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('type', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('balance', sa.Float(), nullable=True),
+        sa.Column('category', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('category_source', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.ForeignKeyConstraint(['upload_id'], ['uploads.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['statement_id'], ['statements.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('upload_id', 'seq'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('transactions')
+    op.drop_index('ix_statements_upload_id', table_name='statements')
+    op.drop_table('statements')
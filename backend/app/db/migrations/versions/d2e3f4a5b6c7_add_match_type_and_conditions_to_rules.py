@@ -0,0 +1,33 @@
+"""add match_type and amount/type conditions to category_rules
+
+Revision ID: d2e3f4a5b6c7
+Revises: c1d2e3f4a5b6
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2e3f4a5b6c7'
+down_revision: Union[str, None] = 'c1d2e3f4a5b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('category_rules', sa.Column('match_type', sqlmodel.sql.sqltypes.AutoString(), nullable=False, server_default='contains'))
+    op.add_column('category_rules', sa.Column('min_amount', sa.Float(), nullable=True))
+    op.add_column('category_rules', sa.Column('max_amount', sa.Float(), nullable=True))
+    op.add_column('category_rules', sa.Column('tx_type', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('category_rules', 'tx_type')
+    op.drop_column('category_rules', 'max_amount')
+    op.drop_column('category_rules', 'min_amount')
+    op.drop_column('category_rules', 'match_type')
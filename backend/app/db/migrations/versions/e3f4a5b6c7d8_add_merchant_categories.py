@@ -0,0 +1,45 @@
+"""add merchant_categories table and merchant memory counters
+
+Revision ID: e3f4a5b6c7d8
+Revises: d2e3f4a5b6c7
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3f4a5b6c7d8'
+down_revision: Union[str, None] = 'd2e3f4a5b6c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'merchant_categories',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('org_id', sa.Uuid(), nullable=False),
+        sa.Column('merchant_key', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('category', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('source', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('hits', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['org_id'], ['organizations.id']),
+        sa.PrimaryKeyConstraint('id'),
+        # Also serves as the (org_id, merchant_key) lookup index
+        sa.UniqueConstraint('org_id', 'merchant_key', name='uq_merchant_categories_org_key'),
+    )
+    op.add_column('organizations', sa.Column('merchant_memory_lookups', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('organizations', sa.Column('merchant_memory_hits', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('organizations', 'merchant_memory_hits')
+    op.drop_column('organizations', 'merchant_memory_lookups')
+    op.drop_table('merchant_categories')
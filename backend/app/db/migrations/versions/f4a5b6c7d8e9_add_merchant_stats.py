@@ -0,0 +1,41 @@
+"""add merchant_stats frequency index
+
+Revision ID: f4a5b6c7d8e9
+Revises: e3f4a5b6c7d8
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4a5b6c7d8e9'
+down_revision: Union[str, None] = 'e3f4a5b6c7d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'merchant_stats',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('org_id', sa.Uuid(), nullable=False),
+        sa.Column('merchant_key', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('display_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('tx_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_seen_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['org_id'], ['organizations.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('org_id', 'merchant_key', name='uq_merchant_stats_org_key'),
+    )
+    # Top-merchants listing
+    op.create_index('ix_merchant_stats_org_count', 'merchant_stats', ['org_id', sa.text('tx_count DESC')])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_merchant_stats_org_count', table_name='merchant_stats')
+    op.drop_table('merchant_stats')
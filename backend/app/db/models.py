@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime
 
+from sqlalchemy import JSON, Column, UniqueConstraint
 from sqlmodel import Field, SQLModel, Relationship
 
 
@@ -37,6 +38,8 @@ class Organization(SQLModel, table=True):
     total_transactions: int = Field(default=0)
     total_exports: int = Field(default=0)
     total_bytes_processed: int = Field(default=0)
+    merchant_memory_lookups: int = Field(default=0)  # transactions checked against merchant memory
+    merchant_memory_hits: int = Field(default=0)     # ...and categorized from it
 
     # Limits (None = unlimited)
     page_limit: int | None = Field(default=None)
@@ -119,6 +122,40 @@ class Upload(SQLModel, table=True):
     uploaded_by: User = Relationship(back_populates="uploads")
 
 
+# ── Statement (a parsed file of an upload) ──────────────────────────
+class Statement(SQLModel, table=True):
+    __tablename__ = "statements"
+
+    id: uuid.UUID = Field(default_factory=_uuid, primary_key=True)
+    upload_id: uuid.UUID = Field(foreign_key="uploads.id", ondelete="CASCADE", index=True)
+    position: int  # order within the upload
+    filename: str
+    transaction_count: int = Field(default=0)
+    total_debits: float = Field(default=0.0)
+    total_credits: float = Field(default=0.0)
+    page_count: int = Field(default=0)
+    actual_pages: int = Field(default=0)
+    processing_type: str = Field(default="text")
+    created_at: datetime = Field(default_factory=_now)
+
+
+# ── StoredTransaction (parsed transactions, keyed by upload + row) ───
+class StoredTransaction(SQLModel, table=True):
+    __tablename__ = "transactions"
+
+    upload_id: uuid.UUID = Field(foreign_key="uploads.id", ondelete="CASCADE", primary_key=True)
+    seq: int = Field(primary_key=True)  # row position across the upload's statements; the keyset cursor
+    statement_id: uuid.UUID = Field(foreign_key="statements.id", ondelete="CASCADE")
+    date: str
+    posting_date: str | None = None
+    description: str
+    amount: float
+    type: str  # "debit" or "credit"
+    balance: float | None = None
+    category: str = Field(default="Other")
+    category_source: str = Field(default="ai")
+
+
 # ── ExportLog ────────────────────────────────────────────────────────
 class ExportLog(SQLModel, table=True):
     __tablename__ = "export_logs"
@@ -142,6 +179,12 @@ class CategoryGroup(SQLModel, table=True):
     user_id: uuid.UUID = Field(foreign_key="users.id", index=True)
     name: str
     is_active: bool = Field(default=False)
+    version: int = Field(default=1)  # bumped on any category/rule change
+    # Rule evaluation timing, flushed in batches by rule_stats
+    rule_eval_count: int = Field(default=0)
+    rule_eval_transactions: int = Field(default=0)
+    rule_eval_ms_total: float = Field(default=0.0)
+    rule_eval_ms_max: float = Field(default=0.0)
     created_at: datetime = Field(default_factory=_now)
     updated_at: datetime = Field(default_factory=_now)
 
@@ -178,11 +221,58 @@ class CategoryRule(SQLModel, table=True):
     category_id: uuid.UUID = Field(foreign_key="categories.id", index=True)
     rule_type: str  # "include" or "exclude"
     pattern: str
+    match_type: str = Field(default="contains")  # "contains", "wildcard", "regex", or "merchant"
+    min_amount: float | None = Field(default=None)
+    max_amount: float | None = Field(default=None)
+    tx_type: str | None = Field(default=None)  # "debit", "credit", or None for both
+    # Transactions this rule decided (or, for excludes, overrode), flushed in batches by rule_stats
+    hit_count: int = Field(default=0)
+    last_hit_at: datetime | None = Field(default=None)
     created_at: datetime = Field(default_factory=_now)
 
     category: Category = Relationship(back_populates="rules")
 
 
+# ── CategoryGroupChange (per-version rule change log) ───────────────
+class CategoryGroupChange(SQLModel, table=True):
+    __tablename__ = "category_group_changes"
+
+    id: uuid.UUID = Field(default_factory=_uuid, primary_key=True)
+    group_id: uuid.UUID = Field(foreign_key="category_groups.id", ondelete="CASCADE")
+    version: int  # the group version this change produced
+    # [[match_type, pattern], ...] of rules added/edited/removed; NULL = may affect any transaction
+    changed_rules: list | None = Field(default=None, sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=_now)
+
+
+# ── MerchantCategory (per-org merchant memory) ──────────────────────
+class MerchantCategory(SQLModel, table=True):
+    __tablename__ = "merchant_categories"
+    __table_args__ = (UniqueConstraint("org_id", "merchant_key", name="uq_merchant_categories_org_key"),)
+
+    id: uuid.UUID = Field(default_factory=_uuid, primary_key=True)
+    org_id: uuid.UUID = Field(foreign_key="organizations.id")
+    merchant_key: str  # see merchant_canonicalizer.merchant_key
+    category: str
+    source: str  # "manual" or "rule" — manual entries are never overwritten by rule hits
+    hits: int = Field(default=0)
+    created_at: datetime = Field(default_factory=_now)
+    updated_at: datetime = Field(default_factory=_now)
+
+
+# ── MerchantStat (per-org canonical merchant frequency index) ────────
+class MerchantStat(SQLModel, table=True):
+    __tablename__ = "merchant_stats"
+    __table_args__ = (UniqueConstraint("org_id", "merchant_key", name="uq_merchant_stats_org_key"),)
+
+    id: uuid.UUID = Field(default_factory=_uuid, primary_key=True)
+    org_id: uuid.UUID = Field(foreign_key="organizations.id")
+    merchant_key: str  # see merchant_canonicalizer.merchant_key
+    display_name: str  # canonical merchant as last seen, e.g. "TIM HORTONS"
+    tx_count: int = Field(default=0)
+    last_seen_at: datetime = Field(default_factory=_now)
+
+
 # ── AuditLog ────────────────────────────────────────────────────────
 class AuditLog(SQLModel, table=True):
     __tablename__ = "audit_logs"
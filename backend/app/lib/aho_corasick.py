@@ -0,0 +1,108 @@
+"""Aho-Corasick multi-pattern matcher: finds every pattern occurring in a text in one pass."""
+
+from collections import deque
+
+
+class AhoCorasick:
+    """Automaton over a fixed list of patterns.
+
+    `find_all(text)` returns the indices of all patterns that occur anywhere in
+    `text` (substring semantics, same as `pattern in text`); `find_all_batch`
+    does the same for many texts in a single scan. Matching is case-sensitive —
+    lower-case both sides beforehand for case-insensitive use.
+    """
+
+    __slots__ = ("_goto", "_fail", "_out", "_always")
+
+    def __init__(self, patterns: list[str]):
+        goto: list[dict[str, int]] = [{}]
+        out: list[list[int]] = [[]]
+        always: list[int] = []
+
+        # Build the trie
+        for idx, pattern in enumerate(patterns):
+            if not pattern:
+                always.append(idx)  # "" is a substring of every text
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(idx)
+
+        # Breadth-first failure links; each state inherits its fallback's outputs
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fallback = goto[f].get(ch, 0)
+                fail[nxt] = fallback if fallback != nxt else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(o) for o in out]
+        self._always = tuple(always)
+
+    def _transition(self, state: int, ch: str) -> int:
+        """Follow failure links for (state, ch) and memoise the result as a direct edge.
+
+        The cached edge is the true automaton transition, so later scans (and
+        later failure walks passing through `state`) take it in one lookup.
+        """
+        goto, fail = self._goto, self._fail
+        s = state
+        while s and ch not in goto[s]:
+            s = fail[s]
+        nxt = goto[s].get(ch, 0)
+        goto[state][ch] = nxt
+        return nxt
+
+    def find_all(self, text: str) -> set[int]:
+        goto, out = self._goto, self._out
+        found: set[int] = set(self._always)
+        state = 0
+        for ch in text:
+            nxt = goto[state].get(ch)
+            if nxt is None:
+                nxt = self._transition(state, ch)
+            state = nxt
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def find_all_batch(self, texts: list[str], separator: str = "\x00") -> list[set[int]]:
+        """`find_all` for every text, scanning them joined by `separator` in one pass.
+
+        The separator must not occur in any pattern (it's stripped from the
+        texts), so the automaton resets on it and matches never span two texts.
+        """
+        goto, out, always = self._goto, self._out, self._always
+        results: list[set[int]] = []
+        found: set[int] = set(always)
+        state = 0
+        for ch in separator.join(t.replace(separator, " ") for t in texts):
+            if ch == separator:
+                results.append(found)
+                found = set(always)
+                state = 0
+                continue
+            nxt = goto[state].get(ch)
+            if nxt is None:
+                nxt = self._transition(state, ch)
+            state = nxt
+            if out[state]:
+                found.update(out[state])
+        if texts:
+            results.append(found)
+        return results
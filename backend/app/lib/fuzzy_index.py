@@ -0,0 +1,176 @@
+"""Indexes for near-duplicate string lookups: bounded edit distance and substring overlap."""
+
+from bisect import bisect_right
+from collections.abc import Hashable, Iterator
+from functools import lru_cache
+
+
+def within_distance(a: str, b: str, max_distance: int) -> bool:
+    """True if the Levenshtein distance between a and b is at most max_distance.
+
+    Trims the common prefix/suffix first and stops as soon as a whole DP row
+    exceeds the bound, so dissimilar strings exit after a few characters.
+    """
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+
+    n = min(len(a), len(b))
+    start = 0
+    while start < n and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < n - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start:len(a) - end]
+    b = b[start:len(b) - end]
+    if len(a) > len(b):
+        a, b = b, a
+    if not a:
+        return len(b) <= max_distance
+
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        curr = [i]
+        for j, cb in enumerate(b, 1):
+            curr.append(min(prev[j] + 1, curr[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(curr) > max_distance:
+            return False
+        prev = curr
+    return prev[-1] <= max_distance
+
+
+@lru_cache(maxsize=1024)
+def _segments(length: int, parts: int) -> tuple[tuple[int, int], ...]:
+    """Split [0, length) into `parts` near-equal (start, size) segments."""
+    base, extra = divmod(length, parts)
+    segments = []
+    start = 0
+    for j in range(parts):
+        size = base + (1 if j < extra else 0)
+        segments.append((start, size))
+        start += size
+    return tuple(segments)
+
+
+class FuzzyIndex:
+    """Strings indexed for "within edit distance k" lookups.
+
+    Pigeonhole filter: split an indexed string into k+1 segments; k edits can
+    touch at most k of them, so any string within distance k contains one
+    segment verbatim, shifted by at most k. Segments are keyed by (indexed
+    length, segment number, text), so a query only probes the 2k+1 nearby
+    lengths × (k+1) segments × (2k+1) shifts and runs the bounded distance check
+    on the few candidates that share a segment.
+    """
+
+    def __init__(self, max_distance: int = 2):
+        self._k = max_distance
+        self._texts: list[str] = []
+        self._keys: list[Hashable] = []
+        self._segments: dict[tuple[int, int, str], list[int]] = {}
+        self._short: list[int] = []  # too short to split into k+1 non-empty segments
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def add(self, text: str, key: Hashable) -> None:
+        pos = len(self._texts)
+        self._texts.append(text)
+        self._keys.append(key)
+        k = self._k
+        if len(text) <= k:
+            self._short.append(pos)
+            return
+        for j, (start, size) in enumerate(_segments(len(text), k + 1)):
+            self._segments.setdefault((len(text), j, text[start:start + size]), []).append(pos)
+
+    def similar(self, text: str) -> Iterator[Hashable]:
+        """Yield keys of indexed strings within the distance bound, in insertion order."""
+        k = self._k
+        length = len(text)
+        candidates: set[int] = set()
+        segments = self._segments
+        for m in range(max(k + 1, length - k), length + k + 1):
+            for j, (start, size) in enumerate(_segments(m, k + 1)):
+                for pos in range(max(0, start - k), min(length - size, start + k) + 1):
+                    hits = segments.get((m, j, text[pos:pos + size]))
+                    if hits:
+                        candidates.update(hits)
+        texts = self._texts
+        candidates.update(p for p in self._short if abs(len(texts[p]) - length) <= k)
+        for pos in sorted(candidates):
+            if within_distance(text, texts[pos], k):
+                yield self._keys[pos]
+
+
+class SubstringIndex:
+    """Strings indexed for "contains the query" and "contained in the query" lookups.
+
+    Containing: the indexed strings are joined into one NUL-separated corpus
+    and scanned with str.find, mapping hit offsets back through a sorted start
+    table. The corpus is joined on the first query after a batch of adds, not
+    grown per add (which would copy it every time). Contained-in: the query's
+    substrings of each indexed length are looked up in an exact-text map.
+    """
+
+    _SEPARATOR = "\x00"
+
+    def __init__(self):
+        self._texts: list[str] = []
+        self._keys: list[Hashable] = []
+        self._starts: list[int] = []
+        self._end = 0  # corpus length once every added text is joined in
+        self._corpus = ""
+        self._joined = 0  # texts already in self._corpus
+        self._by_text: dict[str, list[int]] = {}
+        self._lengths: set[int] = set()
+
+    def add(self, text: str, key: Hashable) -> None:
+        pos = len(self._texts)
+        self._texts.append(text)
+        self._keys.append(key)
+        start = self._end + 1 if pos else 0
+        self._starts.append(start)
+        self._end = start + len(text)
+        self._by_text.setdefault(text, []).append(pos)
+        self._lengths.add(len(text))
+
+    def _full_corpus(self) -> str:
+        if self._joined < len(self._texts):
+            parts = self._texts[self._joined:]
+            if self._joined:
+                parts.insert(0, self._corpus)
+            self._corpus = self._SEPARATOR.join(parts)
+            self._joined = len(self._texts)
+        return self._corpus
+
+    def containing(self, query: str) -> Iterator[Hashable]:
+        """Yield keys of indexed strings that contain `query`, in insertion order."""
+        if not query:
+            return
+        corpus, starts, texts = self._full_corpus(), self._starts, self._texts
+        hit = corpus.find(query)
+        while hit != -1:
+            pos = bisect_right(starts, hit) - 1
+            end = starts[pos] + len(texts[pos])
+            if hit + len(query) <= end:
+                yield self._keys[pos]
+                hit = corpus.find(query, end + 1)
+            else:
+                hit = corpus.find(query, hit + 1)
+
+    def contained_in(self, query: str) -> Iterator[Hashable]:
+        """Yield keys of (non-empty) indexed strings that occur in `query`, in insertion order."""
+        by_text = self._by_text
+        found: set[int] = set()
+        for size in self._lengths:
+            if not 0 < size <= len(query):
+                continue
+            for start in range(len(query) - size + 1):
+                hits = by_text.get(query[start:start + size])
+                if hits:
+                    found.update(hits)
+        for pos in sorted(found):
+            yield self._keys[pos]
@@ -1,6 +1,7 @@
+import asyncio
 import logging
 import os
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from sqlalchemy import text
 from fastapi import FastAPI, Request, Response
@@ -10,23 +11,35 @@ from fastapi.responses import JSONResponse
 
 from app.config import settings
 from app.limiter import limiter
-from app.routers import upload, export, auth, usage, audit_router, billing, contact, categories
+from app.routers import upload, export, auth, usage, audit_router, billing, contact, categories, merchants
 
 logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    tasks: list[asyncio.Task] = []
     if settings.database_url:
         from app.db.engine import engine
+        from app.services.rule_cache import listen_for_invalidations
+        from app.services.rule_stats import flush_periodically
 
         if engine is not None:
             async with engine.connect() as conn:
                 await conn.execute(text("SELECT 1"))
             logger.info("Database connection established")
+            tasks.append(asyncio.create_task(listen_for_invalidations()))
+            tasks.append(asyncio.create_task(flush_periodically()))
     else:
         logger.info("No DATABASE_URL configured — running without database")
     yield
+    from app.services import zip_export
+
+    zip_export.shutdown()
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
 
 
 app = FastAPI(title="Bank Statement Reader", version="1.0.0", lifespan=lifespan)
@@ -70,6 +83,7 @@ app.include_router(audit_router.router, prefix="/api/v1", tags=["audit"])
 app.include_router(billing.router, prefix="/api/v1", tags=["billing"])
 app.include_router(contact.router, prefix="/api/v1", tags=["contact"])
 app.include_router(categories.router, prefix="/api/v1", tags=["categories"])
+app.include_router(merchants.router, prefix="/api/v1", tags=["merchants"])
 
 os.makedirs(settings.upload_dir, exist_ok=True)
 
@@ -1,4 +1,6 @@
-from pydantic import BaseModel, field_validator
+import uuid
+
+from pydantic import BaseModel, field_validator, model_validator
 
 
 class Transaction(BaseModel):
@@ -9,7 +11,7 @@ class Transaction(BaseModel):
     type: str  # "debit" or "credit"
     balance: float | None = None
     category: str = "Other"
-    category_source: str = "ai"  # "ai", "rule", or "manual"
+    category_source: str = "ai"  # "ai", "rule", "manual", "memory", or "similar"
     source: str | None = None  # filename (set by frontend for exports)
 
     @field_validator("date", mode="before")
@@ -18,6 +20,79 @@ class Transaction(BaseModel):
         return str(v) if v is not None else ""
 
 
+class TransactionRow:
+    """A transaction decoded from a columnar payload, without per-row validation.
+
+    Same attributes as Transaction, so the rule engine, exporters and merchant
+    memory take either; the columns were validated as whole arrays instead.
+    """
+
+    __slots__ = (
+        "date", "posting_date", "description", "amount", "type", "balance",
+        "category", "category_source", "source",
+    )
+
+    def __init__(self, date, posting_date, description, amount, type, balance, category, category_source, source):
+        self.date = date
+        self.posting_date = posting_date
+        self.description = description
+        self.amount = amount
+        self.type = type
+        self.balance = balance
+        self.category = category
+        self.category_source = category_source
+        self.source = source
+
+
+class TransactionColumns(BaseModel):
+    """Transactions as parallel arrays, one per field; optional fields may be omitted."""
+
+    date: list[str]
+    posting_date: list[str | None] | None = None
+    description: list[str]
+    amount: list[float]
+    type: list[str]
+    balance: list[float | None] | None = None
+    category: list[str] | None = None
+    category_source: list[str] | None = None
+    source: list[str | None] | None = None
+
+    @model_validator(mode="after")
+    def same_length(self) -> "TransactionColumns":
+        n = len(self.date)
+        for name in TransactionRow.__slots__:
+            column = getattr(self, name)
+            if column is not None and len(column) != n:
+                raise ValueError(f"column '{name}' has {len(column)} values, expected {n}")
+        return self
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def rows(self) -> list[TransactionRow]:
+        n = len(self.date)
+        none = [None] * n
+        return list(map(
+            TransactionRow,
+            self.date,
+            self.posting_date or none,
+            self.description,
+            self.amount,
+            self.type,
+            self.balance or none,
+            self.category or ["Other"] * n,
+            self.category_source or ["ai"] * n,
+            self.source or none,
+        ))
+
+
+class CategoryColumns(BaseModel):
+    """Per-row category results for a columnar request, in request order."""
+
+    category: list[str]
+    category_source: list[str]
+
+
 class StatementResult(BaseModel):
     filename: str
     transactions: list[Transaction]
@@ -28,6 +103,8 @@ class StatementResult(BaseModel):
     actual_pages: int = 0       # real document pages
     processing_type: str = "text"
     ocr_confidence: float | None = None  # Document AI confidence (0.0–1.0)
+    prompt_tokens_saved: int | None = None  # estimated, from text compaction
+    skipped_pages: list[int] = []  # 1-based pages excluded as non-transaction content
 
 
 class UsageStats(BaseModel):
@@ -58,9 +135,54 @@ class UploadResponse(BaseModel):
     statements: list[StatementResult]
     mock_mode: bool
     usage: UsageStats | None = None
+    upload_id: uuid.UUID | None = None  # set when the transactions were stored server-side
+
+
+class StoredStatement(BaseModel):
+    id: uuid.UUID
+    filename: str
+    transaction_count: int
+    total_debits: float
+    total_credits: float
+    page_count: int
+    actual_pages: int
+    processing_type: str
+
+
+class StoredTransactionOut(Transaction):
+    seq: int  # position in the upload; pass the last one as `after` for the next page
+
+
+class TransactionPage(BaseModel):
+    transactions: list[StoredTransactionOut]
+    next_after: int | None  # None when this was the last page
+
+
+class CategoryUpdate(BaseModel):
+    seq: int
+    category: str
+
+
+class CategoryUpdateRequest(BaseModel):
+    updates: list[CategoryUpdate]
 
 
 class ExportRequest(BaseModel):
-    transactions: list[Transaction]
-    format: str = "csv"  # "csv", "xlsx", or "quickbooks"
+    transactions: list[Transaction] = []
+    columns: TransactionColumns | None = None  # columnar alternative to `transactions`
+    upload_id: uuid.UUID | None = None  # export the stored upload instead of `transactions`
+    format: str = "csv"  # "csv", "xlsx", "quickbooks", "parquet", "arrow", or "zip"
+    zip_member_format: str = "csv"  # per-statement file format inside a "zip" export: "csv" or "xlsx"
+    merchant_sheet: bool = False  # add a "By Merchant" summary sheet to an "xlsx" export
     filename: str = "transactions"
+
+
+class ExportJobOut(BaseModel):
+    job_id: str
+    status: str  # "running", "ready", or "failed"
+    format: str
+    filename: str
+    transaction_count: int
+    size: int | None = None  # artifact bytes, once ready
+    error: str | None = None
+    download_url: str
@@ -1,8 +1,14 @@
+import csv
+import io
+import logging
+import time
 import uuid
+from collections import Counter
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
 from pydantic import BaseModel
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlmodel import select
@@ -11,8 +17,14 @@ from app.auth.dependencies import CurrentUser
 from app.db.engine import get_session
 from app.db.models import CategoryGroup, Category, CategoryRule
 from app.lib.defaults import DEFAULT_CATEGORIES
-from app.models.transaction import Transaction
-from app.services.rule_engine import apply_rules
+from app.lib.request_body import body_openapi, decoded_body
+from app.models.transaction import CategoryColumns, Transaction, TransactionColumns
+from app.config import settings
+from app.services import conflict_index, merchant_memory, rule_cache, rule_stats, transaction_store
+from app.services.conflict_index import CategoryNameIndex, RuleConflictIndex, RuleRef, rule_key
+from app.services.rule_engine import RuleTrace, apply_rules, compile_patterns, validate_rule
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -41,17 +53,30 @@ class CategoryUpdate(BaseModel):
 class RuleCreate(BaseModel):
     rule_type: str  # "include" or "exclude"
     pattern: str
+    match_type: str = "contains"  # "contains", "wildcard", "regex", or "merchant"
+    min_amount: float | None = None
+    max_amount: float | None = None
+    tx_type: str | None = None  # "debit", "credit", or None for both
 
 
 class RuleUpdate(BaseModel):
     rule_type: str | None = None
     pattern: str | None = None
+    match_type: str | None = None
+    # Explicit null clears a condition; omitted leaves it unchanged
+    min_amount: float | None = None
+    max_amount: float | None = None
+    tx_type: str | None = None
 
 
 class RuleOut(BaseModel):
     id: str
     rule_type: str
     pattern: str
+    match_type: str = "contains"
+    min_amount: float | None = None
+    max_amount: float | None = None
+    tx_type: str | None = None
     created_at: datetime
 
 
@@ -67,6 +92,7 @@ class CategoryGroupOut(BaseModel):
     id: str
     name: str
     is_active: bool
+    version: int
     categories: list[CategoryOut]
     created_at: datetime
     updated_at: datetime
@@ -80,31 +106,20 @@ class SimilarityWarning(BaseModel):
 
 # ── Helpers ──────────────────────────────────────────────────────────
 
-def _levenshtein(a: str, b: str) -> int:
-    if len(a) < len(b):
-        return _levenshtein(b, a)
-    if len(b) == 0:
-        return len(a)
-    prev = list(range(len(b) + 1))
-    for i, ca in enumerate(a):
-        curr = [i + 1]
-        for j, cb in enumerate(b):
-            curr.append(min(prev[j + 1] + 1, curr[j] + 1, prev[j] + (ca != cb)))
-        prev = curr
-    return prev[-1]
-
-
-def _check_name_similarity(new_name: str, existing_names: list[str]) -> SimilarityWarning | None:
-    lower = new_name.strip().lower()
-    for name in existing_names:
-        existing_lower = name.lower()
-        if lower == existing_lower:
-            raise HTTPException(status_code=409, detail=f"Category '{name}' already exists")
-        if _levenshtein(lower, existing_lower) <= 2:
-            return SimilarityWarning(
-                message=f"Very similar to existing category '{name}'",
-                conflicting_name=name,
-            )
+def _check_name_similarity(
+    new_name: str,
+    names: CategoryNameIndex,
+    exclude_id: uuid.UUID | None = None,
+) -> SimilarityWarning | None:
+    duplicate = names.duplicate(new_name, exclude_id)
+    if duplicate is not None:
+        raise HTTPException(status_code=409, detail=f"Category '{duplicate}' already exists")
+    similar = names.similar(new_name, exclude_id)
+    if similar is not None:
+        return SimilarityWarning(
+            message=f"Very similar to existing category '{similar}'",
+            conflicting_name=similar,
+        )
     return None
 
 
@@ -112,29 +127,54 @@ def _check_rule_conflicts(
     pattern: str,
     rule_type: str,
     category_id: uuid.UUID,
-    all_categories: list[Category],
+    rules: RuleConflictIndex,
+    match_type: str = "contains",
+    exclude_rule_id: uuid.UUID | None = None,
 ) -> SimilarityWarning | None:
-    lower = pattern.strip().lower()
-    for cat in all_categories:
-        for rule in cat.rules:
-            existing_lower = rule.pattern.lower()
-            # Exact duplicate in same category
-            if rule.category_id == category_id and lower == existing_lower:
-                raise HTTPException(status_code=409, detail=f"Rule with pattern '{rule.pattern}' already exists")
-            # Substring overlap
-            if lower in existing_lower or existing_lower in lower:
-                return SimilarityWarning(
-                    message=f"Pattern overlaps with rule '{rule.pattern}' on category '{cat.name}'",
-                    conflicting_pattern=rule.pattern,
-                    conflicting_name=cat.name,
-                )
-            if _levenshtein(lower, existing_lower) <= 2:
-                return SimilarityWarning(
-                    message=f"Very similar to rule '{rule.pattern}' on category '{cat.name}'",
-                    conflicting_pattern=rule.pattern,
-                    conflicting_name=cat.name,
-                )
-    return None
+    # Exact duplicate in same category
+    duplicate = rules.duplicate(pattern, category_id, match_type, exclude_rule_id)
+    if duplicate is not None:
+        raise HTTPException(status_code=409, detail=f"Rule with pattern '{duplicate.pattern}' already exists")
+    # Substring overlap or edit distance <= 2 against any plain substring rule in the group
+    conflict = rules.conflict(pattern, match_type, exclude_rule_id)
+    if conflict is None:
+        return None
+    kind, rule = conflict
+    if kind == "overlap":
+        message = f"Pattern overlaps with rule '{rule.pattern}' on category '{rule.category_name}'"
+    else:
+        message = f"Very similar to rule '{rule.pattern}' on category '{rule.category_name}'"
+    return SimilarityWarning(
+        message=message,
+        conflicting_pattern=rule.pattern,
+        conflicting_name=rule.category_name,
+    )
+
+
+def _rule_to_out(rule: CategoryRule) -> RuleOut:
+    return RuleOut(
+        id=str(rule.id),
+        rule_type=rule.rule_type,
+        pattern=rule.pattern,
+        match_type=rule.match_type,
+        min_amount=rule.min_amount,
+        max_amount=rule.max_amount,
+        tx_type=rule.tx_type,
+        created_at=rule.created_at,
+    )
+
+
+def _validate_rule_or_400(
+    match_type: str,
+    pattern: str,
+    min_amount: float | None,
+    max_amount: float | None,
+    tx_type: str | None,
+) -> None:
+    try:
+        validate_rule(match_type, pattern, min_amount, max_amount, tx_type)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 def _group_to_out(group: CategoryGroup) -> CategoryGroupOut:
@@ -142,6 +182,7 @@ def _group_to_out(group: CategoryGroup) -> CategoryGroupOut:
         id=str(group.id),
         name=group.name,
         is_active=group.is_active,
+        version=group.version,
         created_at=group.created_at,
         updated_at=group.updated_at,
         categories=[
@@ -150,21 +191,20 @@ def _group_to_out(group: CategoryGroup) -> CategoryGroupOut:
                 name=cat.name,
                 description=cat.description,
                 sort_order=cat.sort_order,
-                rules=[
-                    RuleOut(
-                        id=str(r.id),
-                        rule_type=r.rule_type,
-                        pattern=r.pattern,
-                        created_at=r.created_at,
-                    )
-                    for r in cat.rules
-                ],
+                rules=[_rule_to_out(r) for r in cat.rules],
             )
             for cat in sorted(group.categories, key=lambda c: c.sort_order)
         ],
     )
 
 
+def _check_owner(group: CategoryGroup | None, user_id: uuid.UUID) -> CategoryGroup:
+    """Ownership check for endpoints that only need the group row, not its categories."""
+    if group is None or group.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Category group not found")
+    return group
+
+
 async def _load_group(
     group_id: uuid.UUID,
     user_id: uuid.UUID,
@@ -176,6 +216,8 @@ async def _load_group(
         .options(
             selectinload(CategoryGroup.categories).selectinload(Category.rules)
         )
+        # version is bumped with a raw UPDATE, so refresh already-loaded objects
+        .execution_options(populate_existing=True)
     )
     group = result.scalar_one_or_none()
     if not group:
@@ -216,6 +258,7 @@ async def list_groups(
                 description=cat_def.get("description"),
                 sort_order=i,
             ))
+        await rule_cache.bump_version(session, None, current_user.id)
         await session.commit()
         # Reload with relationships
         result = await session.execute(
@@ -274,6 +317,7 @@ async def create_group(
         )
         session.add(cat)
 
+    await rule_cache.bump_version(session, None, current_user.id)
     await session.commit()
 
     return _group_to_out(await _load_group(group.id, current_user.id, session))
@@ -315,6 +359,7 @@ async def update_group(
 
     group.updated_at = datetime.utcnow()
     session.add(group)
+    await rule_cache.bump_version(session, group.id, current_user.id, changed_rules=[])
     await session.commit()
 
     return _group_to_out(await _load_group(group.id, current_user.id, session))
@@ -328,6 +373,7 @@ async def delete_group(
 ):
     group = await _load_group(group_id, current_user.id, session)
     was_active = group.is_active
+    await rule_cache.bump_version(session, group.id, current_user.id)
     await session.delete(group)
     await session.commit()
 
@@ -343,6 +389,7 @@ async def delete_group(
         if first:
             first.is_active = True
             session.add(first)
+            await rule_cache.bump_version(session, first.id, current_user.id, changed_rules=[])
             await session.commit()
 
 
@@ -364,24 +411,27 @@ async def add_category(
     current_user: CurrentUser,
     session: AsyncSession = Depends(get_session),
 ):
-    group = await _load_group(group_id, current_user.id, session)
+    group = _check_owner(await session.get(CategoryGroup, group_id), current_user.id)
     name = body.name.strip()
     if not name:
         raise HTTPException(status_code=400, detail="Category name is required")
 
-    existing_names = [c.name for c in group.categories]
-    warning = _check_name_similarity(name, existing_names)
+    version = group.version
+    names = await conflict_index.name_index(session, group.id, version)
+    warning = _check_name_similarity(name, names)
 
-    max_order = max((c.sort_order for c in group.categories), default=-1)
     cat = Category(
         group_id=group.id,
         name=name,
         description=body.description,
-        sort_order=max_order + 1,
+        sort_order=names.max_sort_order + 1,
     )
     session.add(cat)
+    new_version = await rule_cache.bump_version(session, group.id, current_user.id, changed_rules=[])
     await session.commit()
     await session.refresh(cat)
+    names.add(cat.id, cat.name, cat.sort_order)
+    conflict_index.advance(group.id, version, new_version)
 
     return CategoryCreateResponse(
         category=CategoryOut(
@@ -412,25 +462,35 @@ async def update_category(
     if not cat:
         raise HTTPException(status_code=404, detail="Category not found")
 
-    group = await _load_group(cat.group_id, current_user.id, session)
+    group = _check_owner(cat.group, current_user.id)
+    version = group.version
 
     warning = None
+    renamed = False
     if body.name is not None:
         name = body.name.strip()
         if not name:
             raise HTTPException(status_code=400, detail="Category name is required")
         if name.lower() == "other" and cat.name.lower() != "other":
             raise HTTPException(status_code=400, detail="Cannot rename to 'Other' — it's reserved")
-        existing_names = [c.name for c in group.categories if c.id != category_id]
-        warning = _check_name_similarity(name, existing_names)
+        names = await conflict_index.name_index(session, group.id, version)
+        warning = _check_name_similarity(name, names, exclude_id=category_id)
+        renamed = name != cat.name
         cat.name = name
 
     if body.description is not None:
         cat.description = body.description
 
     session.add(cat)
+    # A rename changes the category every one of its rules assigns
+    new_version = await rule_cache.bump_version(
+        session, group.id, current_user.id, changed_rules=None if renamed else [],
+    )
     await session.commit()
     await session.refresh(cat)
+    # Rule warnings quote category names, so a rename invalidates both indexes
+    stale = (conflict_index.NAMES, conflict_index.RULES) if renamed else ()
+    conflict_index.advance(group.id, version, new_version, stale=stale)
 
     return CategoryCreateResponse(
         category=CategoryOut(
@@ -438,10 +498,7 @@ async def update_category(
             name=cat.name,
             description=cat.description,
             sort_order=cat.sort_order,
-            rules=[
-                RuleOut(id=str(r.id), rule_type=r.rule_type, pattern=r.pattern, created_at=r.created_at)
-                for r in cat.rules
-            ],
+            rules=[_rule_to_out(r) for r in cat.rules],
         ),
         warning=warning,
     )
@@ -453,21 +510,28 @@ async def delete_category(
     current_user: CurrentUser,
     session: AsyncSession = Depends(get_session),
 ):
+    # Rules are loaded for the delete cascade
     result = await session.execute(
-        select(Category).where(Category.id == category_id).options(selectinload(Category.group))
+        select(Category)
+        .where(Category.id == category_id)
+        .options(selectinload(Category.group), selectinload(Category.rules))
     )
     cat = result.scalar_one_or_none()
     if not cat:
         raise HTTPException(status_code=404, detail="Category not found")
 
-    # Verify ownership
-    await _load_group(cat.group_id, current_user.id, session)
+    group = _check_owner(cat.group, current_user.id)
+    version = group.version
 
     if cat.name.lower() == "other":
         raise HTTPException(status_code=400, detail="Cannot delete the 'Other' category")
 
+    new_version = await rule_cache.bump_version(
+        session, cat.group_id, current_user.id, changed_rules=[(r.match_type, r.pattern) for r in cat.rules],
+    )
     await session.delete(cat)
     await session.commit()
+    conflict_index.advance(group.id, version, new_version, stale=(conflict_index.NAMES, conflict_index.RULES))
 
 
 # ── Rules ────────────────────────────────────────────────────────────
@@ -494,6 +558,7 @@ async def add_rule(
     pattern = body.pattern.strip()
     if not pattern:
         raise HTTPException(status_code=400, detail="Pattern is required")
+    _validate_rule_or_400(body.match_type, pattern, body.min_amount, body.max_amount, body.tx_type)
 
     # Load category and verify ownership
     result = await session.execute(
@@ -503,26 +568,32 @@ async def add_rule(
     if not cat:
         raise HTTPException(status_code=404, detail="Category not found")
 
-    group = await _load_group(cat.group_id, current_user.id, session)
+    group = _check_owner(cat.group, current_user.id)
+    version = group.version
+    rules = await conflict_index.rule_index(session, group.id, version)
 
-    warning = _check_rule_conflicts(pattern, body.rule_type, category_id, group.categories)
+    warning = _check_rule_conflicts(pattern, body.rule_type, category_id, rules, body.match_type)
 
     rule = CategoryRule(
         category_id=category_id,
         rule_type=body.rule_type,
         pattern=pattern,
+        match_type=body.match_type,
+        min_amount=body.min_amount,
+        max_amount=body.max_amount,
+        tx_type=body.tx_type,
     )
     session.add(rule)
+    new_version = await rule_cache.bump_version(
+        session, group.id, current_user.id, changed_rules=[(rule.match_type, rule.pattern)],
+    )
     await session.commit()
     await session.refresh(rule)
+    rules.add(RuleRef(rule.id, rule.pattern, rule.match_type, category_id, cat.name))
+    conflict_index.advance(group.id, version, new_version)
 
     return RuleCreateResponse(
-        rule=RuleOut(
-            id=str(rule.id),
-            rule_type=rule.rule_type,
-            pattern=rule.pattern,
-            created_at=rule.created_at,
-        ),
+        rule=_rule_to_out(rule),
         warning=warning,
     )
 
@@ -543,14 +614,26 @@ async def update_rule(
     if not rule:
         raise HTTPException(status_code=404, detail="Rule not found")
 
-    group = await _load_group(rule.category.group_id, current_user.id, session)
+    group = _check_owner(rule.category.group, current_user.id)
+    version = group.version
+    before = (rule.match_type, rule.pattern)
+
+    fields = body.model_fields_set
+    match_type = body.match_type or rule.match_type
+    min_amount = body.min_amount if "min_amount" in fields else rule.min_amount
+    max_amount = body.max_amount if "max_amount" in fields else rule.max_amount
+    tx_type = body.tx_type if "tx_type" in fields else rule.tx_type
 
     warning = None
     if body.pattern is not None:
         pattern = body.pattern.strip()
         if not pattern:
             raise HTTPException(status_code=400, detail="Pattern is required")
-        warning = _check_rule_conflicts(pattern, body.rule_type or rule.rule_type, rule.category_id, group.categories)
+        rules = await conflict_index.rule_index(session, group.id, version)
+        warning = _check_rule_conflicts(
+            pattern, body.rule_type or rule.rule_type, rule.category_id, rules,
+            match_type, exclude_rule_id=rule.id,
+        )
         rule.pattern = pattern
 
     if body.rule_type is not None:
@@ -558,17 +641,22 @@ async def update_rule(
             raise HTTPException(status_code=400, detail="rule_type must be 'include' or 'exclude'")
         rule.rule_type = body.rule_type
 
+    _validate_rule_or_400(match_type, rule.pattern, min_amount, max_amount, tx_type)
+    rule.match_type = match_type
+    rule.min_amount = min_amount
+    rule.max_amount = max_amount
+    rule.tx_type = tx_type
+
     session.add(rule)
+    new_version = await rule_cache.bump_version(
+        session, group.id, current_user.id, changed_rules=[before, (rule.match_type, rule.pattern)],
+    )
     await session.commit()
     await session.refresh(rule)
+    conflict_index.advance(group.id, version, new_version, stale=(conflict_index.RULES,))
 
     return RuleCreateResponse(
-        rule=RuleOut(
-            id=str(rule.id),
-            rule_type=rule.rule_type,
-            pattern=rule.pattern,
-            created_at=rule.created_at,
-        ),
+        rule=_rule_to_out(rule),
         warning=warning,
     )
 
@@ -588,38 +676,535 @@ async def delete_rule(
     if not rule:
         raise HTTPException(status_code=404, detail="Rule not found")
 
-    # Verify ownership
-    await _load_group(rule.category.group_id, current_user.id, session)
+    group = _check_owner(rule.category.group, current_user.id)
+    version = group.version
 
+    new_version = await rule_cache.bump_version(
+        session, group.id, current_user.id, changed_rules=[(rule.match_type, rule.pattern)],
+    )
     await session.delete(rule)
     await session.commit()
+    conflict_index.advance(group.id, version, new_version, stale=(conflict_index.RULES,))
+
+
+# ── Bulk Import ─────────────────────────────────────────────────────
+
+_MAX_IMPORT_RULES = 10_000
+_MAX_IMPORT_CSV_BYTES = 2 * 1024 * 1024
+_RULE_CONDITION_FIELDS = ("rule_type", "min_amount", "max_amount", "tx_type")
+
+
+class BulkRule(BaseModel):
+    rule_type: str = "include"
+    pattern: str
+    match_type: str = "contains"
+    min_amount: float | None = None
+    max_amount: float | None = None
+    tx_type: str | None = None
+
+
+class BulkCategory(BaseModel):
+    name: str
+    description: str | None = None  # None leaves an existing description unchanged
+    rules: list[BulkRule] = []
+
+
+class BulkImportRequest(BaseModel):
+    categories: list[BulkCategory]
+
+
+class BulkImportWarning(SimilarityWarning):
+    category: str
+    pattern: str | None = None
+
+
+class BulkImportResponse(BaseModel):
+    group: CategoryGroupOut
+    categories_created: int
+    categories_updated: int
+    rules_created: int
+    rules_updated: int
+    rules_unchanged: int
+    warnings: list[BulkImportWarning]
+
+
+async def _import_categories(
+    session: AsyncSession,
+    group_id: uuid.UUID,
+    user_id: uuid.UUID,
+    categories: list[BulkCategory],
+) -> BulkImportResponse:
+    """Upsert a category tree into a group in one transaction.
+
+    Categories match existing ones by name (case-insensitive) and rules match
+    by category + match type + pattern, so re-importing the same tree is a
+    no-op. Existing rules take the imported conditions. Every row is validated
+    before anything is written; any error rejects the whole import with all
+    errors listed. Conflict warnings cover existing rules and earlier rules in
+    the same import.
+    """
+    if sum(len(c.rules) for c in categories) > _MAX_IMPORT_RULES:
+        raise HTTPException(status_code=400, detail=f"At most {_MAX_IMPORT_RULES} rules per import")
+
+    group = await _load_group(group_id, user_id, session)
+    names = CategoryNameIndex()
+    rules = RuleConflictIndex()
+    by_name: dict[str, tuple[uuid.UUID, str]] = {}
+    existing_categories: dict[uuid.UUID, Category] = {}
+    existing_rules: dict[tuple[uuid.UUID, str, str], CategoryRule | dict] = {}
+    for cat in sorted(group.categories, key=lambda c: c.sort_order):
+        names.add(cat.id, cat.name, cat.sort_order)
+        by_name[cat.name.lower()] = (cat.id, cat.name)
+        existing_categories[cat.id] = cat
+        for rule in cat.rules:
+            rules.add(RuleRef(rule.id, rule.pattern, rule.match_type, cat.id, cat.name))
+            existing_rules[rule_key(cat.id, rule.match_type, rule.pattern)] = rule
+
+    now = datetime.utcnow()
+    next_order = names.max_sort_order + 1
+    new_categories: list[dict] = []
+    new_rules: list[dict] = []
+    warnings: list[BulkImportWarning] = []
+    errors: list[str] = []
+    updated_rules: list[tuple[str, str]] = []
+    categories_updated = rules_unchanged = 0
+
+    for body in categories:
+        name = body.name.strip()
+        if not name:
+            errors.append("Category name is required")
+            continue
+        found = by_name.get(name.lower())
+        if found is None:
+            similar = names.similar(name)
+            if similar is not None:
+                warnings.append(BulkImportWarning(
+                    category=name,
+                    message=f"Very similar to existing category '{similar}'",
+                    conflicting_name=similar,
+                ))
+            category_id = uuid.uuid4()
+            new_categories.append({
+                "id": category_id, "group_id": group.id, "name": name,
+                "description": body.description, "sort_order": next_order, "created_at": now,
+            })
+            names.add(category_id, name, next_order)
+            by_name[name.lower()] = (category_id, name)
+            next_order += 1
+        else:
+            category_id, name = found
+            cat = existing_categories.get(category_id)
+            if cat is not None and body.description is not None and body.description != cat.description:
+                cat.description = body.description
+                categories_updated += 1
+
+        for item in body.rules:
+            pattern = item.pattern.strip()
+            try:
+                if item.rule_type not in ("include", "exclude"):
+                    raise ValueError("rule_type must be 'include' or 'exclude'")
+                if not pattern:
+                    raise ValueError("Pattern is required")
+                validate_rule(item.match_type, pattern, item.min_amount, item.max_amount, item.tx_type)
+            except ValueError as exc:
+                errors.append(f"{name} / '{item.pattern}': {exc}")
+                continue
+
+            conditions = {field: getattr(item, field) for field in _RULE_CONDITION_FIELDS}
+            key = rule_key(category_id, item.match_type, pattern)
+            existing = existing_rules.get(key)
+            if isinstance(existing, dict):  # repeated within this import: last one wins
+                existing.update(conditions)
+                continue
+            if existing is not None:
+                if all(getattr(existing, field) == value for field, value in conditions.items()):
+                    rules_unchanged += 1
+                else:
+                    for field, value in conditions.items():
+                        setattr(existing, field, value)
+                    updated_rules.append((existing.match_type, existing.pattern))
+                continue
+
+            conflict = rules.conflict(pattern, item.match_type)
+            if conflict is not None:
+                kind, other = conflict
+                verb = "overlaps with" if kind == "overlap" else "is very similar to"
+                warnings.append(BulkImportWarning(
+                    category=name,
+                    pattern=pattern,
+                    message=f"Pattern {verb} rule '{other.pattern}' on category '{other.category_name}'",
+                    conflicting_pattern=other.pattern,
+                    conflicting_name=other.category_name,
+                ))
+            row = {
+                "id": uuid.uuid4(), "category_id": category_id, "pattern": pattern,
+                "match_type": item.match_type, "created_at": now, **conditions,
+            }
+            new_rules.append(row)
+            existing_rules[key] = row
+            rules.add(RuleRef(row["id"], pattern, item.match_type, category_id, name))
+
+    if errors:
+        shown = "; ".join(errors[:20])
+        more = f" (and {len(errors) - 20} more)" if len(errors) > 20 else ""
+        raise HTTPException(status_code=400, detail=f"{len(errors)} invalid entries: {shown}{more}")
+
+    if new_categories or new_rules or categories_updated or updated_rules:
+        if new_categories:
+            await session.execute(insert(Category), new_categories)
+        if new_rules:
+            await session.execute(insert(CategoryRule), new_rules)
+        changed_rules = updated_rules + [(row["match_type"], row["pattern"]) for row in new_rules]
+        await rule_cache.bump_version(session, group.id, user_id, changed_rules=changed_rules)
+        await session.commit()
+        group = await _load_group(group.id, user_id, session)
+
+    return BulkImportResponse(
+        group=_group_to_out(group),
+        categories_created=len(new_categories),
+        categories_updated=categories_updated,
+        rules_created=len(new_rules),
+        rules_updated=len(updated_rules),
+        rules_unchanged=rules_unchanged,
+        warnings=warnings,
+    )
+
+
+def _parse_rules_csv(contents: bytes) -> list[BulkCategory]:
+    """Parse a rules CSV into a category tree.
+
+    Columns: category (required), pattern, rule_type, match_type, min_amount,
+    max_amount, tx_type, description. A row without a pattern only declares
+    the category (and its description).
+    """
+    try:
+        text = contents.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8 encoded")
+    reader = csv.DictReader(io.StringIO(text))
+    fields = {(f or "").strip().lower() for f in reader.fieldnames or []}
+    if "category" not in fields:
+        raise HTTPException(status_code=400, detail="CSV must have a 'category' column")
+
+    def amount(value: str, line: int) -> float | None:
+        value = value.strip().replace(",", "").replace("$", "")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Line {line}: invalid amount '{value}'")
+
+    tree: dict[str, BulkCategory] = {}
+    for line, raw in enumerate(reader, start=2):
+        row = {(k or "").strip().lower(): (v or "").strip() for k, v in raw.items() if k is not None}
+        name = row.get("category", "")
+        if not name:
+            raise HTTPException(status_code=400, detail=f"Line {line}: category is required")
+        cat = tree.get(name.lower())
+        if cat is None:
+            cat = tree[name.lower()] = BulkCategory(name=name)
+        if row.get("description"):
+            cat.description = row["description"]
+        if row.get("pattern"):
+            cat.rules.append(BulkRule(
+                rule_type=(row.get("rule_type") or "include").lower(),
+                pattern=row["pattern"],
+                match_type=(row.get("match_type") or "contains").lower(),
+                min_amount=amount(row.get("min_amount", ""), line),
+                max_amount=amount(row.get("max_amount", ""), line),
+                tx_type=(row.get("tx_type") or "").lower() or None,
+            ))
+    return list(tree.values())
+
+
+@router.post("/category-groups/{group_id}/import", response_model=BulkImportResponse)
+async def import_categories(
+    group_id: uuid.UUID,
+    body: BulkImportRequest,
+    current_user: CurrentUser,
+    session: AsyncSession = Depends(get_session),
+):
+    """Create or update many categories and rules in one request (idempotent)."""
+    return await _import_categories(session, group_id, current_user.id, body.categories)
+
+
+@router.post("/category-groups/{group_id}/import-csv", response_model=BulkImportResponse)
+async def import_categories_csv(
+    group_id: uuid.UUID,
+    current_user: CurrentUser,
+    file: UploadFile = File(...),
+    session: AsyncSession = Depends(get_session),
+):
+    """Same as /import, from a CSV with one rule per row."""
+    contents = await file.read(_MAX_IMPORT_CSV_BYTES + 1)
+    if len(contents) > _MAX_IMPORT_CSV_BYTES:
+        raise HTTPException(status_code=400, detail="CSV is too large (max 2 MB)")
+    return await _import_categories(session, group_id, current_user.id, _parse_rules_csv(contents))
 
 
 # ── Apply Rules ─────────────────────────────────────────────────────
 
 class ApplyRulesRequest(BaseModel):
-    transactions: list[Transaction]
+    transactions: list[Transaction] = []
+    # Columnar alternative to `transactions`; the response then carries `categories` instead
+    columns: TransactionColumns | None = None
+    # Apply to a stored upload instead of `transactions`; changed categories are saved back
+    upload_id: uuid.UUID | None = None
+    trace: bool = False  # return which rule decided each transaction
+
+
+class RuleTraceEntry(BaseModel):
+    index: int  # position in the request's transactions
+    category: str
+    rule_id: str | None
+    pattern: str | None
+    blocked_by: list[str]  # patterns of exclude rules that overrode higher-priority categories
+
+
+class RuleTraceOut(BaseModel):
+    elapsed_ms: float
+    entries: list[RuleTraceEntry]
 
 
 class ApplyRulesResponse(BaseModel):
     transactions: list[Transaction]
     rules_applied: int
+    version: int | None = None  # group version applied; pass as since_version to /apply-rules/patch
+    trace: RuleTraceOut | None = None
+    categories: CategoryColumns | None = None  # for a columnar request, in place of `transactions`
+
+
+class ApplyRulesPatchRequest(BaseModel):
+    transactions: list[Transaction] = []
+    columns: TransactionColumns | None = None  # columnar alternative to `transactions`
+    since_version: int  # group version the transactions' rule categories reflect
+
+
+class TransactionPatch(BaseModel):
+    index: int  # position in the request's transactions
+    category: str
+    category_source: str
+
+
+class ApplyRulesPatchResponse(BaseModel):
+    version: int
+    full: bool  # True if the change log didn't cover since_version and every row was re-evaluated
+    evaluated: int
+    changes: list[TransactionPatch]
 
 
 @router.post(
     "/category-groups/{group_id}/apply-rules",
     response_model=ApplyRulesResponse,
+    openapi_extra=body_openapi(ApplyRulesRequest),
 )
 async def reprocess_rules(
     group_id: uuid.UUID,
-    body: ApplyRulesRequest,
     current_user: CurrentUser,
+    body: ApplyRulesRequest = Depends(decoded_body(ApplyRulesRequest)),
     session: AsyncSession = Depends(get_session),
 ):
-    """Re-apply all category rules from a group to a list of transactions."""
-    group = await _load_group(group_id, current_user.id, session)
+    """Re-apply all category rules from a group to a list of transactions (JSON or MessagePack body)."""
+    group = await rule_cache.get_group(session, current_user.id, group_id)
+    if not group:
+        raise HTTPException(status_code=404, detail="Category group not found")
 
-    updated = apply_rules(body.transactions, group.categories, reprocess=True)
+    updated = body.transactions
+    if body.upload_id is not None:
+        if await transaction_store.get_upload(session, body.upload_id, current_user.org_id) is None:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        updated = await transaction_store.load(session, body.upload_id)
+    elif body.columns is not None:
+        updated = body.columns.rows()
+    before = [(tx.category, tx.category_source) for tx in updated] if body.upload_id else None
+    trace = RuleTrace() if body.trace else None
+    if group.compiled_rules:
+        updated = apply_rules(updated, group.compiled_rules, reprocess=True, trace=trace)
     rules_applied = sum(1 for tx in updated if tx.category_source == "rule")
 
-    return ApplyRulesResponse(transactions=updated, rules_applied=rules_applied)
+    if before is not None:
+        await transaction_store.update_categories(session, body.upload_id, [
+            (seq, tx.category, tx.category_source)
+            for seq, (tx, old) in enumerate(zip(updated, before))
+            if (tx.category, tx.category_source) != old
+        ])
+        await session.commit()
+
+    # The request carries the user's manual edits — remember them with the rule hits
+    if settings.merchant_memory_enabled:
+        try:
+            await merchant_memory.learn(session, current_user.org_id, updated)
+            await session.commit()
+        except Exception:
+            logger.exception("Failed to update merchant memory from apply-rules")
+            await session.rollback()
+
+    trace_out = None
+    if trace is not None:
+        patterns = group.compiled_rules.rule_patterns
+        trace_out = RuleTraceOut(
+            elapsed_ms=round(trace.elapsed_ms, 3),
+            entries=[
+                RuleTraceEntry(
+                    index=i,
+                    category=d.category,
+                    rule_id=str(d.rule_id) if d.rule_id else None,
+                    pattern=patterns.get(d.rule_id),
+                    blocked_by=[patterns.get(r, "") for r in d.blocked_by],
+                )
+                for i, d in trace.decisions
+            ],
+        )
+
+    if body.columns is not None and body.upload_id is None:
+        return ApplyRulesResponse(
+            transactions=[],
+            categories=CategoryColumns(
+                category=[tx.category for tx in updated],
+                category_source=[tx.category_source for tx in updated],
+            ),
+            rules_applied=rules_applied,
+            version=group.version,
+            trace=trace_out,
+        )
+    return ApplyRulesResponse(
+        transactions=updated, rules_applied=rules_applied, version=group.version, trace=trace_out,
+    )
+
+
+@router.post(
+    "/category-groups/{group_id}/apply-rules/patch",
+    response_model=ApplyRulesPatchResponse,
+    openapi_extra=body_openapi(ApplyRulesPatchRequest),
+)
+async def reprocess_rules_patch(
+    group_id: uuid.UUID,
+    current_user: CurrentUser,
+    body: ApplyRulesPatchRequest = Depends(decoded_body(ApplyRulesPatchRequest)),
+    session: AsyncSession = Depends(get_session),
+):
+    """Re-apply only what changed since `since_version`; returns just the rows whose category changed.
+
+    A transaction's rule result depends only on the rules whose pattern matches
+    it, so only transactions matched by an added, edited or removed rule (old
+    or new pattern) are re-evaluated against the group's current rules.
+    """
+    group = await rule_cache.get_group(session, current_user.id, group_id)
+    if not group:
+        raise HTTPException(status_code=404, detail="Category group not found")
+
+    transactions = body.columns.rows() if body.columns is not None else body.transactions
+    changed = await rule_cache.changes_since(session, group.group_id, body.since_version, group.version)
+    if changed is None:
+        candidates = range(len(transactions))
+    elif changed and group.compiled_rules:
+        trigger = compile_patterns(changed)
+        candidates = [i for i, tx in enumerate(transactions) if trigger.match(tx.description) is not None]
+    else:
+        candidates = []
+
+    changes: list[TransactionPatch] = []
+    compiled = group.compiled_rules
+    evaluated = 0
+    hits: Counter = Counter()
+    start = time.perf_counter()
+    for i in candidates:
+        tx = transactions[i]
+        if compiled is None or tx.category_source == "manual":
+            continue
+        evaluated += 1
+        decision = compiled.decide(tx.description, tx.amount, tx.type)
+        if decision is None:
+            continue
+        hits[decision.rule_id] += 1
+        hits.update(decision.blocked_by)
+        if decision.category != tx.category or tx.category_source != "rule":
+            tx.category = decision.category
+            tx.category_source = "rule"
+            changes.append(TransactionPatch(index=i, category=decision.category, category_source="rule"))
+    if evaluated:
+        rule_stats.record_hits(hits)
+        rule_stats.record_evaluation(group.group_id, evaluated, (time.perf_counter() - start) * 1000)
+
+    # Same memory learning as the full endpoint, limited to rows that can carry news
+    if settings.merchant_memory_enabled:
+        learnable = [transactions[c.index] for c in changes]
+        learnable += [tx for tx in transactions if tx.category_source == "manual"]
+        try:
+            await merchant_memory.learn(session, current_user.org_id, learnable)
+            await session.commit()
+        except Exception:
+            logger.exception("Failed to update merchant memory from apply-rules patch")
+            await session.rollback()
+
+    return ApplyRulesPatchResponse(
+        version=group.version,
+        full=changed is None,
+        evaluated=evaluated,
+        changes=changes,
+    )
+
+
+# ── Rule Stats ──────────────────────────────────────────────────────
+
+class RuleStatsOut(BaseModel):
+    id: str
+    category: str
+    rule_type: str
+    pattern: str
+    match_type: str
+    hit_count: int
+    last_hit_at: datetime | None
+    created_at: datetime
+
+
+class GroupRuleStats(BaseModel):
+    group_id: str
+    rule_count: int
+    unused_rules: int  # never decided (or, for excludes, overrode) a transaction
+    evaluations: int
+    transactions_evaluated: int
+    avg_ms_per_evaluation: float
+    max_ms: float
+    rules: list[RuleStatsOut]  # least-hit first
+
+
+@router.get("/category-groups/{group_id}/rules-stats", response_model=GroupRuleStats)
+async def get_rule_stats(
+    group_id: uuid.UUID,
+    current_user: CurrentUser,
+    session: AsyncSession = Depends(get_session),
+):
+    """Per-rule hit counts and the group's rule evaluation timing, for pruning dead rules."""
+    group = await _load_group(group_id, current_user.id, session)
+    all_rules = [(cat, rule) for cat in group.categories for rule in cat.rules]
+    # Include this worker's not-yet-flushed hits
+    pending = rule_stats.pending_hits(rule.id for _, rule in all_rules)
+
+    rules = sorted(
+        (
+            RuleStatsOut(
+                id=str(rule.id),
+                category=cat.name,
+                rule_type=rule.rule_type,
+                pattern=rule.pattern,
+                match_type=rule.match_type,
+                hit_count=rule.hit_count + pending.get(rule.id, 0),
+                last_hit_at=rule.last_hit_at,
+                created_at=rule.created_at,
+            )
+            for cat, rule in all_rules
+        ),
+        key=lambda r: (r.hit_count, r.created_at),
+    )
+    return GroupRuleStats(
+        group_id=str(group.id),
+        rule_count=len(rules),
+        unused_rules=sum(1 for r in rules if r.hit_count == 0),
+        evaluations=group.rule_eval_count,
+        transactions_evaluated=group.rule_eval_transactions,
+        avg_ms_per_evaluation=round(group.rule_eval_ms_total / group.rule_eval_count, 3) if group.rule_eval_count else 0.0,
+        max_ms=round(group.rule_eval_ms_max, 3),
+        rules=rules,
+    )
@@ -1,84 +1,200 @@
 import logging
+from urllib.parse import urlencode
+
 from fastapi import APIRouter, HTTPException, Depends, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.transaction import ExportRequest as ExportRequestSchema
-from app.services.export_service import generate_csv, generate_excel, generate_quickbooks_csv
+from app.models.transaction import ExportJobOut, ExportRequest as ExportRequestSchema
+from app.services.export_service import generate_csv, generate_excel, generate_quickbooks_csv, gzip_chunks
 from app.auth.dependencies import CurrentUser
 from app.db.engine import get_session
-from app.db.models import ExportLog, Organization
+from app.db.models import ExportLog
 from app.services.audit import log_audit
+from app.lib.request_body import body_openapi, decoded_body
+from app.services import arrow_export, export_jobs, merchant_memory, transaction_store, usage_counters, zip_export
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.post("/export")
-async def export_transactions(
-    request: Request,
-    body: ExportRequestSchema,
-    current_user: CurrentUser,
-    session: AsyncSession = Depends(get_session),
-):
-    if not body.transactions:
+def _csv_response(request: Request, chunks, row_count: int, filename: str) -> StreamingResponse:
+    """Stream CSV chunks, gzip-encoded for large exports when the client accepts it."""
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    min_rows = settings.export_gzip_min_rows
+    if min_rows and row_count >= min_rows and "gzip" in request.headers.get("accept-encoding", ""):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(chunks, media_type="text/csv; charset=utf-8", headers=headers)
+
+
+async def _resolve_transactions(body: ExportRequestSchema, current_user, session: AsyncSession) -> list:
+    """The rows to export (sent, columnar or stored), after validating the request."""
+    if body.upload_id is not None:
+        if await transaction_store.get_upload(session, body.upload_id, current_user.org_id) is None:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        transactions = await transaction_store.load(session, body.upload_id)
+    elif body.columns is not None:
+        transactions = body.columns.rows()
+    else:
+        transactions = body.transactions
+    if not transactions:
         raise HTTPException(status_code=400, detail="No transactions to export")
+    if body.format == "zip" and body.zip_member_format not in zip_export.MEMBER_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported zip member format: {body.zip_member_format}")
+    if body.format in arrow_export.FORMATS and not arrow_export.available():
+        raise HTTPException(status_code=501, detail=f"{body.format} export is not available on this server")
+    return transactions
 
-    # Record export usage in DB
+
+async def _record_export(request: Request, session: AsyncSession, current_user, fmt: str, transactions: list) -> None:
+    """Log usage and learn the user's final manual edits; failures never block the export."""
     try:
         export_log = ExportLog(
             org_id=current_user.org_id,
             user_id=current_user.id,
-            format=body.format,
-            transaction_count=len(body.transactions),
+            format=fmt,
+            transaction_count=len(transactions),
         )
         session.add(export_log)
 
-        org = await session.get(Organization, current_user.org_id)
-        if org:
-            org.total_exports += 1
-            org.month_exports += 1
-            session.add(org)
-
+        await usage_counters.record_export(session, current_user.org_id)
         await session.commit()
         await log_audit(
             session, "export", request,
             user_id=current_user.id, org_id=current_user.org_id,
-            detail=f"{body.format}, {len(body.transactions)} transactions",
+            detail=f"{fmt}, {len(transactions)} transactions",
         )
     except Exception:
         logger.exception("Failed to record export usage")
         await session.rollback()
 
+    # Exports carry the user's final manual edits
+    if settings.merchant_memory_enabled:
+        try:
+            await merchant_memory.learn(session, current_user.org_id, transactions)
+            await session.commit()
+        except Exception:
+            logger.exception("Failed to update merchant memory from export")
+            await session.rollback()
+
+
+@router.post("/export", openapi_extra=body_openapi(ExportRequestSchema))
+async def export_transactions(
+    request: Request,
+    current_user: CurrentUser,
+    body: ExportRequestSchema = Depends(decoded_body(ExportRequestSchema)),
+    session: AsyncSession = Depends(get_session),
+):
+    """Export transactions sent as objects, as `columns` or by stored `upload_id` (JSON or MessagePack body)."""
+    transactions = await _resolve_transactions(body, current_user, session)
+    await _record_export(request, session, current_user, body.format, transactions)
+
     if body.format == "csv":
-        output = generate_csv(body.transactions)
-        return StreamingResponse(
-            output,
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": f'attachment; filename="{body.filename}.csv"'
-            },
+        return _csv_response(
+            request, generate_csv(transactions), len(transactions), f"{body.filename}.csv",
         )
     elif body.format == "xlsx":
-        output = generate_excel(body.transactions)
         return StreamingResponse(
-            output,
+            generate_excel(transactions, merchant_sheet=body.merchant_sheet),
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             headers={
                 "Content-Disposition": f'attachment; filename="{body.filename}.xlsx"'
             },
         )
     elif body.format == "quickbooks":
-        output = generate_quickbooks_csv(body.transactions)
+        return _csv_response(
+            request, generate_quickbooks_csv(transactions), len(transactions),
+            f"{body.filename}_quickbooks.csv",
+        )
+    elif body.format in arrow_export.FORMATS:
+        extension, media_type = arrow_export.FORMATS[body.format]
+        generate = arrow_export.generate_parquet if body.format == "parquet" else arrow_export.generate_arrow
+        return StreamingResponse(
+            generate(transactions),
+            media_type=media_type,
+            headers={
+                "Content-Disposition": f'attachment; filename="{body.filename}.{extension}"'
+            },
+        )
+    elif body.format == "zip":
         return StreamingResponse(
-            output,
-            media_type="text/csv",
+            zip_export.generate_zip(transactions, body.zip_member_format),
+            media_type="application/zip",
             headers={
-                "Content-Disposition": f'attachment; filename="{body.filename}_quickbooks.csv"'
+                "Content-Disposition": f'attachment; filename="{body.filename}.zip"'
             },
         )
     else:
         raise HTTPException(
             status_code=400, detail=f"Unsupported format: {body.format}"
         )
+
+
+# ── Export jobs ─────────────────────────────────────────────────────
+
+def _job_out(job: export_jobs.ExportJob, filename: str) -> ExportJobOut:
+    """The job as seen by one requester: `filename` is theirs, the artifact may be shared."""
+    return ExportJobOut(
+        job_id=job.job_id,
+        status=job.status,
+        format=job.format,
+        filename=f"{filename}{job.suffix}",
+        transaction_count=job.transaction_count,
+        size=job.size,
+        error=job.error,
+        download_url=f"/api/v1/export/jobs/{job.job_id}/download?{urlencode({'filename': filename})}",
+    )
+
+
+def _get_job_or_404(job_id: str, current_user) -> export_jobs.ExportJob:
+    job = export_jobs.get(job_id)
+    if job is None or job.org_id != str(current_user.org_id):
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+@router.post(
+    "/export/jobs",
+    status_code=202,
+    response_model=ExportJobOut,
+    openapi_extra=body_openapi(ExportRequestSchema),
+)
+async def create_export_job(
+    request: Request,
+    current_user: CurrentUser,
+    body: ExportRequestSchema = Depends(decoded_body(ExportRequestSchema)),
+    session: AsyncSession = Depends(get_session),
+):
+    """Render an export in the background; poll the job, then fetch `download_url`.
+
+    An identical export (same org, format and rows) returns the cached artifact's job;
+    the download is still named after this request's `filename`.
+    """
+    if export_jobs.renderer(body.format, body.zip_member_format, body.merchant_sheet) is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {body.format}")
+    transactions = await _resolve_transactions(body, current_user, session)
+    await _record_export(request, session, current_user, body.format, transactions)
+    job = export_jobs.start(
+        current_user.org_id, body.format, body.zip_member_format, body.merchant_sheet, transactions,
+    )
+    return _job_out(job, body.filename)
+
+
+@router.get("/export/jobs/{job_id}", response_model=ExportJobOut)
+async def get_export_job(job_id: str, current_user: CurrentUser, filename: str = "transactions"):
+    return _job_out(_get_job_or_404(job_id, current_user), filename)
+
+
+@router.get("/export/jobs/{job_id}/download")
+async def download_export_job(job_id: str, current_user: CurrentUser, filename: str = "transactions"):
+    job = _get_job_or_404(job_id, current_user)
+    if job.status != export_jobs.READY:
+        raise HTTPException(status_code=409, detail=f"Export job is {job.status}")
+    export_jobs.touch(job_id)
+    return FileResponse(
+        export_jobs.artifact_path(job_id), media_type=job.media_type, filename=f"{filename}{job.suffix}",
+    )
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.dependencies import CurrentUser
+from app.db.engine import get_session
+from app.services import merchant_index
+
+router = APIRouter()
+
+
+class MerchantEntry(BaseModel):
+    merchant: str
+    merchant_key: str
+    transaction_count: int
+    last_seen_at: datetime
+    category: str | None  # remembered category from merchant memory
+
+
+@router.get("/merchants", response_model=list[MerchantEntry])
+async def list_merchants(
+    current_user: CurrentUser,
+    session: AsyncSession = Depends(get_session),
+    q: str | None = Query(None, max_length=100),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """The org's most frequent canonical merchants, optionally filtered by prefix."""
+    rows = await merchant_index.top_merchants(session, current_user.org_id, limit=limit, prefix=q)
+    return [
+        MerchantEntry(
+            merchant=stat.display_name,
+            merchant_key=stat.merchant_key,
+            transaction_count=stat.tx_count,
+            last_seen_at=stat.last_seen_at,
+            category=category,
+        )
+        for stat, category in rows
+    ]
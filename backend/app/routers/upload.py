@@ -5,32 +5,52 @@ import os
 import tempfile
 import uuid
 from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Request
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlmodel import select
 
 from app.config import settings
-from app.models.transaction import StatementResult, UploadResponse, UsageStats
-from app.services.pdf_service import extract_text_from_pdf
+from app.models.transaction import (
+    CategoryUpdateRequest,
+    StatementResult,
+    StoredStatement,
+    StoredTransactionOut,
+    Transaction,
+    TransactionPage,
+    UploadResponse,
+    UsageStats,
+)
+from app.services.pdf_service import extract_pages_from_pdf
 from app.services.llm_service import parse_transactions, parse_transactions_from_images
 from app.services.image_service import (
     SUPPORTED_IMAGE_EXTENSIONS,
+    find_blank_pdf_pages,
     is_scanned_pdf,
     pdf_page_count,
     pdf_pages_to_images,
+    pdf_subset_bytes,
     convert_heic_to_jpeg,
     optimize_image,
     validate_image,
 )
 from app.services.docai_service import extract_text_with_docai
 from app.services.categorization_service import categorize_transactions
-from app.services.rule_engine import apply_rules
+from app.services import (
+    categorization_stage,
+    merchant_index,
+    merchant_memory,
+    ngram_categorizer,
+    rule_cache,
+    transaction_store,
+    usage_counters,
+)
+from app.services.rule_engine import CompiledRules, apply_rules
 from app.services.spreadsheet_service import extract_text_from_spreadsheet
+from app.services.text_compaction import PAGE_BREAK, compact_pages
+from app.services.page_classifier import find_skippable_pages
 from app.auth.dependencies import CurrentUser
 from app.limiter import limiter
 from app.db.engine import get_session
-from app.db.models import Upload, Organization, CategoryGroup, Category
+from app.db.models import Upload, Organization
 from app.services.audit import log_audit
 
 logger = logging.getLogger(__name__)
@@ -78,10 +98,46 @@ def _validate_file(contents: bytes, filename: str) -> None:
         validate_image(contents, filename)
 
 
+def _relevant_pages(pages: list[str], page_numbers: list[int], skipped: list[int]) -> list[str]:
+    """Drop pages without transaction content, recording their original 0-based numbers in `skipped`."""
+    if not settings.page_classifier_enabled or len(pages) != len(page_numbers):
+        return pages
+    drop = set(find_skippable_pages(pages))
+    skipped.extend(page_numbers[i] for i in drop)
+    return [p for i, p in enumerate(pages) if i not in drop]
+
+
+def _billable_pages(page_count: int, skipped: list[int]) -> int:
+    if settings.bill_skipped_pages:
+        return page_count
+    return max(1, page_count - len(skipped))
+
+
+def _local_categorize(transactions: list[Transaction], custom_categories: list[dict] | None) -> list[Transaction]:
+    """Keyword pass over "Other" transactions — always in mock mode, opt-in in production.
+
+    In two-stage mode the batch categorization stage runs it once
+    per upload instead, before anything is sent to the LLM.
+    """
+    if settings.llm_two_stage_categorization:
+        return transactions
+    if settings.mock_mode or settings.local_categorizer_enabled:
+        return categorize_transactions(transactions, custom_categories)
+    return transactions
+
+
+def _compact(pages: list[str]) -> tuple[str, int | None]:
+    """Run the prompt compaction stage. Returns (text, estimated tokens saved)."""
+    if not settings.text_compaction_enabled:
+        return PAGE_BREAK.join(pages), None
+    result = compact_pages(pages)
+    return result.text, result.tokens_saved
+
+
 async def _process_single_file(
     file: UploadFile,
     custom_categories: list[dict] | None = None,
-    rule_categories: list[Category] | None = None,
+    compiled_rules: CompiledRules | None = None,
 ) -> tuple[StatementResult, int]:
     """Process a single file (PDF or image). Returns (result, bytes_processed)."""
     contents = await file.read()
@@ -100,9 +156,9 @@ async def _process_single_file(
         result = await _process_image(contents, filename, custom_categories)
 
     # Apply category rules as post-processing overrides (safety net)
-    if rule_categories:
+    if compiled_rules:
         stmt_result, bts = result
-        stmt_result.transactions = apply_rules(stmt_result.transactions, rule_categories)
+        stmt_result.transactions = apply_rules(stmt_result.transactions, compiled_rules)
         return (stmt_result, bts)
 
     return result
@@ -124,54 +180,67 @@ async def _process_pdf(
 
     temp_images: list[str] = []
     ocr_confidence = None
+    tokens_saved = None
+    skipped: list[int] = []
     try:
-        text, page_count = extract_text_from_pdf(tmp_path)
+        pages = extract_pages_from_pdf(tmp_path)
+        page_count = len(pages)
+        text = "\n\n".join(p for p in pages if p)
 
         if text.strip() and not is_scanned_pdf(tmp_path):
             # --- Text PDF path ---
+            pages = _relevant_pages(pages, list(range(page_count)), skipped)
+            text, tokens_saved = _compact(pages)
             transactions = await parse_transactions(
                 text, filename, custom_categories=custom_categories            )
-            if settings.mock_mode:
-                transactions = categorize_transactions(transactions)
+            transactions = _local_categorize(transactions, custom_categories)
 
-            effective_pages = page_count
+            effective_pages = _billable_pages(page_count, skipped)
             processing_type = "text"
         else:
             # --- Scanned PDF path ---
             logger.info(f"Scanned PDF detected: '{filename}', {page_count} pages")
             page_count = pdf_page_count(tmp_path)
 
+            # Blank pages (e.g. trailing scans) never reach OCR or Vision
+            ocr_bytes = contents
+            if settings.page_classifier_enabled:
+                skipped.extend(find_blank_pdf_pages(tmp_path))
+                if skipped:
+                    ocr_bytes = pdf_subset_bytes(contents, [i for i in range(page_count) if i not in skipped])
+            ocr_pages = [i for i in range(page_count) if i not in skipped]
+
             # Try Document AI first (cheap OCR)
-            docai_result = await extract_text_with_docai(contents, "application/pdf")
+            docai_result = await extract_text_with_docai(ocr_bytes, "application/pdf")
             if docai_result:
-                docai_text, ocr_confidence = docai_result
+                docai_pages, ocr_confidence = docai_result
                 logger.info(f"Using Document AI OCR for '{filename}' (confidence: {ocr_confidence:.2%})")
 
                 if ocr_confidence < 0.95:
                     logger.warning(f"OCR confidence {ocr_confidence:.2%} below 95% threshold for '{filename}' — rejecting")
                     transactions = []
                 else:
+                    docai_pages = _relevant_pages(docai_pages, ocr_pages, skipped)
+                    docai_text, tokens_saved = _compact(docai_pages)
                     transactions = await parse_transactions(
                         docai_text, filename, custom_categories=custom_categories
                     )
-                    if settings.mock_mode:
-                        transactions = categorize_transactions(transactions)
+                    transactions = _local_categorize(transactions, custom_categories)
 
-                effective_pages = page_count
+                effective_pages = _billable_pages(page_count, skipped)
                 processing_type = "ocr"
             else:
                 # Fall back to Vision path
                 logger.info(f"Falling back to Vision for '{filename}'")
-                temp_images = pdf_pages_to_images(tmp_path)
+                temp_images = pdf_pages_to_images(tmp_path, skip_pages=skipped)
                 for img_path in temp_images:
                     optimize_image(img_path)
 
                 transactions = await parse_transactions_from_images(
                     temp_images, filename, custom_categories=custom_categories                )
-                if settings.mock_mode:
-                    transactions = categorize_transactions(transactions)
+                transactions = _local_categorize(transactions, custom_categories)
 
-                effective_pages = page_count
+                effective_pages = _billable_pages(page_count, skipped)
                 processing_type = "image"
 
         total_debits = sum(t.amount for t in transactions if t.type == "debit")
@@ -187,6 +256,8 @@ async def _process_pdf(
             actual_pages=page_count,
             processing_type=processing_type,
             ocr_confidence=round(ocr_confidence, 4) if ocr_confidence is not None else None,
+            prompt_tokens_saved=tokens_saved,
+            skipped_pages=sorted(p + 1 for p in skipped),
         )
         return (result, bytes_processed)
     finally:
@@ -230,22 +301,23 @@ async def _process_image(
 
         # Try Document AI first
         ocr_confidence = None
+        tokens_saved = None
         with open(img_path, "rb") as f:
             img_bytes = f.read()
         docai_result = await extract_text_with_docai(img_bytes, docai_mime)
 
         if docai_result:
-            docai_text, ocr_confidence = docai_result
+            docai_pages, ocr_confidence = docai_result
             logger.info(f"Using Document AI OCR for image '{filename}' (confidence: {ocr_confidence:.2%})")
 
             if ocr_confidence < 0.95:
                 logger.warning(f"OCR confidence {ocr_confidence:.2%} below 95% threshold for '{filename}' — rejecting")
                 transactions = []
             else:
+                docai_text, tokens_saved = _compact(docai_pages)
                 transactions = await parse_transactions(
                     docai_text, filename, custom_categories=custom_categories                )
-                if settings.mock_mode:
-                    transactions = categorize_transactions(transactions)
+                transactions = _local_categorize(transactions, custom_categories)
 
             effective_pages = 1
             processing_type = "ocr"
@@ -253,8 +325,7 @@ async def _process_image(
             # Fall back to Vision path (image already optimized above)
             transactions = await parse_transactions_from_images(
                 [img_path], filename, custom_categories=custom_categories            )
-            if settings.mock_mode:
-                transactions = categorize_transactions(transactions)
+            transactions = _local_categorize(transactions, custom_categories)
 
             effective_pages = 1
             processing_type = "image"
@@ -272,6 +343,7 @@ async def _process_image(
             actual_pages=1,
             processing_type=processing_type,
             ocr_confidence=round(ocr_confidence, 4) if ocr_confidence is not None else None,
+            prompt_tokens_saved=tokens_saved,
         )
         return (result, bytes_processed)
     finally:
@@ -311,8 +383,7 @@ async def _process_spreadsheet(
         transactions = await parse_transactions(
             text, filename, custom_categories=custom_categories
         )
-        if settings.mock_mode:
-            transactions = categorize_transactions(transactions)
+        transactions = _local_categorize(transactions, custom_categories)
 
         total_debits = sum(t.amount for t in transactions if t.type == "debit")
         total_credits = sum(t.amount for t in transactions if t.type == "credit")
@@ -332,32 +403,6 @@ async def _process_spreadsheet(
         os.unlink(tmp_path)
 
 
-def _usage_from_org(org: Organization) -> UsageStats:
-    return UsageStats(
-        total_uploads=org.total_uploads,
-        total_documents=org.total_documents,
-        total_pages=org.total_pages,
-        total_actual_pages=org.total_actual_pages,
-        total_text_pages=org.total_text_pages,
-        total_image_pages=org.total_image_pages,
-        total_transactions=org.total_transactions,
-        total_exports=org.total_exports,
-        total_bytes_processed=org.total_bytes_processed,
-        month_uploads=org.month_uploads,
-        month_documents=org.month_documents,
-        month_pages=org.month_pages,
-        month_actual_pages=org.month_actual_pages,
-        month_text_pages=org.month_text_pages,
-        month_image_pages=org.month_image_pages,
-        month_transactions=org.month_transactions,
-        month_exports=org.month_exports,
-        month_bytes_processed=org.month_bytes_processed,
-        page_limit=org.page_limit,
-        bonus_pages=org.bonus_pages,
-        plan=org.plan,
-    )
-
-
 @router.post("/upload", response_model=UploadResponse)
 @limiter.limit("100/minute")
 async def upload_statements(
@@ -382,38 +427,22 @@ async def upload_statements(
             )
 
     custom_categories: list[dict] | None = None
-    rule_categories: list[Category] | None = None
+    compiled_rules: CompiledRules | None = None
 
     # Load categories from group if specified, otherwise try active group
-    group: CategoryGroup | None = None
+    # (served from the per-worker rule cache when warm — no queries)
+    gid: uuid.UUID | None = None
     if category_group_id:
         try:
             gid = uuid.UUID(category_group_id)
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid category_group_id")
-        result = await session.execute(
-            select(CategoryGroup)
-            .where(CategoryGroup.id == gid, CategoryGroup.user_id == current_user.id)
-            .options(selectinload(CategoryGroup.categories).selectinload(Category.rules))
-        )
-        group = result.scalar_one_or_none()
-    else:
-        # Try to find the user's active group
-        result = await session.execute(
-            select(CategoryGroup)
-            .where(CategoryGroup.user_id == current_user.id, CategoryGroup.is_active == True)
-            .options(selectinload(CategoryGroup.categories).selectinload(Category.rules))
-        )
-        group = result.scalar_one_or_none()
+    group = await rule_cache.get_group(session, current_user.id, gid)
 
     if group:
-        # Build custom_categories for LLM prompt from group
-        custom_categories = [
-            {"name": c.name, "description": c.description or ""}
-            for c in sorted(group.categories, key=lambda c: c.sort_order)
-        ]
-        # Categories with rules for post-processing (applied after AI)
-        rule_categories = [c for c in group.categories if c.rules]
+        # Prompt categories and compiled rules (applied after AI) come prebuilt
+        custom_categories = group.custom_categories
+        compiled_rules = group.compiled_rules
     elif categories:
         # Backward compatibility: use raw JSON categories from form
         try:
@@ -427,7 +456,7 @@ async def upload_statements(
         results.append(await _process_single_file(
             f,
             custom_categories=custom_categories,
-            rule_categories=rule_categories,
+            compiled_rules=compiled_rules,
         ))
 
     statements = [r[0] for r in results]
@@ -449,8 +478,33 @@ async def upload_statements(
     total_txns = sum(s.transaction_count for s in statements)
     doc_count = len(statements)
 
+    # Count merchants, remember rule hits, then categorize already-known merchants for the org
+    all_txs = [tx for s in statements for tx in s.transactions]
+    allowed = {c.get("name", "") for c in custom_categories} if custom_categories else None
+    if settings.merchant_memory_enabled:
+        try:
+            await merchant_index.record(session, current_user.org_id, all_txs)
+            await merchant_memory.learn(session, current_user.org_id, all_txs)
+            if not settings.llm_two_stage_categorization:
+                await merchant_memory.recall(session, current_user.org_id, all_txs, allowed)
+        except Exception:
+            logger.exception("Merchant memory lookup failed — keeping AI categories")
+            await session.rollback()
+    # Merchants similar to ones the org has categorized before take that category
+    if settings.ngram_categorizer_enabled and not settings.llm_two_stage_categorization:
+        try:
+            await ngram_categorizer.categorize(session, current_user.org_id, all_txs, allowed)
+        except Exception:
+            logger.exception("N-gram categorizer failed — keeping AI categories")
+            await session.rollback()
+
+    # Two-stage mode: extraction left categories empty; categorize the whole batch at once
+    if settings.llm_two_stage_categorization:
+        await categorization_stage.categorize_batch(session, current_user.org_id, all_txs, custom_categories)
+
     # Record usage in DB
     usage: UsageStats | None = None
+    recorded: Upload | None = None
     try:
         upload_record = Upload(
             org_id=current_user.org_id,
@@ -463,37 +517,19 @@ async def upload_statements(
         )
         session.add(upload_record)
 
-        org = await session.get(Organization, current_user.org_id)
-        if org:
-            org.total_uploads += 1
-            org.total_documents += doc_count
-            org.total_pages += total_pages
-            org.total_actual_pages += total_actual_pages
-            org.total_text_pages += total_text_pages
-            org.total_image_pages += total_image_pages
-            org.total_transactions += total_txns
-            org.total_bytes_processed += total_bytes
-            org.month_uploads += 1
-            org.month_documents += doc_count
-            org.month_pages += total_pages
-            org.month_actual_pages += total_actual_pages
-            org.month_text_pages += total_text_pages
-            org.month_image_pages += total_image_pages
-            org.month_transactions += total_txns
-            org.month_bytes_processed += total_bytes
-
-            # Deduct bonus pages if regular quota was exceeded
-            if org.page_limit is not None and org.month_pages > org.page_limit:
-                bonus_used = min(org.month_pages - org.page_limit, total_pages, org.bonus_pages)
-                org.bonus_pages -= bonus_used
-
-            session.add(org)
-
+        usage = await usage_counters.record_upload(
+            session, current_user.org_id,
+            documents=doc_count,
+            pages=total_pages,
+            actual_pages=total_actual_pages,
+            text_pages=total_text_pages,
+            image_pages=total_image_pages,
+            transactions=total_txns,
+            bytes_processed=total_bytes,
+        )
         await session.commit()
+        recorded = upload_record
 
-        if org:
-            await session.refresh(org)
-            usage = _usage_from_org(org)
         await log_audit(
             session, "upload", request,
             user_id=current_user.id, org_id=current_user.org_id,
@@ -503,8 +539,87 @@ async def upload_statements(
         logger.exception("Failed to record upload usage — user still gets results")
         await session.rollback()
 
+    # Keep a server-side copy so export and apply-rules can run by upload id
+    upload_id: uuid.UUID | None = None
+    if recorded is not None and settings.store_transactions_enabled:
+        try:
+            await transaction_store.save(session, recorded.id, statements)
+            await session.commit()
+            upload_id = recorded.id
+        except Exception:
+            logger.exception("Failed to store parsed transactions — user still gets results")
+            await session.rollback()
+
     return UploadResponse(
         statements=statements,
         mock_mode=settings.mock_mode,
         usage=usage,
+        upload_id=upload_id,
+    )
+
+
+# ── Stored uploads ──────────────────────────────────────────────────
+
+async def _get_upload_or_404(session: AsyncSession, upload_id: uuid.UUID, org_id: uuid.UUID) -> Upload:
+    upload = await transaction_store.get_upload(session, upload_id, org_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+
+@router.get("/uploads/{upload_id}/statements", response_model=list[StoredStatement])
+async def list_upload_statements(
+    upload_id: uuid.UUID,
+    current_user: CurrentUser,
+    session: AsyncSession = Depends(get_session),
+):
+    await _get_upload_or_404(session, upload_id, current_user.org_id)
+    return [
+        StoredStatement(
+            id=s.id,
+            filename=s.filename,
+            transaction_count=s.transaction_count,
+            total_debits=s.total_debits,
+            total_credits=s.total_credits,
+            page_count=s.page_count,
+            actual_pages=s.actual_pages,
+            processing_type=s.processing_type,
+        )
+        for s in await transaction_store.statements(session, upload_id)
+    ]
+
+
+@router.get("/uploads/{upload_id}/transactions", response_model=TransactionPage)
+async def list_upload_transactions(
+    upload_id: uuid.UUID,
+    current_user: CurrentUser,
+    after: int = Query(-1, ge=-1),
+    limit: int = Query(500, ge=1, le=5000),
+    statement_id: uuid.UUID | None = Query(None),
+    session: AsyncSession = Depends(get_session),
+):
+    """A page of the upload's transactions, in order; pass `next_after` back as `after`."""
+    await _get_upload_or_404(session, upload_id, current_user.org_id)
+    rows = await transaction_store.page(session, upload_id, after, limit, statement_id)
+    return TransactionPage(
+        transactions=[StoredTransactionOut(seq=seq, **tx.model_dump()) for seq, tx in rows],
+        next_after=rows[-1][0] if len(rows) == limit else None,
+    )
+
+
+@router.patch("/uploads/{upload_id}/transactions")
+async def recategorize_upload_transactions(
+    upload_id: uuid.UUID,
+    body: CategoryUpdateRequest,
+    current_user: CurrentUser,
+    session: AsyncSession = Depends(get_session),
+):
+    """Save manual category edits to stored transactions."""
+    await _get_upload_or_404(session, upload_id, current_user.org_id)
+    updated = await transaction_store.update_categories(
+        session, upload_id, [(u.seq, u.category, "manual") for u in body.updates],
     )
+    if settings.merchant_memory_enabled:
+        await merchant_memory.learn(session, current_user.org_id, updated)
+    await session.commit()
+    return {"updated": len(updated)}
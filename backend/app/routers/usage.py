@@ -1,11 +1,16 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
 
 from app.models.transaction import UsageStats
 from app.auth.dependencies import CurrentUser
 from app.db.engine import get_session
-from app.db.models import Organization
+from app.db.models import MerchantCategory, Organization
+from app.config import settings
+from app.services import metrics
 
 router = APIRouter()
 
@@ -60,3 +65,52 @@ async def get_usage(
         bonus_pages=org.bonus_pages if org else 0,
         plan=org.plan if org else "free",
     )
+
+
+class PipelineMetrics(BaseModel):
+    counters: dict[str, int]
+    escalation_rates: dict[str, float]
+    resolved_locally_rate: float
+
+
+@router.get("/usage/pipeline", response_model=PipelineMetrics)
+async def get_pipeline_metrics(current_user: CurrentUser):
+    """Per-worker processing counters (cascade escalation, etc.) for threshold tuning."""
+    if current_user.role not in ("owner", "admin"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Owner or admin role required")
+
+    return PipelineMetrics(
+        counters=metrics.snapshot(),
+        escalation_rates={
+            model: metrics.rate(f"cascade.{model}.escalated", f"cascade.{model}.calls")
+            for model in (settings.llm_fast_model, settings.llm_strong_model)
+        },
+        resolved_locally_rate=metrics.rate("categorizer.resolved_locally", "categorizer.candidates"),
+    )
+
+
+class MerchantMemoryStats(BaseModel):
+    entries: int
+    lookups: int
+    hits: int
+    hit_rate: float
+
+
+@router.get("/usage/merchant-memory", response_model=MerchantMemoryStats)
+async def get_merchant_memory_stats(
+    current_user: CurrentUser,
+    session: AsyncSession = Depends(get_session),
+):
+    """How often the org's merchant memory categorized transactions without the LLM."""
+    org = await session.get(Organization, current_user.org_id)
+    entries = (await session.execute(
+        select(func.count()).select_from(MerchantCategory).where(MerchantCategory.org_id == current_user.org_id)
+    )).scalar_one()
+    lookups = org.merchant_memory_lookups if org else 0
+    hits = org.merchant_memory_hits if org else 0
+    return MerchantMemoryStats(
+        entries=entries,
+        lookups=lookups,
+        hits=hits,
+        hit_rate=hits / lookups if lookups else 0.0,
+    )
@@ -0,0 +1,151 @@
+"""Parquet and Arrow IPC exports for analytics tools (pandas, DuckDB, Polars).
+
+Unlike the CSV/XLSX exports these keep types: dates are date32, amounts and
+balances decimal(14, 2) (signed, as in Transaction.amount), and the low-
+cardinality columns (type, category, source, file) are dictionary-encoded
+against one dictionary for the whole file. Rows are converted and written in
+record batches, so only one batch of Arrow buffers exists at a time.
+
+pyarrow is in requirements.txt but imported on first use, so the rest of the
+app still starts without it; `available()` says whether these formats can be
+served.
+"""
+
+import tempfile
+from collections.abc import Iterable, Iterator
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+
+from app.models.transaction import Transaction
+
+FORMATS = {
+    # format → (file extension, media type)
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+_BATCH_ROWS = 64 * 1024
+_CHUNK_BYTES = 64 * 1024
+_DICTIONARY_COLUMNS = ("type", "category", "category_source", "file")
+
+
+@lru_cache(maxsize=1)
+def _pyarrow():
+    import pyarrow  # type: ignore[import-not-found]
+
+    return pyarrow
+
+
+def available() -> bool:
+    try:
+        _pyarrow()
+    except ImportError:
+        return False
+    return True
+
+
+def _schema():
+    pa = _pyarrow()
+    money = pa.decimal128(14, 2)
+    labels = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("date", pa.date32()),
+        ("posting_date", pa.date32()),
+        ("description", pa.string()),
+        ("amount", money),
+        ("type", labels),
+        ("balance", money),
+        ("category", labels),
+        ("category_source", labels),
+        ("file", labels),
+    ])
+
+
+def _parse_date(value: str | None) -> date | None:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def _money(value: float | None) -> Decimal | None:
+    # Via the 2-dp string, so 12.1 is 12.10 rather than 12.0999999999999996…
+    return None if value is None else Decimal(f"{value:.2f}")
+
+
+def _labels(tx: Transaction) -> tuple[str, str, str, str]:
+    return (tx.type, tx.category, tx.category_source, tx.source or "")
+
+
+def _dictionaries(transactions: list[Transaction]) -> list[dict[str, int]]:
+    """Value → code per dictionary column, shared by every batch of the file."""
+    codes: list[dict[str, int]] = [{} for _ in _DICTIONARY_COLUMNS]
+    for tx in transactions:
+        for mapping, value in zip(codes, _labels(tx)):
+            if value not in mapping:
+                mapping[value] = len(mapping)
+    return codes
+
+
+def _batches(transactions: list[Transaction]) -> Iterator:
+    pa = _pyarrow()
+    schema = _schema()
+    codes = _dictionaries(transactions)
+    dictionaries = [pa.array(list(mapping), pa.string()) for mapping in codes]
+    for start in range(0, len(transactions), _BATCH_ROWS):
+        rows = transactions[start:start + _BATCH_ROWS]
+        label_codes = [
+            [mapping[value] for value in column]
+            for mapping, column in zip(codes, zip(*map(_labels, rows)))
+        ]
+        type_codes, category_codes, source_codes, file_codes = label_codes
+        columns = [
+            pa.array([_parse_date(tx.date) for tx in rows], pa.date32()),
+            pa.array([_parse_date(tx.posting_date) for tx in rows], pa.date32()),
+            pa.array([tx.description for tx in rows], pa.string()),
+            pa.array([_money(tx.amount) for tx in rows], schema.field("amount").type),
+            pa.DictionaryArray.from_arrays(pa.array(type_codes, pa.int32()), dictionaries[0]),
+            pa.array([_money(tx.balance) for tx in rows], schema.field("balance").type),
+            pa.DictionaryArray.from_arrays(pa.array(category_codes, pa.int32()), dictionaries[1]),
+            pa.DictionaryArray.from_arrays(pa.array(source_codes, pa.int32()), dictionaries[2]),
+            pa.DictionaryArray.from_arrays(pa.array(file_codes, pa.int32()), dictionaries[3]),
+        ]
+        yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def _spool(write) -> Iterator[bytes]:
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as output:
+        write(output)
+        output.seek(0)
+        while chunk := output.read(_CHUNK_BYTES):
+            yield chunk
+
+
+def generate_parquet(transactions: Iterable[Transaction]) -> Iterator[bytes]:
+    """Stream a Parquet file (zstd, one row group per batch)."""
+    import pyarrow.parquet as pq  # type: ignore[import-not-found]
+
+    transactions = list(transactions)
+
+    def write(output) -> None:
+        with pq.ParquetWriter(output, _schema(), compression="zstd") as writer:
+            for batch in _batches(transactions):
+                writer.write_batch(batch)
+
+    return _spool(write)
+
+
+def generate_arrow(transactions: Iterable[Transaction]) -> Iterator[bytes]:
+    """Stream an Arrow IPC file (Feather v2)."""
+    pa = _pyarrow()
+    transactions = list(transactions)
+
+    def write(output) -> None:
+        with pa.ipc.new_file(output, _schema()) as writer:
+            for batch in _batches(transactions):
+                writer.write_batch(batch)
+
+    return _spool(write)
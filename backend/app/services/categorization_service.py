@@ -1,4 +1,26 @@
+"""Local keyword categorizer.
+
+Used to fill in categories in mock/offline mode, and optionally in production
+for transactions the LLM left as "Other". All keywords of all categories are
+compiled into one Aho-Corasick automaton and a whole batch of descriptions is
+scanned in a single pass. The result matches walking CATEGORY_KEYWORDS in dict
+order: the first category with any keyword in the description wins.
+
+The built-in dictionary can be extended with a JSON file of
+{"Category": ["keyword", ...]} (settings.category_keywords_file); extra
+keywords for an existing category join it, new categories are tried last.
+"""
+
+import json
+import logging
+from functools import lru_cache
+
+from app.config import settings
+from app.lib.aho_corasick import AhoCorasick
 from app.models.transaction import Transaction
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
 
 CATEGORY_KEYWORDS: dict[str, list[str]] = {
     "Payroll & Income": [
@@ -44,18 +66,101 @@ CATEGORY_KEYWORDS: dict[str, list[str]] = {
 }
 
 
-def categorize_transactions(transactions: list[Transaction]) -> list[Transaction]:
-    for tx in transactions:
-        if tx.category != "Other":
-            continue
-        tx.category = _categorize_single(tx.description)
-    return transactions
+class KeywordCategorizer:
+    """Keyword dictionary compiled for batch matching."""
+
+    def __init__(self, keywords: dict[str, list[str]]):
+        self.category_names = list(keywords)
+        patterns: list[str] = []
+        self._ranks: list[int] = []  # pattern index → category rank
+        for rank, words in enumerate(keywords.values()):
+            for word in words:
+                if word:
+                    patterns.append(word.lower())
+                    self._ranks.append(rank)
+        self._automaton = AhoCorasick(patterns)
+
+    def categorize_many(self, descriptions: list[str]) -> list[str | None]:
+        """Return the matching category for each description (None when no keyword hits)."""
+        ranks = self._ranks
+        results: list[str | None] = []
+        for hits in self._automaton.find_all_batch([d.lower() for d in descriptions]):
+            results.append(self.category_names[min(ranks[i] for i in hits)] if hits else None)
+        return results
+
+    def categorize(self, description: str) -> str | None:
+        return self.categorize_many([description])[0]
+
+
+def merge_keywords(*dictionaries: dict[str, list[str]]) -> dict[str, list[str]]:
+    """Merge keyword dictionaries, keeping first-seen category order."""
+    merged: dict[str, list[str]] = {}
+    for dictionary in dictionaries:
+        for category, words in dictionary.items():
+            merged.setdefault(category, []).extend(words)
+    return merged
 
 
-def _categorize_single(description: str) -> str:
-    desc_lower = description.lower()
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in desc_lower:
-                return category
-    return "Other"
+def load_keyword_file(path: str) -> dict[str, list[str]]:
+    """Read a {"Category": ["keyword", ...]} JSON file, skipping malformed entries."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected an object of category → keyword list")
+    return {
+        str(category): [str(w) for w in words]
+        for category, words in data.items()
+        if isinstance(words, list)
+    }
+
+
+@lru_cache(maxsize=1)
+def _keyword_dictionary() -> dict[str, list[str]]:
+    if not settings.category_keywords_file:
+        return CATEGORY_KEYWORDS
+    try:
+        extra = load_keyword_file(settings.category_keywords_file)
+    except (OSError, ValueError) as e:
+        logger.error(f"Ignoring category keywords file {settings.category_keywords_file}: {e}")
+        return CATEGORY_KEYWORDS
+    return merge_keywords(CATEGORY_KEYWORDS, extra)
+
+
+@lru_cache(maxsize=256)
+def get_categorizer(allowed: tuple[str, ...] | None = None) -> KeywordCategorizer:
+    """Compiled categorizer, restricted to the `allowed` category names if given.
+
+    Restricting keeps local results inside a custom category group — keywords
+    for categories the group doesn't have are dropped.
+    """
+    keywords = _keyword_dictionary()
+    if allowed is not None:
+        allowed_set = set(allowed)
+        keywords = {c: w for c, w in keywords.items() if c in allowed_set}
+    return KeywordCategorizer(keywords)
+
+
+def categorize_transactions(
+    transactions: list[Transaction],
+    custom_categories: list[dict] | None = None,
+) -> list[Transaction]:
+    """Fill in "Other" categories from the keyword dictionary.
+
+    Records categorizer.candidates / categorizer.resolved_locally so the share
+    of transactions resolved without the LLM shows up in /usage/pipeline.
+    """
+    pending = [tx for tx in transactions if tx.category == "Other"]
+    if not pending:
+        return transactions
+
+    allowed = tuple(c.get("name", "") for c in custom_categories) if custom_categories else None
+    categories = get_categorizer(allowed).categorize_many([tx.description for tx in pending])
+    resolved = 0
+    for tx, category in zip(pending, categories):
+        if category is not None:
+            tx.category = category
+            resolved += 1
+
+    metrics.incr("categorizer.candidates", len(pending))
+    metrics.incr("categorizer.resolved_locally", resolved)
+    return transactions
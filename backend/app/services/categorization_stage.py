@@ -0,0 +1,120 @@
+"""Two-stage categorization: categorize a whole upload batch after extraction.
+
+With settings.llm_two_stage_categorization, the extraction
+prompts no longer ask for categories, so the local resolvers run before any
+categorization request rather than overriding one. Once every file in the
+upload is extracted (and rules have run), this stage:
+1. resolves what it can locally — merchant memory, then the n-gram
+   nearest-neighbour model and the keyword dictionary when enabled
+2. groups the remaining rows by (canonical merchant, debit/credit), so a
+   merchant seen 30 times across three statements is asked about once
+3. sends those distinct merchants to the model in one compact batched call
+   and applies each answer back to every row of its group
+"""
+
+import logging
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.transaction import Transaction
+from app.services import merchant_memory, metrics, ngram_categorizer
+from app.services.categorization_service import categorize_transactions
+from app.services.llm_service import categorize_descriptions
+from app.services.merchant_canonicalizer import canonical_merchant
+
+logger = logging.getLogger(__name__)
+
+
+def _group_key(tx: Transaction) -> tuple[str, str]:
+    return (canonical_merchant(tx.description) or " ".join(tx.description.upper().split()), tx.type)
+
+
+async def categorize_batch(
+    session: AsyncSession,
+    org_id: uuid.UUID,
+    transactions: list[Transaction],
+    custom_categories: list[dict] | None = None,
+) -> None:
+    """Categorize every AI-sourced transaction of an upload in place."""
+    pending = [tx for tx in transactions if tx.category_source == "ai"]
+    if not pending:
+        return
+
+    allowed = {c.get("name", "") for c in custom_categories} if custom_categories else None
+    recalled = merchant_memory.RecallResult()
+    if settings.merchant_memory_enabled:
+        try:
+            recalled = await merchant_memory.lookup(session, org_id, pending, allowed)
+        except Exception:
+            logger.exception("Merchant memory lookup failed — categorizing without it")
+            await session.rollback()
+    if settings.ngram_categorizer_enabled:
+        try:
+            await ngram_categorizer.categorize(session, org_id, pending, allowed)
+        except Exception:
+            logger.exception("N-gram categorizer failed — categorizing without it")
+            await session.rollback()
+    if settings.mock_mode or settings.local_categorizer_enabled:
+        categorize_transactions([tx for tx in pending if tx.category_source == "ai"], custom_categories)
+
+    groups: dict[tuple[str, str], list[Transaction]] = {}
+    for tx in pending:
+        if tx.category_source == "ai" and tx.category == "Other":
+            groups.setdefault(_group_key(tx), []).append(tx)
+
+    unresolved = sum(len(rows) for rows in groups.values())
+    metrics.incr("categorize.rows", len(pending))
+    metrics.incr("categorize.resolved_locally", len(pending) - unresolved)
+    metrics.incr("categorize.llm_descriptions", len(groups))
+    if groups:
+        await _categorize_remaining(session, groups, custom_categories)
+    await _record_recall(session, org_id, recalled)
+    if groups:
+        logger.info(
+            f"Categorized {len(pending)} transactions: {len(pending) - unresolved} locally, "
+            f"{unresolved} via {len(groups)} distinct merchants"
+        )
+
+
+async def _categorize_remaining(
+    session: AsyncSession,
+    groups: dict[tuple[str, str], list[Transaction]],
+    custom_categories: list[dict] | None,
+) -> None:
+    """Ask the model about each group once and apply the answer to all its rows.
+
+    Commits first: the upload's merchant writes (frequency index, learned
+    rules) lock rows other uploads of the org need, and must not stay locked
+    for the length of an LLM round-trip.
+    """
+    try:
+        await session.commit()
+    except Exception:
+        logger.exception("Failed to commit merchant updates before categorization")
+        await session.rollback()
+
+    descriptions = [
+        f"{merchant} (credit)" if tx_type == "credit" else merchant
+        for merchant, tx_type in groups
+    ]
+    try:
+        categories = await categorize_descriptions(descriptions, custom_categories)
+    except Exception:
+        unresolved = sum(len(rows) for rows in groups.values())
+        logger.exception(f"Categorization call failed — leaving {unresolved} transactions as Other")
+        return
+
+    for rows, category in zip(groups.values(), categories):
+        for tx in rows:
+            tx.category = category
+
+
+async def _record_recall(session: AsyncSession, org_id: uuid.UUID, recalled: merchant_memory.RecallResult) -> None:
+    """Memory hit counters, written after the LLM call so the org row isn't locked during it."""
+    try:
+        await merchant_memory.record_recall(session, org_id, recalled)
+    except Exception:
+        logger.exception("Failed to record merchant memory hits")
+        await session.rollback()
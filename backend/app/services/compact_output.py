@@ -0,0 +1,102 @@
+"""Compact tabular response contract for LLM extraction.
+
+Instead of one JSON object per transaction (which repeats every key), the model
+returns a header row followed by positional rows, with the category given as an
+index into the prompt's numbered category list:
+
+    [["date","posting_date","description","amount","type","balance","category"],
+     ["2025-01-03",null,"TIM HORTONS #8901",4.25,"d",1203.11,4],
+     ...]
+"""
+
+import json
+import re
+
+from app.models.transaction import Transaction
+
+COMPACT_COLUMNS = ["date", "posting_date", "description", "amount", "type", "balance", "category"]
+
+_COMPACT_FORMAT_TEMPLATE = """OUTPUT FORMAT (compact): Do NOT return one object per transaction. Return a single JSON array whose first element is the header row
+{header}
+and whose following elements are one array per transaction with the values in exactly that order. Use "d" for debit and "c" for credit in the type column{category_rule}.
+
+"""
+
+
+def compact_format_rules(with_category: bool = True) -> str:
+    """Format instructions for the compact contract, with or without the category column."""
+    columns = COMPACT_COLUMNS if with_category else COMPACT_COLUMNS[:-1]
+    category_rule = (
+        ", null for missing values, and for the category column use the integer number shown"
+        " before the category in the list above (not its name)"
+        if with_category else ", and null for missing values"
+    )
+    return _COMPACT_FORMAT_TEMPLATE.format(header=json.dumps(columns, separators=(",", ":")), category_rule=category_rule)
+
+
+_ENTRY_RE = re.compile(r'^-\s*"([^"]+)"')
+_TYPE_CODES = {"d": "debit", "c": "credit", "debit": "debit", "credit": "credit"}
+
+
+def _category_entries(category_block: str) -> list[tuple[str, str]]:
+    """(name, entry text) per category, in prompt order.
+
+    An entry starts at a `- "Name"` line; any other line continues the previous
+    entry (a wrapped description), so entry i is always category i whatever
+    the descriptions contain.
+    """
+    entries: list[tuple[str, str]] = []
+    for line in category_block.splitlines():
+        text = line.strip()
+        m = _ENTRY_RE.match(text)
+        if m:
+            entries.append((m.group(1), text.removeprefix("-").strip()))
+        elif text and entries:
+            name, entry = entries[-1]
+            entries[-1] = (name, f"{entry} {text}")
+    return entries
+
+
+def index_category_block(category_block: str) -> str:
+    """Number each category so the model can answer with an index (one line per category)."""
+    return "\n".join(f"  {i}. {entry}" for i, (_, entry) in enumerate(_category_entries(category_block)))
+
+
+def category_names_from_block(category_block: str) -> list[str]:
+    """Return category names in prompt order (index → name), matching index_category_block."""
+    return [name for name, _ in _category_entries(category_block)]
+
+
+def decode_compact_rows(rows: list, category_names: list[str]) -> list[Transaction]:
+    """Rebuild Transaction objects from a header row plus positional rows."""
+    if not rows:
+        return []
+
+    columns = COMPACT_COLUMNS
+    if rows and all(isinstance(c, str) for c in rows[0]) and "date" in rows[0]:
+        columns = [str(c) for c in rows[0]]
+        rows = rows[1:]
+    col = {name: i for i, name in enumerate(columns)}
+
+    def get(row: list, name: str):
+        i = col.get(name)
+        return row[i] if i is not None and i < len(row) else None
+
+    transactions: list[Transaction] = []
+    for row in rows:
+        if not isinstance(row, list):
+            continue
+        category = get(row, "category")
+        if isinstance(category, int) and not isinstance(category, bool):
+            category = category_names[category] if 0 <= category < len(category_names) else "Other"
+        tx_type = get(row, "type")
+        transactions.append(Transaction(
+            date=get(row, "date"),
+            posting_date=get(row, "posting_date"),
+            description=get(row, "description") or "",
+            amount=get(row, "amount"),
+            type=_TYPE_CODES.get(str(tx_type).lower(), str(tx_type)),
+            balance=get(row, "balance"),
+            category=category or "Other",
+        ))
+    return transactions
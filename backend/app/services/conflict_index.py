@@ -0,0 +1,210 @@
+"""Per-group indexes for category-name and rule-pattern conflict checks.
+
+Adding or editing a rule warns about near-duplicates across the whole group
+(same pattern, substring overlap, edit distance ≤ 2) and adding a category
+warns about near-identical names. Checking used to load the full group and run
+a full-matrix Levenshtein against every rule; the indexes here answer the same
+questions with a few dict probes (see app/lib/fuzzy_index.py).
+
+Indexes are cached per worker keyed by the group's version counter, which all
+category/rule CRUD bumps. A write that adds to an index it just checked
+against advances the cached entry to the new version instead of dropping it,
+so a run of rule additions never rebuilds.
+"""
+
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.db.models import Category, CategoryRule
+from app.lib.fuzzy_index import FuzzyIndex, SubstringIndex
+from app.services.merchant_canonicalizer import merchant_key
+
+MAX_DISTANCE = 2
+
+RULES = "rules"
+NAMES = "names"
+
+_MAX_ENTRIES = 1024
+
+
+def rule_key(category_id: uuid.UUID, match_type: str, pattern: str) -> tuple[uuid.UUID, str, str]:
+    """Identity of a rule for duplicate detection: merchant rules compare by canonical merchant."""
+    text = merchant_key(pattern) if match_type == "merchant" else pattern.strip().lower()
+    return (category_id, match_type, text)
+
+
+@dataclass(frozen=True)
+class RuleRef:
+    rule_id: uuid.UUID
+    pattern: str
+    match_type: str
+    category_id: uuid.UUID
+    category_name: str
+
+
+class RuleConflictIndex:
+    """A group's rules, indexed for duplicate, overlap and similarity checks.
+
+    Overlap and similarity only apply between plain "contains" rules.
+    """
+
+    def __init__(self):
+        self._rules: list[RuleRef] = []
+        self._exact: dict[tuple[uuid.UUID, str, str], list[int]] = {}
+        self._fuzzy = FuzzyIndex(MAX_DISTANCE)
+        self._substrings = SubstringIndex()
+
+    def add(self, rule: RuleRef) -> None:
+        pos = len(self._rules)
+        self._rules.append(rule)
+        self._exact.setdefault(rule_key(rule.category_id, rule.match_type, rule.pattern), []).append(pos)
+        if rule.match_type == "contains":
+            lower = rule.pattern.lower()
+            self._fuzzy.add(lower, pos)
+            self._substrings.add(lower, pos)
+
+    def duplicate(
+        self,
+        pattern: str,
+        category_id: uuid.UUID,
+        match_type: str,
+        exclude_rule_id: uuid.UUID | None = None,
+    ) -> RuleRef | None:
+        """An existing rule of the same category and match type with the same pattern."""
+        for pos in self._exact.get(rule_key(category_id, match_type, pattern), ()):
+            if self._rules[pos].rule_id != exclude_rule_id:
+                return self._rules[pos]
+        return None
+
+    def conflict(
+        self,
+        pattern: str,
+        match_type: str,
+        exclude_rule_id: uuid.UUID | None = None,
+    ) -> tuple[str, RuleRef] | None:
+        """The first rule overlapping ("overlap") or within edit distance 2 ("similar") of `pattern`."""
+        if match_type != "contains":
+            return None
+        lower = pattern.strip().lower()
+        found: list[tuple[int, int]] = []  # (position, 0 = overlap / 1 = similar)
+        for kind, matches in (
+            (0, self._substrings.containing(lower)),
+            (0, self._substrings.contained_in(lower)),
+            (1, self._fuzzy.similar(lower)),
+        ):
+            for pos in matches:
+                if self._rules[pos].rule_id != exclude_rule_id:
+                    found.append((pos, kind))
+                    break
+        if not found:
+            return None
+        pos, kind = min(found)
+        return ("overlap" if kind == 0 else "similar", self._rules[pos])
+
+
+class CategoryNameIndex:
+    """A group's category names, indexed for exact and near-identical lookups."""
+
+    def __init__(self):
+        self._ids: list[uuid.UUID] = []
+        self._names: list[str] = []
+        self._exact: dict[str, list[int]] = {}
+        self._fuzzy = FuzzyIndex(MAX_DISTANCE)
+        self.max_sort_order = -1
+
+    def add(self, category_id: uuid.UUID, name: str, sort_order: int) -> None:
+        pos = len(self._names)
+        self._ids.append(category_id)
+        self._names.append(name)
+        lower = name.lower()
+        self._exact.setdefault(lower, []).append(pos)
+        self._fuzzy.add(lower, pos)
+        self.max_sort_order = max(self.max_sort_order, sort_order)
+
+    def duplicate(self, name: str, exclude_id: uuid.UUID | None = None) -> str | None:
+        for pos in self._exact.get(name.strip().lower(), ()):
+            if self._ids[pos] != exclude_id:
+                return self._names[pos]
+        return None
+
+    def similar(self, name: str, exclude_id: uuid.UUID | None = None) -> str | None:
+        for pos in self._fuzzy.similar(name.strip().lower()):
+            if self._ids[pos] != exclude_id:
+                return self._names[pos]
+        return None
+
+
+_indexes: "OrderedDict[tuple[str, uuid.UUID], tuple[int, RuleConflictIndex | CategoryNameIndex]]" = OrderedDict()
+
+
+def _get(kind: str, group_id: uuid.UUID, version: int):
+    entry = _indexes.get((kind, group_id))
+    if entry is None or entry[0] != version:
+        return None
+    _indexes.move_to_end((kind, group_id))
+    return entry[1]
+
+
+def _put(kind: str, group_id: uuid.UUID, version: int, index) -> None:
+    _indexes[(kind, group_id)] = (version, index)
+    _indexes.move_to_end((kind, group_id))
+    while len(_indexes) > _MAX_ENTRIES:
+        _indexes.popitem(last=False)
+
+
+async def rule_index(session: AsyncSession, group_id: uuid.UUID, version: int) -> RuleConflictIndex:
+    """The group's rule index at `version`, built from a column-only query on a miss."""
+    index = _get(RULES, group_id, version)
+    if index is None:
+        result = await session.execute(
+            select(
+                CategoryRule.id, CategoryRule.pattern, CategoryRule.match_type,
+                CategoryRule.category_id, Category.name,
+            )
+            .join(Category, CategoryRule.category_id == Category.id)
+            .where(Category.group_id == group_id)
+            .order_by(Category.sort_order, CategoryRule.created_at)
+        )
+        index = RuleConflictIndex()
+        for row in result.all():
+            index.add(RuleRef(*row))
+        _put(RULES, group_id, version, index)
+    return index
+
+
+async def name_index(session: AsyncSession, group_id: uuid.UUID, version: int) -> CategoryNameIndex:
+    """The group's category-name index at `version`, built from a column-only query on a miss."""
+    index = _get(NAMES, group_id, version)
+    if index is None:
+        result = await session.execute(
+            select(Category.id, Category.name, Category.sort_order)
+            .where(Category.group_id == group_id)
+            .order_by(Category.sort_order)
+        )
+        index = CategoryNameIndex()
+        for category_id, name, sort_order in result.all():
+            index.add(category_id, name, sort_order)
+        _put(NAMES, group_id, version, index)
+    return index
+
+
+def advance(
+    group_id: uuid.UUID,
+    old_version: int,
+    new_version: int | None,
+    stale: tuple[str, ...] = (),
+) -> None:
+    """Re-key a group's indexes from `old_version` to `new_version` after a committed write.
+
+    Call after applying the write to the indexes (if it only added entries);
+    kinds in `stale` are dropped instead. An index cached at any other version
+    means a concurrent write happened in between, so it is dropped too.
+    """
+    for kind in (RULES, NAMES):
+        entry = _indexes.pop((kind, group_id), None)
+        if entry is not None and entry[0] == old_version and new_version is not None and kind not in stale:
+            _indexes[(kind, group_id)] = (new_version, entry[1])
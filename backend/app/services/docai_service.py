@@ -10,8 +10,8 @@ logger = logging.getLogger(__name__)
 _DOCAI_MAX_PAGES = 15
 
 
-async def extract_text_with_docai(file_bytes: bytes, mime_type: str) -> tuple[str, float] | None:
-    """Send file to Google Document AI for OCR. Returns (text, confidence) or None on failure."""
+async def extract_text_with_docai(file_bytes: bytes, mime_type: str) -> tuple[list[str], float] | None:
+    """Send file to Google Document AI for OCR. Returns (page_texts, confidence) or None on failure."""
     if not settings.docai_enabled:
         return None
 
@@ -57,16 +57,14 @@ async def extract_text_with_docai(file_bytes: bytes, mime_type: str) -> tuple[st
                 process_options=process_options,
             )
             result = await client.process_document(request=request)
-            part = _format_document(result.document)
-            if part:
-                all_text_parts.append(part)
+            all_text_parts.extend(_page_texts(result.document))
             # Collect per-page confidence scores
             if result.document and result.document.pages:
                 for page in result.document.pages:
                     if page.confidence is not None:
                         all_page_confidences.append(page.confidence)
 
-        if not all_text_parts:
+        if not any(all_text_parts):
             logger.warning("Document AI returned no text")
             return None
 
@@ -79,18 +77,30 @@ async def extract_text_with_docai(file_bytes: bytes, mime_type: str) -> tuple[st
 
         avg_confidence = sum(all_page_confidences) / len(all_page_confidences) if all_page_confidences else 0.0
         logger.info(f"Document AI extracted {len(combined)} chars from {len(chunks)} chunk(s), confidence: {avg_confidence:.2%}")
-        return (combined, avg_confidence)
+        return (all_text_parts, avg_confidence)
 
     except Exception:
         logger.exception("Document AI processing failed, falling back to Vision")
         return None
 
 
-def _format_document(document) -> str:
-    """Return the full OCR text from Document AI — preserves all content in reading order."""
+def _page_texts(document) -> list[str]:
+    """Split the OCR text into pages using each page's layout text anchor.
+
+    Preserves all content in reading order; falls back to the full text as one
+    page if the response has no page layout.
+    """
     if not document:
-        return ""
-    return document.text or ""
+        return []
+    text = document.text or ""
+    pages: list[str] = []
+    for page in document.pages:
+        anchor = page.layout.text_anchor if page.layout else None
+        segments = anchor.text_segments if anchor else []
+        pages.append("".join(text[int(seg.start_index or 0):int(seg.end_index)] for seg in segments))
+    if not any(pages):
+        return [text] if text else []
+    return pages
 
 
 def _split_pdf_bytes(pdf_bytes: bytes) -> list[bytes]:
@@ -0,0 +1,255 @@
+"""Background export jobs with a content-addressed artifact cache.
+
+A job is keyed by a hash of the org, the output format and the exported rows
+(every field the exporters read), so the key doubles as the cache key: an
+identical export from the same org finds the finished artifact and is
+served without rendering again. Renders run in a thread off the event loop.
+
+Job state lives on disk in settings.export_cache_dir, so any uvicorn worker
+on the host can answer for a job another one started:
+- `<key>.json`  job metadata, created exclusively by whoever starts the render
+- `<key>.bin`   the finished artifact (ready)
+- `<key>.err`   the failure message (failed)
+A job with only metadata is running, unless it's older than the render
+timeout — then its worker died and the next request for it starts over.
+Nothing requester-specific is stored: the download name is the requester's
+own filename plus the job's `suffix`.
+
+The cache is bounded by settings.export_cache_max_bytes: after each render,
+least-recently-used jobs (by mtime, refreshed on every hit) are deleted with
+all their files until the total fits, and jobs that never produced an
+artifact are cleared out once older than the render timeout.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from app.config import settings
+from app.models.transaction import Transaction, TransactionRow
+from app.services import arrow_export, zip_export
+from app.services.export_service import generate_csv, generate_excel, generate_quickbooks_csv
+
+logger = logging.getLogger(__name__)
+
+_RENDER_TIMEOUT_SECONDS = 15 * 60
+_KEY_VERSION = 2  # bump when the metadata layout changes; old files then age out
+
+READY = "ready"
+RUNNING = "running"
+FAILED = "failed"
+
+
+@dataclass
+class ExportJob:
+    job_id: str
+    org_id: str
+    format: str
+    suffix: str  # appended to the requester's filename, extension included
+    media_type: str
+    transaction_count: int
+    created_at: float
+    status: str = RUNNING
+    size: int | None = None
+    error: str | None = None
+
+
+def renderer(
+    fmt: str,
+    zip_member_format: str = "csv",
+    merchant_sheet: bool = False,
+) -> tuple[Callable[[list], Iterator[bytes]], str, str] | None:
+    """(render function, file suffix, media type) for an export format, or None if unsupported."""
+    if fmt == "csv":
+        return generate_csv, ".csv", "text/csv; charset=utf-8"
+    if fmt == "quickbooks":
+        return generate_quickbooks_csv, "_quickbooks.csv", "text/csv; charset=utf-8"
+    if fmt == "xlsx":
+        return (lambda txs: generate_excel(txs, merchant_sheet)), ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    if fmt == "zip":
+        return (lambda txs: zip_export.generate_zip(txs, zip_member_format)), ".zip", "application/zip"
+    if fmt in arrow_export.FORMATS:
+        extension, media_type = arrow_export.FORMATS[fmt]
+        generate = arrow_export.generate_parquet if fmt == "parquet" else arrow_export.generate_arrow
+        return generate, f".{extension}", media_type
+    return None
+
+
+def job_key(
+    org_id: uuid.UUID,
+    fmt: str,
+    zip_member_format: str,
+    merchant_sheet: bool,
+    transactions: list[Transaction],
+) -> str:
+    """Content hash of an export: same org, format options and rows → same key."""
+    options = f"{zip_member_format if fmt == 'zip' else ''}\x1f{merchant_sheet if fmt == 'xlsx' else ''}"
+    digest = hashlib.sha256(f"{_KEY_VERSION}\x1f{org_id}\x1f{fmt}\x1f{options}\x1e".encode())
+    for tx in transactions:
+        digest.update("\x1f".join([str(getattr(tx, name)) for name in TransactionRow.__slots__]).encode())
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+def _cache_dir() -> Path:
+    path = Path(settings.export_cache_dir or os.path.join(tempfile.gettempdir(), "export-cache"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _paths(key: str) -> tuple[Path, Path, Path]:
+    base = _cache_dir() / key
+    return base.with_suffix(".json"), base.with_suffix(".bin"), base.with_suffix(".err")
+
+
+def artifact_path(key: str) -> Path:
+    return _paths(key)[1]
+
+
+def get(key: str) -> ExportJob | None:
+    """The job's current state, or None if there's no such job (or it was evicted)."""
+    if not key.isalnum():
+        return None
+    meta_path, artifact, error_path = _paths(key)
+    try:
+        job = ExportJob(**json.loads(meta_path.read_text()))
+    except (OSError, ValueError, TypeError):
+        return None
+    if artifact.exists():
+        job.status = READY
+        job.size = artifact.stat().st_size
+    elif error_path.exists():
+        job.status = FAILED
+        job.error = error_path.read_text()
+    return job
+
+
+def touch(key: str) -> None:
+    """Mark an artifact as recently used (eviction is least-recently-used)."""
+    try:
+        os.utime(artifact_path(key))
+    except OSError:
+        pass
+
+
+def _claim(job: ExportJob) -> bool:
+    """Create the job's metadata file; False if another request already did."""
+    meta_path, artifact, error_path = _paths(job.job_id)
+    existing = get(job.job_id)
+    stale = (
+        existing is not None
+        and existing.status != READY
+        and (existing.status == FAILED or time.time() - existing.created_at > _RENDER_TIMEOUT_SECONDS)
+    )
+    if stale:
+        for path in (meta_path, error_path):
+            path.unlink(missing_ok=True)
+    try:
+        fd = os.open(meta_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        json.dump(asdict(job), f)
+    return True
+
+
+def _render(job: ExportJob, transactions: list[Transaction], render: Callable[[list], Iterator[bytes]]) -> None:
+    _, artifact, error_path = _paths(job.job_id)
+    tmp = artifact.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            for chunk in render(transactions):
+                f.write(chunk)
+        os.replace(tmp, artifact)
+    except Exception as e:
+        logger.exception(f"Export job {job.job_id} failed")
+        tmp.unlink(missing_ok=True)
+        error_path.write_text(f"{type(e).__name__}: {e}")
+        return
+    evict(keep=job.job_id)
+
+
+_tasks: set[asyncio.Task] = set()
+
+
+def start(
+    org_id: uuid.UUID,
+    fmt: str,
+    zip_member_format: str,
+    merchant_sheet: bool,
+    transactions: list[Transaction],
+) -> ExportJob:
+    """Return the finished or running job for this export, starting a render if there is none."""
+    render, suffix, media_type = renderer(fmt, zip_member_format, merchant_sheet)
+    key = job_key(org_id, fmt, zip_member_format, merchant_sheet, transactions)
+    existing = get(key)
+    if existing is not None and existing.status == READY:
+        touch(key)
+        return existing
+
+    job = ExportJob(
+        job_id=key,
+        org_id=str(org_id),
+        format=fmt,
+        suffix=suffix,
+        media_type=media_type,
+        transaction_count=len(transactions),
+        created_at=time.time(),
+    )
+    if not _claim(job):
+        return get(key) or job
+    task = asyncio.create_task(asyncio.to_thread(_render, job, transactions, render))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+
+def _delete(entries: list[os.DirEntry]) -> None:
+    for entry in entries:
+        Path(entry.path).unlink(missing_ok=True)
+
+
+def evict(keep: str | None = None) -> None:
+    """Delete least-recently-used jobs until the cache fits settings.export_cache_max_bytes.
+
+    A job's files (.json, .bin, .err, leftover .tmp) are always deleted
+    together. Jobs without an artifact older than the render timeout (failed,
+    or their worker died) are deleted regardless of size. `keep` (the job just
+    rendered) is never evicted, even if it alone is over the limit.
+    """
+    jobs: dict[str, list[os.DirEntry]] = {}
+    for entry in os.scandir(_cache_dir()):
+        jobs.setdefault(entry.name.split(".", 1)[0], []).append(entry)
+
+    now = time.time()
+    cached = []
+    total = 0
+    for key, entries in jobs.items():
+        try:
+            stats = [entry.stat() for entry in entries]
+        except FileNotFoundError:
+            continue  # another worker is already deleting it
+        size = sum(stat.st_size for stat in stats)
+        last_used = max(stat.st_mtime for stat in stats)
+        if key != keep:
+            if any(entry.name == f"{key}.bin" for entry in entries):
+                cached.append((last_used, size, entries))
+            elif now - last_used > _RENDER_TIMEOUT_SECONDS:
+                _delete(entries)
+                continue
+        total += size
+
+    cached.sort(key=lambda job: job[0])
+    for _, size, entries in cached:
+        if total <= settings.export_cache_max_bytes:
+            break
+        _delete(entries)
+        total -= size
@@ -1,111 +1,248 @@
 import csv
-import io
+import tempfile
+import zlib
+from collections.abc import Iterable, Iterator
 
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, numbers
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, NamedStyle, numbers
+from openpyxl.utils import get_column_letter
 
 from app.models.transaction import Transaction
+from app.services.merchant_canonicalizer import canonical_merchant
+
+SOURCE_LABELS = {"ai": "AI", "rule": "Rule", "manual": "Manual", "memory": "Memory", "similar": "Similar"}
 
 HEADERS = ["Date", "Posting Date", "Description", "Spent", "Received", "Balance", "Category", "Source", "File"]
 
 
-def generate_csv(transactions: list[Transaction]) -> io.StringIO:
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(HEADERS)
+# Rows formatted per yielded chunk: large enough to amortise encoding, small
+# enough that the first bytes go out immediately
+_CSV_CHUNK_ROWS = 512
+
+
+class _LineBuffer:
+    """Write target for csv.writer that hands back and clears what was written."""
+
+    def __init__(self):
+        self._parts: list[str] = []
+
+    def write(self, text: str) -> None:
+        self._parts.append(text)
+
+    def drain(self) -> bytes:
+        data = "".join(self._parts).encode("utf-8")
+        self._parts.clear()
+        return data
+
+
+def _iter_csv(header: list[str], rows: Iterable[list]) -> Iterator[bytes]:
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % _CSV_CHUNK_ROWS == 0:
+            yield buffer.drain()
+    tail = buffer.drain()
+    if tail:
+        yield tail
+
+
+def _csv_row(tx: Transaction) -> list:
+    amount = abs(tx.amount)
+    return [
+        tx.date,
+        tx.posting_date or "",
+        tx.description,
+        f"{amount:.2f}" if tx.type == "debit" else "",
+        f"{amount:.2f}" if tx.type == "credit" else "",
+        f"{tx.balance:.2f}" if tx.balance is not None else "",
+        tx.category,
+        SOURCE_LABELS.get(tx.category_source, "Manual"),
+        tx.source or "",
+    ]
+
+
+def _quickbooks_row(tx: Transaction) -> list:
+    amount = abs(tx.amount)
+    spent = f"{amount:.2f}" if tx.type == "debit" else ""
+    received = f"{amount:.2f}" if tx.type == "credit" else ""
+    return [tx.date, tx.description, spent, received]
+
+
+def generate_csv(transactions: Iterable[Transaction]) -> Iterator[bytes]:
+    """Stream the CSV export as UTF-8 chunks, formatting rows as they're sent."""
+    return _iter_csv(HEADERS, map(_csv_row, transactions))
+
+
+def generate_quickbooks_csv(transactions: Iterable[Transaction]) -> Iterator[bytes]:
+    """Stream the QuickBooks bank-import CSV as UTF-8 chunks."""
+    return _iter_csv(["Date", "Description", "Spent", "Received"], map(_quickbooks_row, transactions))
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip a chunk stream incrementally (for Content-Encoding: gzip)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+# Named styles shared by every cell that uses them, so the workbook carries a
+# handful of style records instead of one fill per cell
+_HEADER_STYLE = "Export Header"
+_ROW_STYLES = {
+    # type → (text style, amount style)
+    "debit": ("Export Debit", "Export Debit Amount"),
+    "credit": ("Export Credit", "Export Credit Amount"),
+}
+_AMOUNT_STYLE = "Export Amount"
+_AMOUNT_COLUMNS = {3, 4, 5}  # zero-based: Spent, Received, Balance
+_MAX_WIDTH = 40
+_XLSX_CHUNK_BYTES = 64 * 1024
+
+
+def _add_named_styles(wb: Workbook) -> None:
+    header = NamedStyle(name=_HEADER_STYLE)
+    header.font = Font(bold=True, color="FFFFFF")
+    header.fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
+    header.alignment = Alignment(horizontal="center")
+    wb.add_named_style(header)
+
+    for tx_type, color in (("debit", "FFF2F2"), ("credit", "F2FFF2")):
+        text_name, amount_name = _ROW_STYLES[tx_type]
+        for name, number_format in ((text_name, None), (amount_name, numbers.FORMAT_NUMBER_COMMA_SEPARATED1)):
+            style = NamedStyle(name=name)
+            style.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
+            if number_format:
+                style.number_format = number_format
+            wb.add_named_style(style)
+
+    amount = NamedStyle(name=_AMOUNT_STYLE)
+    amount.number_format = numbers.FORMAT_NUMBER_COMMA_SEPARATED1
+    wb.add_named_style(amount)
+
+
+def _excel_row(tx: Transaction) -> tuple:
+    amount = abs(tx.amount)
+    return (
+        tx.date,
+        tx.posting_date or "",
+        tx.description,
+        amount if tx.type == "debit" else None,
+        amount if tx.type == "credit" else None,
+        tx.balance if tx.balance is not None else "",
+        tx.category,
+        SOURCE_LABELS.get(tx.category_source, "Manual"),
+        tx.source or "",
+    )
+
+
+class _ColumnWidths:
+    """Running auto-fit widths: longest rendered value per column, plus padding."""
+
+    def __init__(self, columns: int):
+        self._longest = [0] * columns
+
+    def update(self, values) -> None:
+        longest = self._longest
+        for i, value in enumerate(values):
+            if value:
+                n = len(value) if isinstance(value, str) else len(str(value))
+                if n > longest[i]:
+                    longest[i] = n
+
+    def apply(self, ws) -> None:
+        for i, n in enumerate(self._longest, 1):
+            ws.column_dimensions[get_column_letter(i)].width = min(n + 3, _MAX_WIDTH)
+
+
+def _header_row(ws, headers: list[str]) -> list:
+    row = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.style = _HEADER_STYLE
+        row.append(cell)
+    return row
+
+
+def generate_excel(transactions: list[Transaction], merchant_sheet: bool = False) -> Iterator[bytes]:
+    """Stream the XLSX export: a write-only workbook, saved to a spool file and sent in chunks.
+
+    `merchant_sheet` adds a "By Merchant" summary sheet after the transactions.
+
+    Write-only sheets hold no cell objects, but they emit column widths before
+    the first row, so widths are accumulated in a first pass over the row
+    values and the styled rows are written in the second.
+    """
+    wb = Workbook(write_only=True)
+    _add_named_styles(wb)
+
+    ws = wb.create_sheet("Transactions")
+    widths = _ColumnWidths(len(HEADERS))
+    widths.update(HEADERS)
+    for tx in transactions:
+        widths.update(_excel_row(tx))
+    widths.apply(ws)
+
+    ws.append(_header_row(ws, HEADERS))
+    # (type, has balance) → styled cells for a row; a missing balance is a
+    # blank text cell rather than a formatted number
+    cells = {}
+    for tx_type, (text_style, amount_style) in _ROW_STYLES.items():
+        for has_balance in (True, False):
+            amount_columns = _AMOUNT_COLUMNS if has_balance else _AMOUNT_COLUMNS - {5}
+            row = [WriteOnlyCell(ws) for _ in HEADERS]
+            for i, cell in enumerate(row):
+                cell.style = amount_style if i in amount_columns else text_style
+            cells[(tx_type, has_balance)] = row
     for tx in transactions:
-        amount = abs(tx.amount)
-        spent = f"{amount:.2f}" if tx.type == "debit" else ""
-        received = f"{amount:.2f}" if tx.type == "credit" else ""
-        source_label = "AI" if tx.category_source == "ai" else "Rule" if tx.category_source == "rule" else "Manual"
-        writer.writerow([
-            tx.date,
-            tx.posting_date or "",
-            tx.description,
-            spent,
-            received,
-            f"{tx.balance:.2f}" if tx.balance is not None else "",
-            tx.category,
-            source_label,
-            tx.source or "",
-        ])
-    output.seek(0)
-    return output
-
-
-def generate_quickbooks_csv(transactions: list[Transaction]) -> io.StringIO:
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Date", "Description", "Spent", "Received"])
+        # Appended cells are serialised immediately, so each row reuses the
+        # styled cells of its kind and only swaps the values
+        row = cells[("credit" if tx.type == "credit" else "debit", tx.balance is not None)]
+        for cell, value in zip(row, _excel_row(tx)):
+            cell.value = value
+        ws.append(row)
+
+    if merchant_sheet:
+        _write_merchant_sheet(wb, transactions)
+    return _spool(wb)
+
+
+def _spool(wb: Workbook) -> Iterator[bytes]:
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as output:
+        wb.save(output)
+        output.seek(0)
+        while chunk := output.read(_XLSX_CHUNK_BYTES):
+            yield chunk
+
+
+def _write_merchant_sheet(wb: Workbook, transactions: list[Transaction]) -> None:
+    """Add a "By Merchant" sheet: transactions grouped by canonical merchant, most frequent first."""
+    groups: dict[str, list] = {}
     for tx in transactions:
-        amount = abs(tx.amount)
-        spent = f"{amount:.2f}" if tx.type == "debit" else ""
-        received = f"{amount:.2f}" if tx.type == "credit" else ""
-        writer.writerow([tx.date, tx.description, spent, received])
-    output.seek(0)
-    return output
-
-
-def generate_excel(transactions: list[Transaction]) -> io.BytesIO:
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Transactions"
-
-    # Header styling
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
-
-    for col_idx, header in enumerate(HEADERS, 1):
-        cell = ws.cell(row=1, column=col_idx, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal="center")
-
-    # Data rows
-    debit_fill = PatternFill(start_color="FFF2F2", end_color="FFF2F2", fill_type="solid")
-    credit_fill = PatternFill(start_color="F2FFF2", end_color="F2FFF2", fill_type="solid")
-
-    for row_idx, tx in enumerate(transactions, 2):
-        fill = credit_fill if tx.type == "credit" else debit_fill
-        amount = abs(tx.amount)
-
-        ws.cell(row=row_idx, column=1, value=tx.date).fill = fill
-        ws.cell(row=row_idx, column=2, value=tx.posting_date or "").fill = fill
-        ws.cell(row=row_idx, column=3, value=tx.description).fill = fill
-
-        # Spent column (debit)
-        spent_cell = ws.cell(row=row_idx, column=4, value=amount if tx.type == "debit" else None)
-        spent_cell.number_format = numbers.FORMAT_NUMBER_COMMA_SEPARATED1
-        spent_cell.fill = fill
-
-        # Received column (credit)
-        received_cell = ws.cell(row=row_idx, column=5, value=amount if tx.type == "credit" else None)
-        received_cell.number_format = numbers.FORMAT_NUMBER_COMMA_SEPARATED1
-        received_cell.fill = fill
-
-        if tx.balance is not None:
-            balance_cell = ws.cell(row=row_idx, column=6, value=tx.balance)
-            balance_cell.number_format = numbers.FORMAT_NUMBER_COMMA_SEPARATED1
-            balance_cell.fill = fill
+        merchant = canonical_merchant(tx.description) or tx.description
+        group = groups.setdefault(merchant, [0, 0.0, 0.0])
+        group[0] += 1
+        if tx.type == "debit":
+            group[1] += abs(tx.amount)
         else:
-            ws.cell(row=row_idx, column=6, value="").fill = fill
-
-        ws.cell(row=row_idx, column=7, value=tx.category).fill = fill
-
-        source_label = "AI" if tx.category_source == "ai" else "Rule" if tx.category_source == "rule" else "Manual"
-        ws.cell(row=row_idx, column=8, value=source_label).fill = fill
-        ws.cell(row=row_idx, column=9, value=tx.source or "").fill = fill
-
-    # Auto-fit column widths
-    for col in ws.columns:
-        max_length = 0
-        col_letter = col[0].column_letter
-        for cell in col:
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
-        ws.column_dimensions[col_letter].width = min(max_length + 3, 40)
-
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+            group[2] += abs(tx.amount)
+
+    ws = wb.create_sheet("By Merchant")
+    widest = max((len(m) for m in groups), default=0)
+    ws.column_dimensions["A"].width = min(max(widest, len("Merchant")) + 3, _MAX_WIDTH)
+    for letter in ("B", "C", "D"):
+        ws.column_dimensions[letter].width = 14
+
+    ws.append(_header_row(ws, ["Merchant", "Transactions", "Spent", "Received"]))
+    spent_cell, received_cell = WriteOnlyCell(ws), WriteOnlyCell(ws)
+    spent_cell.style = received_cell.style = _AMOUNT_STYLE
+    ordered = sorted(groups.items(), key=lambda item: (-item[1][0], item[0]))
+    for merchant, (count, spent, received) in ordered:
+        spent_cell.value = round(spent, 2) if spent else None
+        received_cell.value = round(received, 2) if received else None
+        ws.append([merchant, count, spent_cell, received_cell])
@@ -52,13 +52,50 @@ def pdf_page_count(path: str) -> int:
     return count
 
 
-def pdf_pages_to_images(path: str) -> list[str]:
+# A rendered page with less than this fraction of dark pixels is blank
+_BLANK_INK_RATIO = 0.0002
+
+
+def find_blank_pdf_pages(path: str) -> list[int]:
+    """Return 0-based indices of visually blank pages, from a cheap low-res render.
+
+    Returns [] when every page is blank so callers never drop the whole document.
+    """
+    doc = fitz.open(path)
+    blank = []
+    for i, page in enumerate(doc):
+        pix = page.get_pixmap(matrix=fitz.Matrix(0.5, 0.5), colorspace=fitz.csGRAY)
+        img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+        dark = sum(img.histogram()[:128])
+        if dark < pix.width * pix.height * _BLANK_INK_RATIO:
+            blank.append(i)
+    total = len(doc)
+    doc.close()
+    return [] if len(blank) == total else blank
+
+
+def pdf_subset_bytes(pdf_bytes: bytes, keep_pages: list[int]) -> bytes:
+    """Return a new PDF containing only the given 0-based pages."""
+    import io
+
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    doc.select(keep_pages)
+    buf = io.BytesIO()
+    doc.save(buf)
+    doc.close()
+    return buf.getvalue()
+
+
+def pdf_pages_to_images(path: str, skip_pages: list[int] | None = None) -> list[str]:
     """Convert each page of a PDF to a PNG image. Returns list of temp file paths."""
     import tempfile
 
+    skip = set(skip_pages or [])
     doc = fitz.open(path)
     image_paths = []
     for i, page in enumerate(doc):
+        if i in skip:
+            continue
         # Render at 2x for better OCR quality
         mat = fitz.Matrix(2.0, 2.0)
         pix = page.get_pixmap(matrix=mat)
@@ -1,12 +1,54 @@
 import asyncio
 import json
 import logging
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from pydantic import ValidationError
+
 from app.config import settings
 from app.models.transaction import Transaction
+from app.services import metrics
+from app.services.compact_output import (
+    category_names_from_block,
+    compact_format_rules,
+    decode_compact_rows,
+    index_category_block,
+)
 from app.services.mock_service import generate_mock_transactions
+from app.services.validation_service import AMOUNT_RE, DATE_RE, validate_transactions
 
 logger = logging.getLogger(__name__)
 
+# Distinct descriptions per categorization request
+_CATEGORIZE_BATCH_SIZE = 500
+
+# Statement header lines (up to the first transaction row) repeated ahead of each later window
+_WINDOW_CONTEXT_MAX_LINES = 20
+
+T = TypeVar("T")
+
+CATEGORIZATION_GUIDANCE = """CATEGORIZATION: For each transaction, first identify what the merchant or business actually is (e.g. a restaurant, grocery store, gas station, subscription service, online retailer, etc.) using your world knowledge. Many merchant names on bank statements are abbreviated or cryptic — think about what real-world business the name refers to before choosing a category. For example, "MADEMOISELLE TORONTO" is a restaurant, "MUJI" is a retail store, "AMZN" is Amazon (shopping). Use this identification to pick the most accurate category. For bank transfers (e.g. "Online Banking transfer"), try to infer the purpose from any additional context. If a transfer description is generic with no clues, use "Transfers"."""
+
+# The "category" field and its guidance; left out of extraction prompts in two-stage mode
+CATEGORY_SPEC_TEMPLATE = """- "category": string — classify each transaction into exactly one of these categories:
+{categories}
+
+""" + CATEGORIZATION_GUIDANCE + "\n"
+
+CATEGORIZE_PROMPT_TEMPLATE = """You are categorizing bank statement transactions. Each numbered line below is a distinct merchant description from one or more statements; "(credit)" marks money received.
+
+Classify each description into exactly one of these categories:
+{categories}
+
+""" + CATEGORIZATION_GUIDANCE + """
+
+Return ONLY a JSON object mapping each description's number to the number shown before its chosen category in the list above, with one entry per description. For example, for three descriptions: {{"0":4,"1":0,"2":12}}
+
+Descriptions:
+{descriptions}"""
+
+
 PARSE_PROMPT_TEMPLATE = """You are a bank statement parser. Extract all transactions from the following bank statement text.
 
 CRITICAL: You must be 100% certain of every single character and number you extract. If ANY character, digit, date, amount, or description is not perfectly clear and readable, return an empty JSON array: []
@@ -26,14 +68,10 @@ Return a JSON array of transactions. Each transaction should have:
   - For chequing/savings: withdrawals = "debit", deposits = "credit"
   - For credit cards: purchases/charges (positive amounts) = "debit", payments/refunds/credits (negative amounts, amounts with a minus sign, or marked CR) = "credit"
 - "balance": number or null (running balance if available)
-- "category": string — classify each transaction into exactly one of these categories:
-{categories}
-
-CATEGORIZATION: For each transaction, first identify what the merchant or business actually is (e.g. a restaurant, grocery store, gas station, subscription service, online retailer, etc.) using your world knowledge. Many merchant names on bank statements are abbreviated or cryptic — think about what real-world business the name refers to before choosing a category. For example, "MADEMOISELLE TORONTO" is a restaurant, "MUJI" is a retail store, "AMZN" is Amazon (shopping). Use this identification to pick the most accurate category. For bank transfers (e.g. "Online Banking transfer"), try to infer the purpose from any additional context. If a transfer description is generic with no clues, use "Transfers".
-
+{category_spec}
 For credit card statements: "date" is the transaction date (when the purchase was made) and "posting_date" is the posting date (when it appeared on the account). If only one date is shown, use it as "date" and set "posting_date" to null.
 
-Return ONLY the JSON array, no other text.
+{format_rules}Return ONLY the JSON array, no other text.
 
 Bank statement text:
 {text}"""
@@ -91,16 +129,12 @@ Return a JSON array of transactions. Each transaction should have:
   - For chequing/savings: withdrawals = "debit", deposits = "credit"
   - For credit cards: purchases/charges (positive amounts) = "debit", payments/refunds/credits (negative amounts, amounts with a minus sign, or marked CR) = "credit"
 - "balance": number or null (running balance if available)
-- "category": string — classify each transaction into exactly one of these categories:
-{categories}
-
-CATEGORIZATION: For each transaction, first identify what the merchant or business actually is (e.g. a restaurant, grocery store, gas station, subscription service, online retailer, etc.) using your world knowledge. Many merchant names on bank statements are abbreviated or cryptic — think about what real-world business the name refers to before choosing a category. For example, "MADEMOISELLE TORONTO" is a restaurant, "MUJI" is a retail store, "AMZN" is Amazon (shopping). Use this identification to pick the most accurate category. For bank transfers (e.g. "Online Banking transfer"), try to infer the purpose from any additional context. If a transfer description is generic with no clues, use "Transfers".
-
+{category_spec}
 For credit card statements: "date" is the transaction date (when the purchase was made) and "posting_date" is the posting date (when it appeared on the account). If only one date is shown, use it as "date" and set "posting_date" to null.
 
 IMPORTANT: Look carefully at each amount's sign. A minus sign (-) or "CR" prefix/suffix means the transaction is a "credit" (payment or refund), NOT a "debit".
 
-Return ONLY the JSON array, no other text."""
+{format_rules}Return ONLY the JSON array, no other text."""
 
 
 async def parse_transactions(
@@ -126,28 +160,81 @@ async def parse_transactions_from_images(
     return await _parse_with_claude_vision(image_paths, custom_categories=custom_categories)
 
 
-async def _parse_with_claude(
-    text: str,
+async def categorize_descriptions(
+    descriptions: list[str],
     custom_categories: list[dict] | None = None,
+) -> list[str]:
+    """Categorize distinct descriptions in batched calls (two-stage mode).
+
+    Returns one category name per description, "Other" where the model gave
+    no usable answer.
+    """
+    if not descriptions:
+        return []
+    if settings.mock_mode:
+        return ["Other"] * len(descriptions)
+
+    return await _categorize_with_claude(descriptions, custom_categories)
+
+
+def _cascade_models() -> list[str]:
+    return [settings.llm_fast_model, settings.llm_strong_model]
+
+
+async def _run_cascade(
+    call: Callable[[str], Awaitable[list[Transaction]]],
+    label: str,
+    source_text: str | None = None,
 ) -> list[Transaction]:
-    import anthropic
+    """Run `call` with the cheapest model first, escalating only when validation fails.
+
+    Each stage records `cascade.<model>.calls` and `cascade.<model>.escalated`
+    so per-stage escalation rates can be tuned against latency and cost.
+    """
+    models = _cascade_models()
+    for stage, model in enumerate(models):
+        is_last = stage == len(models) - 1
+        metrics.incr(f"cascade.{model}.calls")
+        try:
+            transactions = await call(model)
+        except (json.JSONDecodeError, ValidationError, TypeError) as exc:
+            if is_last:
+                raise
+            issues = [f"unparseable response ({type(exc).__name__})"]
+            transactions = []
+        else:
+            issues = validate_transactions(transactions, source_text)
 
-    category_block = _build_category_block(custom_categories)
-    prompt = PARSE_PROMPT_TEMPLATE.format(categories=category_block, text=text[:100000])
+        if not issues:
+            return transactions
+        if is_last:
+            logger.warning(f"{label}: {model} output still fails validation: {'; '.join(issues)}")
+            return transactions
+
+        metrics.incr(f"cascade.{model}.escalated")
+        logger.info(f"{label}: escalating from {model} — {'; '.join(issues)}")
+    return []
 
-    client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
+
+async def _create_message(client, model: str, content: str | list[dict], prefill: str | None = None):
+    """Call the Messages API, backing off on rate limits.
+
+    `prefill` seeds the assistant turn so the model continues from it.
+    """
+    import anthropic
+
+    messages: list[dict] = [{"role": "user", "content": content}]
+    if prefill:
+        messages.append({"role": "assistant", "content": prefill})
 
     max_retries = 5
     for attempt in range(max_retries):
         try:
-            message = await client.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=16384,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
+            return await client.messages.create(
+                model=model,
+                max_tokens=settings.llm_max_tokens,
+                messages=messages,
             )
-            break
         except anthropic.RateLimitError:
             if attempt == max_retries - 1:
                 raise
@@ -155,19 +242,230 @@ async def _parse_with_claude(
             logger.warning(f"Rate limited, waiting {wait}s (attempt {attempt + 1}/{max_retries})")
             await asyncio.sleep(wait)
 
-    response_text = message.content[0].text
-    # Extract JSON from response (handle markdown code blocks)
-    if "```" in response_text:
-        start = response_text.index("```") + 3
-        if response_text[start:].startswith("json"):
-            start += 4
-        # Find closing backticks, fall back to end of string
-        rest = response_text[start:]
-        end_idx = rest.find("```")
-        response_text = rest[:end_idx].strip() if end_idx != -1 else rest.strip()
 
-    data = json.loads(response_text)
-    return [Transaction(**t) for t in data]
+async def _request_transactions(
+    client,
+    model: str,
+    content: str | list[dict],
+    decode: Callable[[list], list[Transaction]],
+) -> list[Transaction]:
+    """Request a JSON array of transactions, continuing past output-token truncation.
+
+    When a response stops on `max_tokens`, the output is cut back to the last
+    complete transaction and sent as an assistant prefill so the model resumes
+    from there. If continuations run out, every complete transaction parsed so
+    far is returned instead of failing the whole file. `decode` turns the JSON
+    array into Transactions (object or compact row format).
+    """
+    raw = ""
+    truncated = False
+    for attempt in range(settings.llm_max_continuations + 1):
+        if attempt:
+            metrics.incr("llm.continuations")
+        message = await _create_message(client, model, content, prefill=raw or None)
+        raw += message.content[0].text if message.content else ""
+
+        if message.stop_reason != "max_tokens":
+            try:
+                data = json.loads(_extract_json(raw))
+            except json.JSONDecodeError:
+                if not truncated:
+                    raise
+                data, _ = _decode_partial_array(raw)
+            return decode(data)
+
+        truncated = True
+        metrics.incr("llm.truncations")
+        items, end = _decode_partial_array(raw)
+        logger.info(f"{model} hit max_tokens after {len(items)} complete transactions — continuing")
+        if not end:
+            break
+        # Resume right after the last complete transaction (prefill can't end in whitespace)
+        raw = raw[:end].rstrip()
+
+    metrics.incr("llm.truncation_salvaged")
+    items, _ = _decode_partial_array(raw)
+    logger.warning(f"{model} output still truncated; keeping {len(items)} complete transactions")
+    return decode(items)
+
+
+def _decode_partial_array(raw: str) -> tuple[list, int]:
+    """Decode the complete elements of a possibly truncated JSON array.
+
+    Returns (items, offset just past the last complete item), or ([], 0) when
+    no array has started.
+    """
+    start = raw.find("[")
+    if start == -1:
+        return [], 0
+    decoder = json.JSONDecoder()
+    items: list = []
+    idx = end = start + 1
+    while True:
+        while idx < len(raw) and raw[idx] in " \t\r\n,":
+            idx += 1
+        if idx >= len(raw) or raw[idx] == "]":
+            break
+        try:
+            item, idx = decoder.raw_decode(raw, idx)
+        except json.JSONDecodeError:
+            break
+        items.append(item)
+        end = idx
+    return items, end
+
+
+def _text_windows(text: str) -> list[str]:
+    """Split page-broken text (see text_compaction.PAGE_BREAK) into windows of llm_text_window_pages pages."""
+    pages = [page.strip("\n") for page in text.split("\f")]
+    pages = [page for page in pages if page.strip()] or [text]
+    size = max(1, settings.llm_text_window_pages)
+    return ["\n\n".join(pages[i:i + size]) for i in range(0, len(pages), size)]
+
+
+def _window_context(first_window: str) -> str:
+    """The statement's header lines (bank, period, column headers) before its first transaction row.
+
+    Compaction keeps repeated headers only on the first page, so later windows
+    get them from here to know the column layout.
+    """
+    context: list[str] = []
+    for line in first_window.splitlines():
+        if DATE_RE.search(line) and AMOUNT_RE.search(line):
+            break
+        context.append(line)
+    return "\n".join(context[:_WINDOW_CONTEXT_MAX_LINES]).strip("\n")
+
+
+async def _gather_bounded(calls: list[Callable[[], Awaitable[T]]]) -> list[T]:
+    """Await `calls` concurrently, at most llm_max_concurrency at a time, results in order."""
+    semaphore = asyncio.Semaphore(max(1, settings.llm_max_concurrency))
+
+    async def run(call: Callable[[], Awaitable[T]]) -> T:
+        async with semaphore:
+            return await call()
+
+    return await asyncio.gather(*(run(call) for call in calls))
+
+
+async def _parse_with_claude(
+    text: str,
+    custom_categories: list[dict] | None = None,
+) -> list[Transaction]:
+    """Parse statement text. With the cascade enabled, the text is split into page
+    windows parsed concurrently, so only windows whose output fails validation
+    are re-read by the stronger model."""
+    import anthropic
+
+    category_spec, format_rules, decode = _output_contract(custom_categories)
+    client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
+
+    def prompt_for(window: str) -> str:
+        return PARSE_PROMPT_TEMPLATE.format(
+            category_spec=category_spec, format_rules=format_rules, text=window[:100000],
+        )
+
+    if not settings.llm_cascade_enabled:
+        return await _request_transactions(client, settings.llm_fast_model, prompt_for(text), decode)
+
+    windows = _text_windows(text)
+    context = _window_context(windows[0]) if len(windows) > 1 else ""
+
+    def parse_window(i: int) -> Callable[[], Awaitable[list[Transaction]]]:
+        window = windows[i]
+        prompt = prompt_for(
+            window if i == 0 or not context
+            else f"[Statement header, for the column layout only — it has no transactions]\n{context}\n\n"
+                 f"[Statement pages]\n{window}"
+        )
+        return lambda: _run_cascade(
+            lambda model: _request_transactions(client, model, prompt, decode),
+            f"text window {i + 1}/{len(windows)}",
+            source_text=window,
+        )
+
+    results = await _gather_bounded([parse_window(i) for i in range(len(windows))])
+    return [tx for transactions in results for tx in transactions]
+
+
+async def _categorize_with_claude(
+    descriptions: list[str],
+    custom_categories: list[dict] | None = None,
+) -> list[str]:
+    import anthropic
+
+    category_block = _build_category_block(custom_categories)
+    names = category_names_from_block(category_block)
+    indexed_block = index_category_block(category_block)
+    client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
+
+    categories: list[str] = []
+    for start in range(0, len(descriptions), _CATEGORIZE_BATCH_SIZE):
+        chunk = descriptions[start:start + _CATEGORIZE_BATCH_SIZE]
+        prompt = CATEGORIZE_PROMPT_TEMPLATE.format(
+            categories=indexed_block,
+            # One line per description, so a wrapped description can't shift the numbering
+            descriptions="\n".join(f"{i}. {' '.join(d.split())}" for i, d in enumerate(chunk)),
+        )
+        categories.extend(await _request_categories(client, prompt, len(chunk), names))
+    return categories
+
+
+async def _request_categories(client, prompt: str, expected: int, names: list[str]) -> list[str]:
+    """Ask for a category index per description number, escalating on an incomplete answer.
+
+    Answers are keyed by the description's number, never by position, so a
+    skipped or extra entry can't shift categories onto the wrong rows.
+    """
+    answers: dict[int, str] = {}
+    for model in _cascade_models():
+        metrics.incr("categorize.llm_calls")
+        message = await _create_message(client, model, prompt)
+        raw = message.content[0].text if message.content else ""
+        try:
+            data = json.loads(_extract_json(raw))
+        except json.JSONDecodeError:
+            data = None
+        if isinstance(data, dict):
+            for key, i in data.items():
+                row = int(key) if isinstance(key, str) and key.isdigit() else None
+                if row is not None and row < expected and isinstance(i, int) and not isinstance(i, bool):
+                    answers[row] = names[i] if 0 <= i < len(names) else "Other"
+        if len(answers) == expected:
+            break
+        logger.info(
+            f"categorize: {model} answered {len(answers)} of {expected} descriptions — escalating"
+        )
+    return [answers.get(row, "Other") for row in range(expected)]
+
+
+def _output_contract(
+    custom_categories: list[dict] | None,
+    compact: bool | None = None,
+    categorize: bool | None = None,
+) -> tuple[str, str, Callable[[list], list[Transaction]]]:
+    """Return (category spec, format rules, decoder) for the configured response format.
+
+    With categorize=False (two-stage mode) the prompt asks for no category at
+    all and every transaction comes back as "Other" for the categorization stage.
+    """
+    if compact is None:
+        compact = settings.llm_compact_output
+    if categorize is None:
+        categorize = not settings.llm_two_stage_categorization
+
+    category_block = _build_category_block(custom_categories)
+    if not compact:
+        category_spec = CATEGORY_SPEC_TEMPLATE.format(categories=category_block) if categorize else ""
+        return category_spec, "", lambda data: [Transaction(**t) for t in data]
+
+    names = category_names_from_block(category_block)
+    category_spec = CATEGORY_SPEC_TEMPLATE.format(categories=index_category_block(category_block)) if categorize else ""
+    return (
+        category_spec,
+        compact_format_rules(with_category=categorize),
+        lambda data: decode_compact_rows(data, names),
+    )
 
 
 def _extract_json(response_text: str) -> str:
@@ -186,14 +484,36 @@ async def _parse_with_claude_vision(
     image_paths: list[str],
     custom_categories: list[dict] | None = None,
 ) -> list[Transaction]:
+    """Parse page images. With the cascade enabled, each page is its own window —
+    pages run concurrently and only those whose output fails validation are
+    re-read by the stronger model."""
     import anthropic
 
-    from app.services.image_service import image_to_base64
+    category_spec, format_rules, decode = _output_contract(custom_categories)
+    prompt = VISION_PROMPT_TEMPLATE.format(category_spec=category_spec, format_rules=format_rules)
 
-    category_block = _build_category_block(custom_categories)
-    prompt = VISION_PROMPT_TEMPLATE.format(categories=category_block)
+    client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
+
+    async def call(paths: list[str], model: str) -> list[Transaction]:
+        return await _request_transactions(client, model, _vision_content(paths, prompt), decode)
+
+    if not settings.llm_cascade_enabled:
+        return await call(image_paths, settings.llm_strong_model)
+
+    results = await _gather_bounded([
+        lambda path=path, i=i: _run_cascade(
+            lambda model: call([path], model),
+            f"page {i + 1}/{len(image_paths)}",
+        )
+        for i, path in enumerate(image_paths)
+    ])
+    return [tx for transactions in results for tx in transactions]
+
+
+def _vision_content(image_paths: list[str], prompt: str) -> list[dict]:
+    """Build content blocks: image blocks followed by the text prompt."""
+    from app.services.image_service import image_to_base64
 
-    # Build content blocks: text prompt + image blocks
     content: list[dict] = []
     for path in image_paths:
         b64_data, media_type = image_to_base64(path)
@@ -206,27 +526,4 @@ async def _parse_with_claude_vision(
             },
         })
     content.append({"type": "text", "text": prompt})
-
-    client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
-
-    max_retries = 5
-    for attempt in range(max_retries):
-        try:
-            message = await client.messages.create(
-                model="claude-sonnet-4-5-20250929",
-                max_tokens=16384,
-                messages=[{"role": "user", "content": content}],
-            )
-            break
-        except anthropic.RateLimitError:
-            if attempt == max_retries - 1:
-                raise
-            wait = 2 ** attempt * 15
-            logger.warning(f"Rate limited, waiting {wait}s (attempt {attempt + 1}/{max_retries})")
-            await asyncio.sleep(wait)
-
-    response_text = message.content[0].text
-    response_text = _extract_json(response_text)
-
-    data = json.loads(response_text)
-    return [Transaction(**t) for t in data]
+    return content
@@ -0,0 +1,124 @@
+"""Merchant canonicalization: turn raw statement descriptions into a stable merchant name.
+
+"LOBLAWS #1234", "LOBLAWS 1234 TORONTO ON" and "POS PURCHASE LOBLAWS" all
+become "LOBLAWS". Strips, in order:
+- payment processor prefixes ("SQ *", "TST*", "PAYPAL *", ...)
+- card/POS prefixes ("POS PURCHASE", "VISA DEBIT", "PRE-AUTH", ...)
+- a "*"-attached reference code ("AMAZON.CA*2A3B4C"); other "*"s become spaces
+- a trailing province code with the city (or store number + city) before it
+- store numbers, terminal IDs and reference codes (mostly-numeric tokens)
+
+Everything is plain string work on short token lists — no backtracking regex —
+and results are memoised, since statements repeat the same descriptions.
+"""
+
+import re
+from functools import lru_cache
+
+_PROCESSOR_PREFIX_RE = re.compile(r"^(?:SQ|TST|SP|PY|PAYPAL|GOOGLE|ZLR|EB|DNH|FS)\s?\*\s*")
+
+# Leading token sequences that describe the payment, not the merchant
+_POS_PREFIXES = (
+    "POS PURCHASE", "POS DEBIT", "POS WITHDRAWAL", "POS",
+    "DEBIT CARD PURCHASE", "DEBIT PURCHASE", "VISA DEBIT PURCHASE", "VISA DEBIT",
+    "INTERAC PURCHASE", "IDP PURCHASE", "C-IDP PURCHASE",
+    "PURCHASE", "PRE-AUTH", "PREAUTH", "PRE-AUTHORIZED", "RECURRING",
+    "OPOS", "APOS", "CONTACTLESS", "BILL PAYMENT", "MISC PAYMENT",
+)
+# first token → candidate prefixes, longest first
+_PREFIXES_BY_FIRST: dict[str, list[tuple[str, ...]]] = {}
+for _prefix in sorted((tuple(p.split()) for p in _POS_PREFIXES), key=len, reverse=True):
+    _PREFIXES_BY_FIRST.setdefault(_prefix[0], []).append(_prefix)
+
+_PROVINCES = frozenset("AB BC MB NB NL NS NT NU ON PE QC SK YT".split())
+# First words of multi-word city names ("NORTH YORK", "THUNDER BAY")
+_CITY_LEADS = frozenset("NORTH SOUTH EAST WEST NEW PORT FORT RED THUNDER NIAGARA PRINCE GRANDE".split())
+
+_TOKEN_PUNCTUATION = ".,:;-_#*/\\()[]{}\"'"
+_DELETE_DIGITS = str.maketrans("", "", "0123456789")
+_DELETE_NON_LETTERS = str.maketrans("", "", "0123456789" + _TOKEN_PUNCTUATION + "&+$%@!?=~")
+
+# Max tokens between the merchant and the province code (store number + city)
+_MAX_LOCATION_TOKENS = 3
+
+# Words that describe a transfer or payment rather than who it's with
+_TRANSFER_WORDS = frozenset("""
+    INTERAC E-TRF E-TFR ETRF E-TRANSFER ETRANSFER E-TRANSFERT TRANSFER TRANSFERT TRF TFR XFER
+    SEND SENT RECEIVED RECV REQUEST AUTODEPOSIT DEPOSIT WITHDRAWAL ONLINE INTERNET MOBILE
+    TELEPHONE BANKING BANK TO FROM ACCT ACCOUNT CHEQUING SAVINGS PAYMENT PMT PAY BILL MISC
+    THANK YOU ATM CASH CHEQUE CHQ CHECK WIRE EFT FUNDS CA DEBIT CREDIT MEMO REF CONF BRANCH
+""".split())
+
+
+def _is_code(token: str) -> bool:
+    """Store number, terminal ID or reference: at least as many digits as letters (or a #123 tag)."""
+    if token.isalpha():
+        return False
+    if token[0] == "#" or token.isdigit():
+        return True
+    digits = len(token) - len(token.translate(_DELETE_DIGITS))
+    return digits > 0 and digits >= len(token.translate(_DELETE_NON_LETTERS))
+
+
+def _strip_prefix(tokens: list[str]) -> list[str]:
+    while tokens:
+        candidates = _PREFIXES_BY_FIRST.get(tokens[0])
+        if candidates is None:
+            break
+        for prefix in candidates:
+            n = len(prefix)
+            if len(tokens) > n and tuple(tokens[:n]) == prefix:
+                tokens = tokens[n:]
+                break
+        else:
+            break
+    return tokens
+
+
+def _strip_location(tokens: list[str]) -> list[str]:
+    if len(tokens) < 3 or tokens[-1] not in _PROVINCES:
+        return tokens
+    tokens = tokens[:-1]
+    # "LOBLAWS 1234 TORONTO" → cut at the store number; "LOBLAWS TORONTO" → drop the city
+    for i in range(len(tokens) - 1, max(0, len(tokens) - 1 - _MAX_LOCATION_TOKENS), -1):
+        if _is_code(tokens[i]):
+            return tokens[:i]
+    tokens = tokens[:-1]
+    if len(tokens) > 1 and tokens[-1] in _CITY_LEADS:
+        tokens = tokens[:-1]
+    return tokens
+
+
+@lru_cache(maxsize=65536)
+def canonical_merchant(description: str) -> str:
+    """Return the canonical (upper-case) merchant name for a description, or "" if none."""
+    text = description.upper()
+    if "*" in text:
+        text = _PROCESSOR_PREFIX_RE.sub("", text.strip(), count=1)
+        head, _, tail = text.partition("*")
+        ref, _, rest = tail.strip().partition(" ")
+        if head.strip() and any(ch.isdigit() for ch in ref):
+            text = f"{head} {rest}"
+        text = text.replace("*", " ")
+
+    tokens = _strip_prefix(text.split())
+    tokens = _strip_location(tokens)
+
+    kept = []
+    for raw in tokens:
+        token = raw.strip(_TOKEN_PUNCTUATION)
+        if token and not _is_code(token):
+            kept.append(token)
+    return " ".join(kept)
+
+
+def merchant_key(description: str) -> str:
+    """Lower-case canonical merchant, used as a lookup key (memory, rules, frequency index)."""
+    return canonical_merchant(description).lower()
+
+
+def is_generic_merchant(key: str) -> bool:
+    """True for merchant keys made only of transfer/payment words ("interac e-trf",
+    "transfer to acct"): every recipient shares them, so they say nothing about the category."""
+    tokens = key.upper().split()
+    return bool(tokens) and all(token in _TRANSFER_WORDS for token in tokens)
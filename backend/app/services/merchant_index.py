@@ -0,0 +1,82 @@
+"""Per-org frequency index of canonical merchants.
+
+Each upload adds its transactions' merchant counts in one upsert. The index
+backs the /merchants listing — which merchants an org sees most, and what
+category (if any) the merchant memory has for them.
+"""
+
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.db.models import MerchantCategory, MerchantStat
+from app.models.transaction import Transaction
+from app.services.merchant_canonicalizer import canonical_merchant
+
+_UPSERT_CHUNK = 1000
+
+
+async def record(session: AsyncSession, org_id: uuid.UUID, transactions: list[Transaction]) -> int:
+    """Add the transactions' merchants to the org's index. Returns distinct merchants. The caller commits."""
+    counts: Counter[str] = Counter()
+    names: dict[str, str] = {}
+    for tx in transactions:
+        name = canonical_merchant(tx.description)
+        if name:
+            key = name.lower()
+            counts[key] += 1
+            names[key] = name
+    if not counts:
+        return 0
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": uuid.uuid4(), "org_id": org_id, "merchant_key": key,
+            "display_name": names[key], "tx_count": n, "last_seen_at": now,
+        }
+        for key, n in counts.items()
+    ]
+    for start in range(0, len(rows), _UPSERT_CHUNK):
+        stmt = pg_insert(MerchantStat).values(rows[start:start + _UPSERT_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_merchant_stats_org_key",
+            set_={
+                "tx_count": MerchantStat.tx_count + stmt.excluded.tx_count,
+                "display_name": stmt.excluded.display_name,
+                "last_seen_at": stmt.excluded.last_seen_at,
+            },
+        )
+        await session.execute(stmt)
+    return len(rows)
+
+
+async def top_merchants(
+    session: AsyncSession,
+    org_id: uuid.UUID,
+    limit: int = 50,
+    prefix: str | None = None,
+) -> list[tuple[MerchantStat, str | None]]:
+    """Most frequent merchants for an org, with the remembered category (or None)."""
+    query = (
+        select(MerchantStat, MerchantCategory.category)
+        .outerjoin(
+            MerchantCategory,
+            and_(
+                MerchantCategory.org_id == MerchantStat.org_id,
+                MerchantCategory.merchant_key == MerchantStat.merchant_key,
+            ),
+        )
+        .where(MerchantStat.org_id == org_id)
+        .order_by(MerchantStat.tx_count.desc(), MerchantStat.merchant_key)
+        .limit(limit)
+    )
+    if prefix:
+        query = query.where(MerchantStat.merchant_key.startswith(prefix.lower(), autoescape=True))
+    result = await session.execute(query)
+    return [(stat, category) for stat, category in result.all()]
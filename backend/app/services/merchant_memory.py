@@ -0,0 +1,175 @@
+"""Per-org merchant → category memory.
+
+Every manual category edit and every rule hit is remembered against the
+canonical merchant key ("POS PURCHASE TIM HORTONS #8901" → "tim hortons").
+On upload, transactions whose merchant is already known take the remembered
+category (category_source="memory") — rules still run afterwards and win.
+Manual entries are never overwritten by rule hits, only by newer manual edits.
+
+Generic transfer/payment keys ("interac e-trf", "transfer to acct") are
+neither learned nor recalled: different recipients share them.
+
+Lookups and hits are counted on the organization for a per-org hit rate.
+"""
+
+import logging
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import or_, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.db.models import MerchantCategory
+from app.models.transaction import Transaction
+from app.services import metrics, ngram_categorizer
+from app.services.merchant_canonicalizer import is_generic_merchant, merchant_key
+
+logger = logging.getLogger(__name__)
+
+LEARNED_SOURCES = ("manual", "rule")
+
+_UPSERT_CHUNK = 1000
+
+
+async def learn(session: AsyncSession, org_id: uuid.UUID, transactions: list[Transaction]) -> int:
+    """Upsert memory entries from manual edits and rule hits. Returns entries written.
+
+    Within a batch a manual edit beats a rule hit for the same merchant. The
+    caller commits.
+    """
+    entries: dict[str, tuple[str, str]] = {}
+    for tx in transactions:
+        if tx.category_source not in LEARNED_SOURCES:
+            continue
+        key = merchant_key(tx.description)
+        if not key or is_generic_merchant(key):
+            continue
+        existing = entries.get(key)
+        if existing and existing[1] == "manual" and tx.category_source == "rule":
+            continue
+        entries[key] = (tx.category, tx.category_source)
+
+    if not entries:
+        return 0
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": uuid.uuid4(), "org_id": org_id, "merchant_key": key,
+            "category": category, "source": source, "hits": 0,
+            "created_at": now, "updated_at": now,
+        }
+        for key, (category, source) in entries.items()
+    ]
+    for start in range(0, len(rows), _UPSERT_CHUNK):
+        stmt = pg_insert(MerchantCategory).values(rows[start:start + _UPSERT_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_merchant_categories_org_key",
+            set_={
+                "category": stmt.excluded.category,
+                "source": stmt.excluded.source,
+                "updated_at": stmt.excluded.updated_at,
+            },
+            where=or_(stmt.excluded.source == "manual", MerchantCategory.source != "manual"),
+        )
+        await session.execute(stmt)
+    ngram_categorizer.observe(
+        org_id, {key: category for key, (category, source) in entries.items() if source == "manual"}
+    )
+    return len(rows)
+
+
+@dataclass
+class RecallResult:
+    """What a memory lookup found, for the hit counters."""
+    lookups: int = 0
+    hits: Counter[str] = field(default_factory=Counter)  # merchant key → transactions categorized
+
+    @property
+    def hit_count(self) -> int:
+        return sum(self.hits.values())
+
+
+async def lookup(
+    session: AsyncSession,
+    org_id: uuid.UUID,
+    transactions: list[Transaction],
+    allowed_categories: set[str] | None = None,
+) -> RecallResult:
+    """Categorize known merchants from memory, reading only — no counters are written.
+
+    Manual and rule-categorized transactions are left alone. Remembered
+    categories outside `allowed_categories` (e.g. from another category group)
+    are ignored. Pass the result to record_recall() to update the hit counters.
+    """
+    candidates = [
+        (tx, merchant_key(tx.description))
+        for tx in transactions
+        if tx.category_source not in LEARNED_SOURCES
+    ]
+    keys = {key for _, key in candidates if key and not is_generic_merchant(key)}
+    if not keys:
+        return RecallResult()
+
+    result = await session.execute(
+        select(MerchantCategory.merchant_key, MerchantCategory.category).where(
+            MerchantCategory.org_id == org_id,
+            MerchantCategory.merchant_key.in_(keys),
+        )
+    )
+    memory = {key: category for key, category in result.all()}
+
+    found = RecallResult(lookups=len(candidates))
+    for tx, key in candidates:
+        category = memory.get(key)
+        if category is None or (allowed_categories is not None and category not in allowed_categories):
+            continue
+        tx.category = category
+        tx.category_source = "memory"
+        found.hits[key] += 1
+
+    metrics.incr("merchant_memory.lookups", found.lookups)
+    metrics.incr("merchant_memory.hits", found.hit_count)
+    return found
+
+
+async def record_recall(session: AsyncSession, org_id: uuid.UUID, found: RecallResult) -> None:
+    """Add a lookup's counts to the org's and the merchants' hit counters (uncommitted).
+
+    This takes the organization row lock, so callers about to make a slow call
+    (the LLM) look up first and record afterwards.
+    """
+    if not found.lookups:
+        return
+    await session.execute(
+        text(
+            "UPDATE organizations SET merchant_memory_lookups = merchant_memory_lookups + :lookups, "
+            "merchant_memory_hits = merchant_memory_hits + :hits WHERE id = :org_id"
+        ),
+        {"lookups": found.lookups, "hits": found.hit_count, "org_id": org_id},
+    )
+    if found.hits:
+        await session.execute(
+            text(
+                "UPDATE merchant_categories AS m SET hits = m.hits + v.n "
+                "FROM unnest(CAST(:keys AS text[]), CAST(:counts AS integer[])) AS v(merchant_key, n) "
+                "WHERE m.org_id = :org_id AND m.merchant_key = v.merchant_key"
+            ),
+            {"keys": list(found.hits), "counts": list(found.hits.values()), "org_id": org_id},
+        )
+
+
+async def recall(
+    session: AsyncSession,
+    org_id: uuid.UUID,
+    transactions: list[Transaction],
+    allowed_categories: set[str] | None = None,
+) -> int:
+    """lookup() and record_recall() in one go. Returns the number of transactions hit."""
+    found = await lookup(session, org_id, transactions, allowed_categories)
+    await record_recall(session, org_id, found)
+    return found.hit_count
@@ -0,0 +1,32 @@
+"""In-process pipeline counters (per uvicorn worker, reset on restart)."""
+
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+_counters: Counter[str] = Counter()
+_lock = threading.Lock()
+
+
+def incr(name: str, n: int = 1) -> None:
+    """Increment a named counter by n."""
+    with _lock:
+        _counters[name] += n
+
+
+def get(name: str) -> int:
+    return _counters.get(name, 0)
+
+
+def rate(numerator: str, denominator: str) -> float:
+    """Return numerator/denominator for two counters (0.0 when nothing recorded)."""
+    den = get(denominator)
+    return get(numerator) / den if den else 0.0
+
+
+def snapshot(prefix: str = "") -> dict[str, int]:
+    """Return a copy of all counters, optionally filtered by name prefix."""
+    with _lock:
+        return {k: v for k, v in sorted(_counters.items()) if k.startswith(prefix)}
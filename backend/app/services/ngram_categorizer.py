@@ -0,0 +1,226 @@
+"""Per-org nearest-neighbour categorizer over hashed character n-grams.
+
+Each org gets an in-process index trained on its merchant memory (manual edits
+and rule hits, keyed by canonical merchant) plus the phrases of the default
+category descriptions ("supermarkets", "gas stations", ...). A merchant is
+embedded as an L2-normalised bag of char 3-grams and whole words, hashed
+into a fixed number of buckets; lookup is
+cosine similarity against an inverted index. Candidates come from the query's
+rarest features only, so common grams like "ing" never fan out to the whole
+index, and only the few candidates sharing the most of them are scored exactly.
+
+Above settings.ngram_min_similarity the category is assigned with
+category_source="similar"; below it the row is left for the LLM. Models are
+refreshed incrementally — only memory rows updated since the last load are
+(re)indexed — and updated in place when the memory learns new entries.
+"""
+
+import logging
+import time
+import uuid
+import zlib
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.config import settings
+from app.db.models import MerchantCategory
+from app.lib.defaults import DEFAULT_CATEGORIES
+from app.models.transaction import Transaction
+from app.services import metrics
+from app.services.merchant_canonicalizer import is_generic_merchant, merchant_key
+
+logger = logging.getLogger(__name__)
+
+_NGRAM = 3
+_WORD_MARK = "\x01"  # keeps word features apart from 3-grams ("bar" the word vs " ba")
+# Features are hashed into this many buckets (a power of two)
+_FEATURE_BUCKETS = 1 << 18
+# Candidates are docs sharing the query's rarest features; only the ones
+# sharing the most of them get a full dot product
+_CANDIDATE_FEATURES = 8
+_SCORED_CANDIDATES = 8
+
+_REFRESH_SECONDS = 30
+_MAX_MODELS = 256
+
+
+def _bucket(feature: str) -> int:
+    return zlib.crc32(feature.encode()) & (_FEATURE_BUCKETS - 1)
+
+
+def vectorize(text: str) -> dict[int, float]:
+    """Char-3-gram + word features of a (lower-case) text, hashed into
+    _FEATURE_BUCKETS buckets and L2-normalised.
+
+    Hashing keeps the feature space (and the postings dict) a fixed size however
+    many distinct words merchants bring, and vectors hold small ints instead of
+    gram strings. crc32 is stable across processes, unlike hash().
+    """
+    padded = f" {text} "
+    grams = [padded[i:i + _NGRAM] for i in range(len(padded) - _NGRAM + 1)]
+    grams += [_WORD_MARK + word for word in text.split()]
+    counts = Counter(map(_bucket, grams))
+    if len(counts) == len(grams):  # no repeats or collisions: every weight is 1/sqrt(n)
+        return dict.fromkeys(counts, len(grams) ** -0.5)
+    inv_norm = sum(c * c for c in counts.values()) ** -0.5
+    return {feature: c * inv_norm for feature, c in counts.items()}
+
+
+class NgramIndex:
+    """Sparse inverted index of labelled texts with cosine nearest-neighbour lookup.
+
+    Texts are unique; adding an existing text only relabels it.
+    """
+
+    def __init__(self):
+        self._ids: dict[str, int] = {}
+        self._labels: list[str] = []
+        self._vectors: list[dict[int, float]] = []
+        self._postings: dict[int, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def add(self, text: str, label: str) -> None:
+        doc_id = self._ids.get(text)
+        if doc_id is not None:
+            self._labels[doc_id] = label
+            return
+        vector = vectorize(text)
+        if not vector:
+            return
+        doc_id = len(self._labels)
+        self._ids[text] = doc_id
+        self._labels.append(label)
+        self._vectors.append(vector)
+        postings = self._postings
+        for gram in vector:
+            bucket = postings.get(gram)
+            if bucket is None:
+                postings[gram] = [doc_id]
+            else:
+                bucket.append(doc_id)
+
+    def nearest(self, text: str, allowed: set[str] | None = None) -> tuple[str, float] | None:
+        """Return (label, cosine similarity) of the closest labelled text, or None."""
+        query = vectorize(text)
+        if not query:
+            return None
+        postings = self._postings
+        features = sorted((g for g in query if g in postings), key=lambda g: len(postings[g]))
+        shared: Counter[int] = Counter()
+        for gram in features[:_CANDIDATE_FEATURES]:
+            shared.update(postings[gram])
+        labels = self._labels
+        if allowed is not None:
+            shared = Counter({doc_id: n for doc_id, n in shared.items() if labels[doc_id] in allowed})
+
+        best: tuple[str, float] | None = None
+        for doc_id, _ in shared.most_common(_SCORED_CANDIDATES):
+            vector = self._vectors[doc_id]
+            score = sum(query[g] * vector[g] for g in query.keys() & vector.keys())
+            if best is None or score > best[1]:
+                best = (labels[doc_id], score)
+        return best
+
+
+def _seed_index() -> NgramIndex:
+    """Index pre-trained on the default category names and description phrases."""
+    index = NgramIndex()
+    for cat in DEFAULT_CATEGORIES:
+        if cat["name"] == "Other":
+            continue
+        index.add(cat["name"].lower(), cat["name"])
+        for phrase in cat["description"].split(","):
+            phrase = phrase.strip().lower()
+            if phrase and not phrase.startswith("any "):
+                index.add(phrase, cat["name"])
+    return index
+
+
+@dataclass
+class _OrgModel:
+    index: NgramIndex
+    watermark: datetime | None = None  # newest merchant memory updated_at indexed
+    checked_at: float = field(default_factory=time.monotonic)
+
+
+_models: "OrderedDict[uuid.UUID, _OrgModel]" = OrderedDict()
+
+
+async def _refresh(session: AsyncSession, model: _OrgModel, org_id: uuid.UUID) -> None:
+    query = select(MerchantCategory.merchant_key, MerchantCategory.category, MerchantCategory.updated_at).where(
+        MerchantCategory.org_id == org_id
+    )
+    if model.watermark is not None:
+        query = query.where(MerchantCategory.updated_at >= model.watermark)
+    rows = (await session.execute(query)).all()
+    for key, category, updated_at in rows:
+        model.index.add(key, category)
+        if model.watermark is None or updated_at > model.watermark:
+            model.watermark = updated_at
+    model.checked_at = time.monotonic()
+
+
+async def get_model(session: AsyncSession, org_id: uuid.UUID) -> NgramIndex:
+    """The org's index — trained on first use, then refreshed incrementally."""
+    model = _models.get(org_id)
+    if model is None:
+        model = _OrgModel(index=_seed_index())
+        await _refresh(session, model, org_id)
+        _models[org_id] = model
+        while len(_models) > _MAX_MODELS:
+            _models.popitem(last=False)
+    elif time.monotonic() - model.checked_at >= _REFRESH_SECONDS:
+        await _refresh(session, model, org_id)
+    _models.move_to_end(org_id)
+    return model.index
+
+
+def observe(org_id: uuid.UUID, entries: dict[str, str]) -> None:
+    """Fold newly learned merchant → category entries into a loaded model.
+
+    Entries that reach the database anyway are also picked up by the next
+    refresh; this just makes them visible without waiting for it.
+    """
+    model = _models.get(org_id)
+    if model is None:
+        return
+    for key, category in entries.items():
+        model.index.add(key, category)
+
+
+async def categorize(
+    session: AsyncSession,
+    org_id: uuid.UUID,
+    transactions: list[Transaction],
+    allowed_categories: set[str] | None = None,
+) -> int:
+    """Assign confident nearest-neighbour categories to AI-sourced rows. Returns rows assigned."""
+    candidates = [tx for tx in transactions if tx.category_source == "ai"]
+    if not candidates:
+        return 0
+
+    index = await get_model(session, org_id)
+    threshold = settings.ngram_min_similarity
+    predictions: dict[str, tuple[str, float] | None] = {}
+    assigned = 0
+    for tx in candidates:
+        key = merchant_key(tx.description)
+        if not key or is_generic_merchant(key):
+            continue
+        if key not in predictions:
+            predictions[key] = index.nearest(key, allowed_categories)
+        hit = predictions[key]
+        if hit is not None and hit[1] >= threshold:
+            tx.category = hit[0]
+            tx.category_source = "similar"
+            assigned += 1
+
+    metrics.incr("ngram.lookups", len(candidates))
+    metrics.incr("ngram.assigned", assigned)
+    return assigned
@@ -0,0 +1,53 @@
+"""Cheap local page relevance classifier.
+
+Statements often carry cover letters, legal disclosures, rewards summaries and
+blank trailing pages. Pages with no transaction content are excluded from the
+LLM stages. The classifier is deliberately conservative: a page is kept
+as soon as it has a single transaction-like row, since a false skip loses data
+while a false keep only costs tokens.
+
+It needs page text, so scanned PDFs are classified on their Document AI OCR
+output. Before OCR only visually blank pages are skipped
+(image_service.find_blank_pdf_pages): cover letters and disclosures are still
+OCR'd, and on the Vision fallback, where there is no OCR text, they are sent
+to the model.
+"""
+
+import logging
+
+from app.services import metrics
+from app.services.text_compaction import TABLE_CELL_SEPARATOR
+from app.services.validation_service import AMOUNT_RE, DATE_RE
+
+logger = logging.getLogger(__name__)
+
+
+def page_score(text: str) -> int:
+    """Score a page by transaction-like structure.
+
+    Counts lines holding both a date and a monetary amount, plus table rows
+    (" | "-separated cells) holding an amount.
+    """
+    score = 0
+    for line in text.splitlines():
+        if not AMOUNT_RE.search(line):
+            continue
+        if DATE_RE.search(line) or TABLE_CELL_SEPARATOR in line:
+            score += 1
+    return score
+
+
+def find_skippable_pages(pages: list[str]) -> list[int]:
+    """Return 0-based indices of pages without transaction content.
+
+    Never skips every page — if nothing looks like a transaction, the LLM
+    still gets the whole document and decides.
+    """
+    metrics.incr("pages.classified", len(pages))
+    skipped = [i for i, text in enumerate(pages) if page_score(text) == 0]
+    if len(skipped) == len(pages):
+        return []
+    metrics.incr("pages.skipped", len(skipped))
+    if skipped:
+        logger.info(f"Skipping {len(skipped)}/{len(pages)} non-transaction pages: {[i + 1 for i in skipped]}")
+    return skipped
@@ -1,28 +1,38 @@
 import pdfplumber
 
 
-def extract_text_from_pdf(file_path: str) -> tuple[str, int]:
-    """Extract text from a PDF file. Returns (text, page_count).
+def extract_pages_from_pdf(file_path: str) -> list[str]:
+    """Extract text from a PDF file, one string per page.
 
     Uses layout-aware extraction to preserve full descriptions and table alignment.
+    Table rows are rendered as " | "-separated cells.
     """
-    text_parts: list[str] = []
+    pages: list[str] = []
     with pdfplumber.open(file_path) as pdf:
-        page_count = len(pdf.pages)
         for page in pdf.pages:
+            parts: list[str] = []
             # Try table extraction first for structured data
             tables = page.extract_tables()
             if tables:
                 for table in tables:
+                    rows = []
                     for row in table:
                         cells = [cell.strip() if cell else "" for cell in row]
-                        text_parts.append(" | ".join(cells))
+                        rows.append(" | ".join(cells))
+                    parts.append("\n".join(rows))
                 # Also get non-table text (headers, footers)
                 non_table_text = page.extract_text()
                 if non_table_text:
-                    text_parts.append(non_table_text)
+                    parts.append(non_table_text)
             else:
                 page_text = page.extract_text(layout=True)
                 if page_text:
-                    text_parts.append(page_text)
-    return ("\n\n".join(text_parts), page_count)
+                    parts.append(page_text)
+            pages.append("\n\n".join(parts))
+    return pages
+
+
+def extract_text_from_pdf(file_path: str) -> tuple[str, int]:
+    """Extract text from a PDF file. Returns (text, page_count)."""
+    pages = extract_pages_from_pdf(file_path)
+    return ("\n\n".join(p for p in pages if p), len(pages))
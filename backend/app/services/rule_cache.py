@@ -0,0 +1,266 @@
+"""Per-worker cache of compiled category groups, invalidated via Postgres LISTEN/NOTIFY.
+
+Every /upload and /apply-rules call used to reload the group with nested
+selectinloads and rebuild the prompt categories and rule matcher. Entries here
+are keyed by group id and carry the group's version counter; category and rule
+CRUD bumps the version and sends a NOTIFY on commit, and every worker's
+listener drops the stale entries. A warm lookup runs no queries at all.
+
+A request that loaded a group just before a change committed can finish after
+the NOTIFY was handled, so the highest notified version per group is kept and
+nothing older is stored or served.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+
+from app.config import settings
+from app.db.models import Category, CategoryGroup, CategoryGroupChange
+from app.services.rule_engine import CompiledRules, compile_rules
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "category_groups_changed"
+
+# Safety net in case a notification is missed between listener reconnects
+_TTL_SECONDS = 300
+_MAX_GROUPS = 2048
+# Versions of change log kept per group; older since_versions fall back to a full re-apply
+_CHANGE_LOG_VERSIONS = 500
+
+
+@dataclass
+class CachedGroup:
+    group_id: uuid.UUID
+    user_id: uuid.UUID
+    version: int
+    custom_categories: list[dict]
+    compiled_rules: CompiledRules | None  # None when the group has no rules
+    loaded_at: float
+
+
+_groups: "OrderedDict[uuid.UUID, CachedGroup]" = OrderedDict()
+# user id → active group id (None = user has no active group)
+_active: dict[uuid.UUID, uuid.UUID | None] = {}
+# group id → highest version announced by NOTIFY
+_notified: dict[uuid.UUID, int] = {}
+
+
+def _fresh(entry: CachedGroup) -> bool:
+    return time.monotonic() - entry.loaded_at < _TTL_SECONDS and entry.version >= _notified.get(entry.group_id, 0)
+
+
+def _build(group: CategoryGroup) -> CachedGroup:
+    rule_categories = [c for c in group.categories if c.rules]
+    return CachedGroup(
+        group_id=group.id,
+        user_id=group.user_id,
+        version=group.version,
+        custom_categories=[
+            {"name": c.name, "description": c.description or ""}
+            for c in sorted(group.categories, key=lambda c: c.sort_order)
+        ],
+        compiled_rules=compile_rules(rule_categories, group.id) if rule_categories else None,
+        loaded_at=time.monotonic(),
+    )
+
+
+def _store(entry: CachedGroup) -> None:
+    _groups[entry.group_id] = entry
+    _groups.move_to_end(entry.group_id)
+    while len(_groups) > _MAX_GROUPS:
+        _groups.popitem(last=False)
+
+
+async def get_group(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    group_id: uuid.UUID | None = None,
+) -> CachedGroup | None:
+    """Return the user's compiled group (or active group if group_id is None).
+
+    Returns None if the group doesn't exist or isn't owned by the user.
+    """
+    if group_id is None and user_id in _active:
+        group_id = _active[user_id]
+        if group_id is None:
+            return None
+
+    if group_id is not None:
+        entry = _groups.get(group_id)
+        if entry and _fresh(entry):
+            if entry.user_id != user_id:
+                return None
+            _groups.move_to_end(group_id)
+            return entry
+
+    query = select(CategoryGroup).options(
+        selectinload(CategoryGroup.categories).selectinload(Category.rules)
+    )
+    if group_id is not None:
+        query = query.where(CategoryGroup.id == group_id, CategoryGroup.user_id == user_id)
+    else:
+        query = query.where(CategoryGroup.user_id == user_id, CategoryGroup.is_active == True)
+    group = (await session.execute(query)).scalar_one_or_none()
+
+    if group is None:
+        if group_id is None:
+            _active[user_id] = None
+        return None
+
+    entry = _build(group)
+    if entry.version < _notified.get(group.id, 0):
+        # Loaded before a change this worker has already been notified of
+        return entry
+    _store(entry)
+    if group.is_active:
+        _active[user_id] = group.id
+    return entry
+
+
+def invalidate(group_id: uuid.UUID | None, user_id: uuid.UUID | None, version: int | None = None) -> None:
+    """Drop a cached group (unless already at `version` or newer) and the user's active-group pointer.
+
+    `version` is remembered, so a load of an older version finishing later isn't cached.
+    """
+    if group_id is not None:
+        if version is not None and version > _notified.get(group_id, 0):
+            _notified.pop(group_id, None)
+            _notified[group_id] = version
+            while len(_notified) > _MAX_GROUPS:
+                del _notified[next(iter(_notified))]
+        entry = _groups.get(group_id)
+        if entry and (version is None or entry.version < version):
+            del _groups[group_id]
+    if user_id is not None:
+        _active.pop(user_id, None)
+
+
+def clear() -> None:
+    _groups.clear()
+    _active.clear()
+    # _notified is kept: versions only grow, so it stays a valid lower bound
+
+
+async def bump_version(
+    session: AsyncSession,
+    group_id: uuid.UUID | None,
+    user_id: uuid.UUID,
+    changed_rules: list[tuple[str, str]] | None = None,
+) -> int | None:
+    """Increment a group's version and queue a NOTIFY, both taking effect on commit.
+
+    Pass group_id=None for user-level changes (group created/deleted/activated)
+    that only affect which group is active. Returns the new version.
+
+    `changed_rules` lists the (match_type, pattern) of every rule the change
+    added, edited (old and new) or removed, for incremental re-application;
+    [] means rule results can't change, None (default) that any might.
+    """
+    version = None
+    if group_id is not None:
+        result = await session.execute(
+            text("UPDATE category_groups SET version = version + 1 WHERE id = :id RETURNING version"),
+            {"id": group_id},
+        )
+        version = result.scalar_one_or_none()
+    if version is not None:
+        await session.execute(insert(CategoryGroupChange).values(
+            id=uuid.uuid4(),
+            group_id=group_id,
+            version=version,
+            changed_rules=[list(r) for r in changed_rules] if changed_rules is not None else None,
+            created_at=datetime.utcnow(),
+        ))
+        if version % 100 == 0:
+            await session.execute(
+                text("DELETE FROM category_group_changes WHERE group_id = :id AND version <= :v"),
+                {"id": group_id, "v": version - _CHANGE_LOG_VERSIONS},
+            )
+    payload = f"{group_id or ''}:{user_id}:{version or ''}"
+    await session.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": NOTIFY_CHANNEL, "payload": payload})
+    # Drop the local entry now too; a concurrent reload before commit is caught by the NOTIFY
+    invalidate(group_id, user_id)
+    return version
+
+
+async def changes_since(
+    session: AsyncSession,
+    group_id: uuid.UUID,
+    since_version: int,
+    version: int,
+) -> set[tuple[str, str]] | None:
+    """(match_type, pattern) of every rule changed after `since_version` up to `version`.
+
+    None when that can't be told — a change that may affect any transaction,
+    or versions missing from the log (pruned, or made before it existed).
+    """
+    if since_version >= version:
+        return set() if since_version == version else None
+    result = await session.execute(
+        select(CategoryGroupChange.version, CategoryGroupChange.changed_rules).where(
+            CategoryGroupChange.group_id == group_id,
+            CategoryGroupChange.version > since_version,
+            CategoryGroupChange.version <= version,
+        )
+    )
+    rows = result.all()
+    if len({v for v, _ in rows}) != version - since_version:
+        return None
+    changed: set[tuple[str, str]] = set()
+    for _, rules in rows:
+        if rules is None:
+            return None
+        changed.update((match_type, pattern) for match_type, pattern in rules)
+    return changed
+
+
+def _on_notify(connection, pid, channel, payload: str) -> None:
+    try:
+        group_part, user_part, version_part = payload.split(":")
+        invalidate(
+            uuid.UUID(group_part) if group_part else None,
+            uuid.UUID(user_part) if user_part else None,
+            int(version_part) if version_part else None,
+        )
+    except ValueError:
+        logger.warning(f"Ignoring malformed {NOTIFY_CHANNEL} payload: {payload!r}")
+
+
+async def listen_for_invalidations() -> None:
+    """Hold a LISTEN connection for the worker's lifetime, reconnecting on failure.
+
+    The cache is cleared on every (re)connect since notifications may have
+    been missed while disconnected.
+    """
+    import asyncpg
+
+    dsn = settings.database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(dsn)
+            await conn.add_listener(NOTIFY_CHANNEL, _on_notify)
+            clear()
+            logger.info(f"Listening on {NOTIFY_CHANNEL} for rule cache invalidation")
+            while not conn.is_closed():
+                await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Rule cache listener failed — retrying in 5s")
+        finally:
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        clear()
+        await asyncio.sleep(5)
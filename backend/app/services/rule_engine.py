@@ -1,65 +1,427 @@
-"""Rule engine: applies include/exclude rules to override AI-assigned categories."""
+"""Rule engine: applies include/exclude rules to override AI-assigned categories.
+
+Rules come in four match types, each optionally narrowed by an amount range
+and/or debit/credit condition:
+- "contains": case-insensitive substring (the original rule kind)
+- "wildcard": case-insensitive match of the whole description, `*` = any run
+  of characters, `?` = one character (e.g. "TIM HORTONS*")
+- "regex": case-insensitive search. Regexes and wildcards run on RE2, which
+  matches in linear time; save-time validation also rejects the constructs
+  that would backtrack catastrophically on a backtracking engine
+- "merchant": the description's canonical merchant equals the pattern's
+  ("LOBLAWS" matches "POS PURCHASE LOBLAWS #1234 TORONTO ON")
+"""
 
 import logging
+import re
+import time
+import uuid
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import NamedTuple
+
+import re2  # type: ignore[import-not-found]
 
 from app.db.models import Category
+from app.lib.aho_corasick import AhoCorasick
 from app.models.transaction import Transaction
+from app.services import rule_stats
+from app.services.merchant_canonicalizer import merchant_key
 
 logger = logging.getLogger(__name__)
 
 
+MATCH_TYPES = ("contains", "wildcard", "regex", "merchant")
+TX_TYPES = ("debit", "credit")
+
+MAX_REGEX_LENGTH = 200
+# Descriptions are capped before regex evaluation to bound worst-case cost
+_MAX_DESCRIPTION_LENGTH = 512
+
+# Backreferences and lookarounds aren't linear-time
+_UNSAFE_REGEX_RE = re.compile(r"\\[1-9]|\(\?P=|\(\?<?[=!]")
+_REPEAT_BOUNDS_RE = re.compile(r"\{(\d*)(,?)(\d*)\}")
+_WILDCARD_LITERAL_RE = re.compile(r"[^*?]+")
+
+
+def _re2_options(dot_nl: bool = False):
+    options = re2.Options()
+    options.case_sensitive = False
+    options.dot_nl = dot_nl
+    options.log_errors = False
+    return options
+
+
+_REGEX_OPTIONS = _re2_options()
+_WILDCARD_OPTIONS = _re2_options(dot_nl=True)
+
+
+def _repeats(pattern: str, i: int) -> tuple[bool, int]:
+    """Whether a quantifier at pattern[i] can repeat its atom, and the index after it."""
+    if i >= len(pattern):
+        return False, i
+    if pattern[i] in "*+":
+        return True, i + 1
+    if pattern[i] == "?":
+        return False, i + 1
+    m = _REPEAT_BOUNDS_RE.match(pattern, i)
+    if m:
+        lo, comma, hi = m.groups()
+        if not comma:
+            return int(lo or 0) > 1, m.end()
+        return not hi or int(hi) > 1, m.end()
+    return False, i
+
+
+def _ambiguous_repeat(pattern: str) -> str | None:
+    """Describe a repeated group whose body can match the same text more than one way.
+
+    That's the shape behind catastrophic backtracking: a group repeated with
+    `*`, `+` or `{n,}` / `{n}` (n > 1) whose body itself contains a quantifier
+    (`(a+)+`, `(\\w+\\s?)+`, `(.*a){12}`), an alternation (`(a|aa)+`) or an
+    optional part. Returns None for patterns without one.
+    """
+    # One frame per open group: [body has a quantifier, body has an alternation]
+    stack: list[list[bool]] = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if ch == "[":
+            # Skip the class; a leading "]" (or "^]") is a literal
+            i += 1
+            if i < len(pattern) and pattern[i] == "^":
+                i += 1
+            if i < len(pattern) and pattern[i] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+            continue
+        if ch == "(":
+            stack.append([False, False])
+            i += 1
+            if pattern.startswith("?", i):
+                # (?:…), (?i), (?P<name>…): skip the group syntax, it's not a quantifier
+                while i < len(pattern) and pattern[i] not in ":)>":
+                    i += 1
+                if i < len(pattern) and pattern[i] != ")":
+                    i += 1
+            continue
+        if ch == ")":
+            if not stack:
+                return None  # unbalanced; compile() reports it
+            has_quantifier, has_alternation = stack.pop()
+            end = i + 1
+            repeated, i = _repeats(pattern, end)
+            quantified = i > end
+            if quantified and pattern.startswith("?", i):  # lazy
+                i += 1
+            if repeated and has_alternation:
+                return "a repeated group contains an alternation (e.g. (a|aa)+)"
+            if repeated and has_quantifier:
+                return "a repeated group contains a quantifier or optional part (e.g. (a+)+ or (\\w+\\s?)+)"
+            if stack:
+                stack[-1][0] |= has_quantifier or quantified
+                stack[-1][1] |= has_alternation
+            continue
+        if ch == "|":
+            if stack:
+                stack[-1][1] = True
+            i += 1
+            continue
+        if ch in "*+?" or ch == "{" and _REPEAT_BOUNDS_RE.match(pattern, i):
+            if stack:
+                stack[-1][0] = True
+            _, i = _repeats(pattern, i)
+            if pattern.startswith("?", i):  # lazy
+                i += 1
+            continue
+        i += 1
+    return None
+
+
+def validate_rule(
+    match_type: str,
+    pattern: str,
+    min_amount: float | None = None,
+    max_amount: float | None = None,
+    tx_type: str | None = None,
+) -> None:
+    """Raise ValueError if a rule can't be compiled or evaluated safely."""
+    if match_type not in MATCH_TYPES:
+        raise ValueError(f"match_type must be one of: {', '.join(MATCH_TYPES)}")
+    if tx_type is not None and tx_type not in TX_TYPES:
+        raise ValueError("tx_type must be 'debit' or 'credit'")
+    if (min_amount is not None and min_amount < 0) or (max_amount is not None and max_amount < 0):
+        raise ValueError("Amount bounds must be positive")
+    if min_amount is not None and max_amount is not None and min_amount > max_amount:
+        raise ValueError("min_amount cannot be greater than max_amount")
+
+    if match_type == "merchant" and not merchant_key(pattern):
+        raise ValueError("Pattern has no merchant name left after removing store numbers and codes")
+
+    if match_type == "regex":
+        if len(pattern) > MAX_REGEX_LENGTH:
+            raise ValueError(f"Regex must be at most {MAX_REGEX_LENGTH} characters")
+        if _UNSAFE_REGEX_RE.search(pattern):
+            raise ValueError("Regex backreferences and lookarounds are not supported")
+        issue = _ambiguous_repeat(pattern)
+        if issue:
+            raise ValueError(f"Regex can be very slow: {issue}")
+        try:
+            re2.compile(pattern, _REGEX_OPTIONS)
+        except re2.error as exc:
+            message = exc.args[0].decode() if exc.args and isinstance(exc.args[0], bytes) else exc
+            raise ValueError(f"Invalid regex: {message}") from None
+
+
+def _wildcard_to_regex(pattern: str) -> str:
+    parts = []
+    for ch in pattern:
+        if ch == "*":
+            parts.append(".*")
+        elif ch == "?":
+            parts.append(".")
+        else:
+            parts.append(re.escape(ch))
+    return "".join(parts)
+
+
+def _condition(rule) -> tuple[float | None, float | None, str | None] | None:
+    if rule.min_amount is None and rule.max_amount is None and rule.tx_type is None:
+        return None
+    return (rule.min_amount, rule.max_amount, rule.tx_type)
+
+
+def _condition_holds(cond, amount: float | None, tx_type: str | None) -> bool:
+    if cond is None:
+        return True
+    lo, hi, kind = cond
+    if kind is not None and tx_type != kind:
+        return False
+    if lo is not None or hi is not None:
+        if amount is None:
+            return False
+        amount = abs(amount)
+        if lo is not None and amount < lo:
+            return False
+        if hi is not None and amount > hi:
+            return False
+    return True
+
+
+class Decision(NamedTuple):
+    category: str
+    rule_id: object  # the include rule that assigned the category (None for id-less rules)
+    blocked_by: tuple  # exclude rules that knocked out higher-priority categories
+
+
+@dataclass
+class RuleTrace:
+    """Filled in by apply_rules(..., trace=RuleTrace()): the decision behind each rule hit."""
+    decisions: list[tuple[int, Decision]] = field(default_factory=list)  # (transaction index, decision)
+    elapsed_ms: float = 0.0
+
+
+class CompiledRules:
+    """A category group's rules compiled into a single evaluator.
+
+    Substring patterns — plus the longest literal of each wildcard, used as a
+    trigger — go into one Aho-Corasick automaton, so each description is scanned
+    once. Wildcard regexes are only evaluated when their literal is present,
+    regex rules sit behind one combined alternation that rejects most
+    descriptions in a single search, and merchant rules are a dict lookup on
+    the canonical merchant key. The winner is the first category by
+    sort_order with an include hit and no exclude hit — the same result as
+    checking each category's rules in turn.
+    """
+
+    def __init__(self, categories: list[Category], group_id: uuid.UUID | None = None):
+        self.group_id = group_id
+        self.rule_patterns: dict[object, str] = {}  # rule id → pattern, for traces
+        # Stable sort keeps input order for equal sort_order, like the original loop
+        sorted_cats = [c for c in sorted(categories, key=lambda c: c.sort_order) if c.rules]
+        self.category_names = [c.name for c in sorted_cats]
+
+        patterns: list[str] = []
+        # automaton pattern index → (category rank, is_include, condition, rule id, verifying regex or None)
+        self._targets: list[tuple] = []
+        # rules evaluated by regex only (regexes, and wildcards with no literal)
+        self._regex_targets: list[tuple] = []
+        # canonical merchant key → [(category rank, is_include, condition, rule id)]
+        self._merchant_targets: dict[str, list[tuple]] = {}
+        for rank, cat in enumerate(sorted_cats):
+            for rule in cat.rules:
+                if rule.rule_type not in ("include", "exclude"):
+                    continue
+                is_include = rule.rule_type == "include"
+                cond = _condition(rule)
+                rule_id = getattr(rule, "id", None)
+                self.rule_patterns[rule_id] = rule.pattern
+                match_type = rule.match_type or "contains"
+                if match_type == "contains":
+                    patterns.append(rule.pattern.lower())
+                    self._targets.append((rank, is_include, cond, rule_id, None))
+                elif match_type == "wildcard":
+                    compiled = re2.compile(_wildcard_to_regex(rule.pattern.lower()), _WILDCARD_OPTIONS)
+                    literal = max(_WILDCARD_LITERAL_RE.findall(rule.pattern.lower()), key=len, default="")
+                    if literal:
+                        patterns.append(literal)
+                        self._targets.append((rank, is_include, cond, rule_id, compiled))
+                    else:
+                        self._regex_targets.append((rank, is_include, cond, rule_id, compiled, True))
+                elif match_type == "regex":
+                    compiled = re2.compile(rule.pattern, _REGEX_OPTIONS)
+                    self._regex_targets.append((rank, is_include, cond, rule_id, compiled, False))
+                elif match_type == "merchant":
+                    key = merchant_key(rule.pattern)
+                    if key:
+                        self._merchant_targets.setdefault(key, []).append((rank, is_include, cond, rule_id))
+        self._automaton = AhoCorasick(patterns)
+
+        # One alternation over all regex rules: no match here means no regex rule matches.
+        # Anchored wildcards match the whole (uncapped) description, so they aren't in it.
+        self._regex_any = None
+        regex_sources = [f"(?:{t[4].pattern})" for t in self._regex_targets if not t[5]]
+        if regex_sources:
+            try:
+                self._regex_any = re2.compile("|".join(regex_sources), _REGEX_OPTIONS)
+            except Exception:
+                self._regex_any = None
+
+    def _hits(
+        self,
+        description: str,
+        amount: float | None,
+        tx_type: str | None,
+    ) -> tuple[dict[int, object], dict[int, object]]:
+        """Category rank → first matching include rule id, and the same for exclude rules."""
+        desc_lower = description.lower()
+        included: dict[int, object] = {}
+        excluded: dict[int, object] = {}
+
+        for idx in self._automaton.find_all(desc_lower):
+            rank, is_include, cond, rule_id, verify = self._targets[idx]
+            if verify is not None and not verify.fullmatch(desc_lower):
+                continue
+            if _condition_holds(cond, amount, tx_type):
+                (included if is_include else excluded).setdefault(rank, rule_id)
+
+        if self._regex_targets:
+            capped = description[:_MAX_DESCRIPTION_LENGTH]
+            any_regex = self._regex_any is None or self._regex_any.search(capped)
+            for rank, is_include, cond, rule_id, compiled, anchored in self._regex_targets:
+                if anchored:
+                    hit = compiled.fullmatch(desc_lower)
+                else:
+                    hit = any_regex and compiled.search(capped)
+                if hit and _condition_holds(cond, amount, tx_type):
+                    (included if is_include else excluded).setdefault(rank, rule_id)
+
+        if self._merchant_targets:
+            for rank, is_include, cond, rule_id in self._merchant_targets.get(merchant_key(description), ()):
+                if _condition_holds(cond, amount, tx_type):
+                    (included if is_include else excluded).setdefault(rank, rule_id)
+
+        return included, excluded
+
+    def match(
+        self,
+        description: str,
+        amount: float | None = None,
+        tx_type: str | None = None,
+    ) -> str | None:
+        """Return the winning category name for a transaction, or None."""
+        included, excluded = self._hits(description, amount, tx_type)
+        candidates = included.keys() - excluded.keys()
+        return self.category_names[min(candidates)] if candidates else None
+
+    def decide(
+        self,
+        description: str,
+        amount: float | None = None,
+        tx_type: str | None = None,
+    ) -> Decision | None:
+        """Like match(), plus the deciding include rule and the exclude rules that overrode
+        higher-priority categories. None when no include rule survives."""
+        included, excluded = self._hits(description, amount, tx_type)
+        candidates = included.keys() - excluded.keys()
+        if not candidates:
+            return None
+        rank = min(candidates)
+        blocked_by = tuple(excluded[r] for r in sorted(included.keys() & excluded.keys()) if r < rank)
+        return Decision(self.category_names[rank], included[rank], blocked_by)
+
+
+def compile_rules(categories: list[Category], group_id: uuid.UUID | None = None) -> CompiledRules:
+    return CompiledRules(categories, group_id)
+
+
+def compile_patterns(patterns: Iterable[tuple[str, str]]) -> CompiledRules:
+    """Matcher that hits when any of the (match_type, pattern)s matches, ignoring conditions.
+
+    Used to find the transactions a set of changed rules could affect.
+    """
+    rules = [
+        SimpleNamespace(
+            rule_type="include", pattern=pattern, match_type=match_type,
+            min_amount=None, max_amount=None, tx_type=None,
+        )
+        for match_type, pattern in patterns
+    ]
+    return CompiledRules([SimpleNamespace(name="changed", sort_order=0, rules=rules)])
+
+
 def apply_rules(
     transactions: list[Transaction],
-    categories: list[Category],
+    categories: list[Category] | CompiledRules,
     reprocess: bool = False,
+    trace: RuleTrace | None = None,
 ) -> list[Transaction]:
     """Apply category rules as post-processing overrides on AI-categorized transactions.
 
     For each transaction:
     1. Iterate categories by sort_order
-    2. If any exclude rule matches the description → skip this category
+    2. If any exclude rule matches the transaction → skip this category
     3. If any include rule matches → override AI category, mark source as "rule"
     4. First match wins
     5. If no rule matches → keep existing category/source unchanged
 
     When reprocess=True, skip transactions marked as "manual".
+    Accepts either the group's categories or an already-compiled rule set.
+    Deciding rules are counted in rule_stats; pass `trace` to also get the
+    per-transaction decisions and the evaluation time.
     """
-    # Pre-sort categories by sort_order
-    sorted_cats = sorted(categories, key=lambda c: c.sort_order)
+    compiled = categories if isinstance(categories, CompiledRules) else compile_rules(categories)
 
-    for tx in transactions:
+    start = time.perf_counter()
+    hits: Counter = Counter()
+    for i, tx in enumerate(transactions):
         # During reprocessing, never touch manually-set categories
         if reprocess and tx.category_source == "manual":
             continue
 
-        desc_lower = tx.description.lower()
-
-        for cat in sorted_cats:
-            if not cat.rules:
-                continue
-
-            # Check exclude rules first
-            excluded = any(
-                rule.pattern.lower() in desc_lower
-                for rule in cat.rules
-                if rule.rule_type == "exclude"
-            )
-            if excluded:
-                continue
-
-            # Check include rules
-            included = any(
-                rule.pattern.lower() in desc_lower
-                for rule in cat.rules
-                if rule.rule_type == "include"
+        decision = compiled.decide(tx.description, tx.amount, tx.type)
+        if decision is not None:
+            logger.debug(
+                "Rule match: '%s' → '%s' (was '%s')",
+                tx.description[:50], decision.category, tx.category,
             )
-            if included:
-                logger.debug(
-                    "Rule match: '%s' → '%s' (was '%s')",
-                    tx.description[:50], cat.name, tx.category,
-                )
-                tx.category = cat.name
-                tx.category_source = "rule"
-                break
+            tx.category = decision.category
+            tx.category_source = "rule"
+            hits[decision.rule_id] += 1
+            hits.update(decision.blocked_by)
+            if trace is not None:
+                trace.decisions.append((i, decision))
 
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if trace is not None:
+        trace.elapsed_ms = elapsed_ms
+    rule_stats.record_hits(hits)
+    rule_stats.record_evaluation(compiled.group_id, len(transactions), elapsed_ms)
     return transactions
@@ -0,0 +1,141 @@
+"""Per-rule hit counters and per-group rule evaluation timing.
+
+apply_rules reports which rule decided each transaction (and which exclude
+rules overrode a higher-priority category) plus how long the group took to
+evaluate. Counts are aggregated in memory and flushed to category_rules /
+category_groups in batches by a background task, so the hot path never
+touches the database. Unflushed counts are lost on a hard crash — these are
+usage statistics, not billing data.
+"""
+
+import asyncio
+import logging
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+_FLUSH_SECONDS = 30
+
+_lock = threading.Lock()
+_rule_hits: Counter[uuid.UUID] = Counter()
+_rule_last_hit: dict[uuid.UUID, datetime] = {}
+# group id → [evaluations, transactions, total ms, max ms]
+_group_evals: dict[uuid.UUID, list[float]] = {}
+
+
+def record_hits(hits: Counter) -> None:
+    """Add rule id → hit count. Id-less rules (None) are ignored."""
+    hits.pop(None, None)
+    if not hits:
+        return
+    now = datetime.utcnow()
+    with _lock:
+        _rule_hits.update(hits)
+        for rule_id in hits:
+            _rule_last_hit[rule_id] = now
+
+
+def record_evaluation(group_id: uuid.UUID | None, transactions: int, elapsed_ms: float) -> None:
+    metrics.incr("rules.evaluations")
+    metrics.incr("rules.transactions", transactions)
+    if group_id is None:
+        return
+    with _lock:
+        entry = _group_evals.get(group_id)
+        if entry is None:
+            _group_evals[group_id] = [1, transactions, elapsed_ms, elapsed_ms]
+        else:
+            entry[0] += 1
+            entry[1] += transactions
+            entry[2] += elapsed_ms
+            entry[3] = max(entry[3], elapsed_ms)
+
+
+def pending_hits(rule_ids) -> dict[uuid.UUID, int]:
+    """Hits recorded in this worker but not flushed yet, for the given rules."""
+    with _lock:
+        return {rule_id: _rule_hits[rule_id] for rule_id in rule_ids if rule_id in _rule_hits}
+
+
+def _take() -> tuple[Counter, dict, dict]:
+    global _rule_hits, _rule_last_hit, _group_evals
+    with _lock:
+        taken = (_rule_hits, _rule_last_hit, _group_evals)
+        _rule_hits, _rule_last_hit, _group_evals = Counter(), {}, {}
+    return taken
+
+
+def _restore(hits: Counter, last_hit: dict, evals: dict) -> None:
+    with _lock:
+        _rule_hits.update(hits)
+        for rule_id, at in last_hit.items():
+            _rule_last_hit[rule_id] = max(at, _rule_last_hit.get(rule_id, at))
+        for group_id, (n, txs, total, peak) in evals.items():
+            entry = _group_evals.setdefault(group_id, [0, 0, 0.0, 0.0])
+            entry[0] += n
+            entry[1] += txs
+            entry[2] += total
+            entry[3] = max(entry[3], peak)
+
+
+async def flush() -> None:
+    """Write aggregated counts in two statements; on failure they're kept for the next flush."""
+    from app.db.engine import async_session_factory
+
+    hits, last_hit, evals = _take()
+    if async_session_factory is None or not (hits or evals):
+        return
+    try:
+        async with async_session_factory() as session:
+            if hits:
+                ids = list(hits)
+                await session.execute(
+                    text(
+                        "UPDATE category_rules AS r SET hit_count = r.hit_count + v.n, "
+                        "last_hit_at = GREATEST(r.last_hit_at, v.at) "
+                        "FROM unnest(CAST(:ids AS uuid[]), CAST(:counts AS integer[]), CAST(:ats AS timestamp[])) "
+                        "AS v(id, n, at) WHERE r.id = v.id"
+                    ),
+                    {"ids": ids, "counts": [hits[i] for i in ids], "ats": [last_hit[i] for i in ids]},
+                )
+            if evals:
+                ids = list(evals)
+                await session.execute(
+                    text(
+                        "UPDATE category_groups AS g SET rule_eval_count = g.rule_eval_count + v.n, "
+                        "rule_eval_transactions = g.rule_eval_transactions + v.txs, "
+                        "rule_eval_ms_total = g.rule_eval_ms_total + v.total, "
+                        "rule_eval_ms_max = GREATEST(g.rule_eval_ms_max, v.peak) "
+                        "FROM unnest(CAST(:ids AS uuid[]), CAST(:n AS integer[]), CAST(:txs AS integer[]), "
+                        "CAST(:total AS double precision[]), CAST(:peak AS double precision[])) "
+                        "AS v(id, n, txs, total, peak) WHERE g.id = v.id"
+                    ),
+                    {
+                        "ids": ids,
+                        "n": [int(evals[i][0]) for i in ids],
+                        "txs": [int(evals[i][1]) for i in ids],
+                        "total": [evals[i][2] for i in ids],
+                        "peak": [evals[i][3] for i in ids],
+                    },
+                )
+            await session.commit()
+    except Exception:
+        logger.exception("Rule stats flush failed — keeping counts for the next attempt")
+        _restore(hits, last_hit, evals)
+
+
+async def flush_periodically() -> None:
+    """Flush every _FLUSH_SECONDS for the worker's lifetime, and once more on shutdown."""
+    try:
+        while True:
+            await asyncio.sleep(_FLUSH_SECONDS)
+            await flush()
+    finally:
+        await flush()
@@ -0,0 +1,206 @@
+"""Token-reducing compaction of extracted statement text before it reaches the LLM.
+
+Stages (all lossless for transaction content):
+1. Trim layout padding — `extract_text(layout=True)` pads columns with long
+   runs of spaces. Character columns that are blank on every line of the page
+   are narrowed to two, so the withdrawal/deposit/balance columns stay aligned.
+2. Drop free-text lines already covered by the same page's table rows
+   (pdf_service emits both the table rows and `extract_text()` for a page):
+   the free-text copy of a row (same words and numbers, in order), and
+   date- and amount-free lines made only of the table's words.
+3. Drop header and footer lines that repeat verbatim across pages (bank
+   letterhead, column headers, legal boilerplate), keeping the first
+   occurrence so statement-level context such as the period and the
+   column-header line survives.
+
+Apart from those free-text copies of table rows, lines with a date or a
+monetary amount are never dropped, and neither is anything from a page's
+first transaction row through the continuation lines of its last one.
+"""
+
+import logging
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from app.services import metrics
+from app.services.validation_service import AMOUNT_RE, DATE_RE
+
+logger = logging.getLogger(__name__)
+
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_TOKEN_RE = re.compile(r"\w+")
+TABLE_CELL_SEPARATOR = " | "
+# Between pages in the joined text, so the parser can window by page
+PAGE_BREAK = "\n\f\n"
+
+# Blank character columns kept between two text columns
+_COLUMN_GAP = 2
+
+# A line is boilerplate if it appears on at least this fraction of pages
+_REPEAT_PAGE_RATIO = 0.5
+
+
+@dataclass
+class CompactionResult:
+    text: str
+    original_chars: int
+    compacted_chars: int
+    dropped_lines: int
+
+    @property
+    def tokens_saved(self) -> int:
+        """Estimated prompt tokens saved (~4 characters per token)."""
+        return max(0, self.original_chars - self.compacted_chars) // 4
+
+
+def collapse_whitespace(text: str) -> str:
+    """Narrow runs of character columns that are blank on every line to two spaces.
+
+    The same columns are removed from every line, so text that lines up in the
+    original still lines up afterwards.
+    """
+    lines = [line.expandtabs().rstrip() for line in text.splitlines()]
+    width = max(map(len, lines), default=0)
+    blank = [True] * width
+    for line in lines:
+        for i, ch in enumerate(line):
+            if ch != " ":
+                blank[i] = False
+
+    # Kept (start, end) column ranges: text columns plus _COLUMN_GAP of each gap
+    # between them; leading and trailing gaps go entirely
+    spans: list[tuple[int, int]] = []
+    i = 0
+    while i < width:
+        j = i
+        while j < width and blank[j] == blank[i]:
+            j += 1
+        if not blank[i]:
+            spans.append((i, j))
+        elif spans and j < width:
+            spans.append((i, min(j, i + _COLUMN_GAP)))
+        i = j
+
+    if spans != [(0, width)]:
+        lines = ["".join(line[a:b] for a, b in spans).rstrip() for line in lines]
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip("\n")
+
+
+def _is_protected(line: str) -> bool:
+    return bool(DATE_RE.search(line) or AMOUNT_RE.search(line))
+
+
+def _is_row(line: str) -> bool:
+    """A dated transaction row: a date and a monetary amount on one line."""
+    return bool(DATE_RE.search(line) and AMOUNT_RE.search(line))
+
+
+def _dedupe_table_text(page: str) -> tuple[list[str], int]:
+    """Drop free-text lines the page's table rows already cover.
+
+    A line whose tokens equal a table row's tokens is that row's free-text
+    copy; each row accounts for one copy. Other lines go only if they have no
+    date or amount and all their words appear in the table.
+    """
+    lines = page.splitlines()
+    rows: Counter[tuple[str, ...]] = Counter(
+        tuple(_TOKEN_RE.findall(line.lower())) for line in lines if TABLE_CELL_SEPARATOR in line
+    )
+    if not rows:
+        return lines, 0
+    table_tokens = {tok for row in rows for tok in row}
+
+    kept: list[str] = []
+    dropped = 0
+    for line in lines:
+        if TABLE_CELL_SEPARATOR not in line:
+            tokens = _TOKEN_RE.findall(line.lower())
+            key = tuple(tokens)
+            if key and rows[key] > 0:
+                rows[key] -= 1
+                dropped += 1
+                continue
+            if not _is_protected(line) and len(tokens) >= 2 and all(t in table_tokens for t in tokens):
+                dropped += 1
+                continue
+        kept.append(line)
+    return kept, dropped
+
+
+def _edge_zones(lines: list[str]) -> tuple[int, int]:
+    """(end of the header zone, start of the footer zone) as line indexes.
+
+    The header zone is everything before the first transaction row, the
+    footer zone everything after the last row's continuation lines (which
+    run to the next blank line). A page with no rows is all header.
+    """
+    rows = [i for i, line in enumerate(lines) if _is_row(line)]
+    if not rows:
+        return len(lines), len(lines)
+    footer = rows[-1] + 1
+    while footer < len(lines) and lines[footer].strip():
+        footer += 1
+    return rows[0], footer
+
+
+def _repeat_key(line: str) -> str:
+    # Exact text; only the column padding (which differs between pages) is ignored
+    return " ".join(line.split())
+
+
+def compact_pages(pages: list[str]) -> CompactionResult:
+    """Compact per-page text and join it into a single prompt-ready string."""
+    original_chars = sum(len(p) for p in pages) + 2 * max(0, len(pages) - 1)
+
+    page_lines: list[list[str]] = []
+    dropped = 0
+    for page in pages:
+        lines, n = _dedupe_table_text(collapse_whitespace(page))
+        page_lines.append(lines)
+        dropped += n
+
+    if len(page_lines) >= 2:
+        threshold = max(2, math.ceil(len(page_lines) * _REPEAT_PAGE_RATIO))
+        edge_lines: list[set[int]] = []
+        page_counts: Counter[str] = Counter()
+        for lines in page_lines:
+            header_end, footer_start = _edge_zones(lines)
+            edges = {
+                i for i in [*range(header_end), *range(footer_start, len(lines))]
+                if lines[i].strip() and not _is_protected(lines[i])
+            }
+            edge_lines.append(edges)
+            page_counts.update({_repeat_key(lines[i]) for i in edges})
+        repeated = {k for k, c in page_counts.items() if c >= threshold}
+
+        seen: set[str] = set()
+        for p, lines in enumerate(page_lines):
+            kept = []
+            for i, line in enumerate(lines):
+                key = _repeat_key(line)
+                if i in edge_lines[p] and key in repeated:
+                    if key in seen:
+                        dropped += 1
+                        continue
+                    seen.add(key)
+                kept.append(line)
+            page_lines[p] = kept
+
+    text = PAGE_BREAK.join(
+        _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip("\n") for lines in page_lines
+    )
+    result = CompactionResult(
+        text=text,
+        original_chars=original_chars,
+        compacted_chars=len(text),
+        dropped_lines=dropped,
+    )
+    metrics.incr("compaction.chars_in", result.original_chars)
+    metrics.incr("compaction.chars_out", result.compacted_chars)
+    logger.info(
+        f"Compacted {result.original_chars} → {result.compacted_chars} chars "
+        f"({dropped} lines dropped, ~{result.tokens_saved} tokens saved)"
+    )
+    return result
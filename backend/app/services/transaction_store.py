@@ -0,0 +1,163 @@
+"""Server-side copy of an upload's parsed statements and transactions.
+
+After /upload, each statement becomes a `statements` row and its transactions
+are written to `transactions` keyed by (upload_id, seq), where seq is the row's
+position across the upload. On Postgres (asyncpg) the rows go in with a single
+COPY; other drivers fall back to a multi-row INSERT. Reads page by seq, so a
+page is one index range scan however deep the client is into the upload.
+"""
+
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.db.models import Statement, StoredTransaction, Upload
+from app.models.transaction import StatementResult, Transaction
+
+_COLUMNS = (
+    "upload_id", "seq", "statement_id", "date", "posting_date", "description",
+    "amount", "type", "balance", "category", "category_source",
+)
+
+
+async def save(session: AsyncSession, upload_id: uuid.UUID, statements: list[StatementResult]) -> int:
+    """Store the upload's statements and transactions (uncommitted). Returns rows written."""
+    now = datetime.utcnow()
+    statement_rows = []
+    records = []
+    seq = 0
+    for position, result in enumerate(statements):
+        statement_id = uuid.uuid4()
+        statement_rows.append({
+            "id": statement_id,
+            "upload_id": upload_id,
+            "position": position,
+            "filename": result.filename,
+            "transaction_count": len(result.transactions),
+            "total_debits": result.total_debits,
+            "total_credits": result.total_credits,
+            "page_count": result.page_count,
+            "actual_pages": result.actual_pages,
+            "processing_type": result.processing_type,
+            "created_at": now,
+        })
+        for tx in result.transactions:
+            records.append((
+                upload_id, seq, statement_id, tx.date, tx.posting_date, tx.description,
+                tx.amount, tx.type, tx.balance, tx.category, tx.category_source,
+            ))
+            seq += 1
+
+    if not statement_rows:
+        return 0
+    # The statements insert also opens the transaction the COPY below joins
+    await session.execute(insert(Statement), statement_rows)
+    if not records:
+        return 0
+
+    connection = await session.connection()
+    if connection.dialect.driver == "asyncpg":
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            StoredTransaction.__tablename__, records=records, columns=_COLUMNS,
+        )
+    else:
+        await session.execute(insert(StoredTransaction), [dict(zip(_COLUMNS, r)) for r in records])
+    return len(records)
+
+
+async def get_upload(session: AsyncSession, upload_id: uuid.UUID, org_id: uuid.UUID) -> Upload | None:
+    """The upload if it belongs to the org."""
+    upload = await session.get(Upload, upload_id)
+    if upload is None or upload.org_id != org_id:
+        return None
+    return upload
+
+
+async def statements(session: AsyncSession, upload_id: uuid.UUID) -> list[Statement]:
+    result = await session.execute(
+        select(Statement).where(Statement.upload_id == upload_id).order_by(Statement.position)
+    )
+    return list(result.scalars().all())
+
+
+# Column-only reads: no ORM identity map entries for tens of thousands of rows
+_READ_COLUMNS = (
+    StoredTransaction.seq, StoredTransaction.statement_id, StoredTransaction.date,
+    StoredTransaction.posting_date, StoredTransaction.description, StoredTransaction.amount,
+    StoredTransaction.type, StoredTransaction.balance, StoredTransaction.category,
+    StoredTransaction.category_source,
+)
+
+
+def _to_transaction(row, filenames: dict[uuid.UUID, str]) -> Transaction:
+    return Transaction(
+        date=row.date,
+        posting_date=row.posting_date,
+        description=row.description,
+        amount=row.amount,
+        type=row.type,
+        balance=row.balance,
+        category=row.category,
+        category_source=row.category_source,
+        source=filenames.get(row.statement_id),
+    )
+
+
+async def page(
+    session: AsyncSession,
+    upload_id: uuid.UUID,
+    after: int = -1,
+    limit: int = 500,
+    statement_id: uuid.UUID | None = None,
+) -> list[tuple[int, Transaction]]:
+    """Up to `limit` (seq, transaction) pairs with seq > `after`, in upload order."""
+    query = select(*_READ_COLUMNS).where(
+        StoredTransaction.upload_id == upload_id, StoredTransaction.seq > after,
+    )
+    if statement_id is not None:
+        query = query.where(StoredTransaction.statement_id == statement_id)
+    rows = (await session.execute(query.order_by(StoredTransaction.seq).limit(limit))).all()
+    filenames = {s.id: s.filename for s in await statements(session, upload_id)}
+    return [(row.seq, _to_transaction(row, filenames)) for row in rows]
+
+
+async def load(session: AsyncSession, upload_id: uuid.UUID) -> list[Transaction]:
+    """Every transaction of the upload, in upload order (list index == seq)."""
+    filenames = {s.id: s.filename for s in await statements(session, upload_id)}
+    result = await session.execute(
+        select(*_READ_COLUMNS).where(StoredTransaction.upload_id == upload_id).order_by(StoredTransaction.seq)
+    )
+    return [_to_transaction(row, filenames) for row in result.all()]
+
+
+async def update_categories(
+    session: AsyncSession,
+    upload_id: uuid.UUID,
+    updates: list[tuple[int, str, str]],
+) -> list[Transaction]:
+    """Set (seq, category, category_source) on stored rows in one statement (uncommitted).
+
+    Returns the updated rows (without `source`), e.g. for merchant memory.
+    """
+    if not updates:
+        return []
+    result = await session.execute(
+        text(
+            "UPDATE transactions AS t SET category = v.category, category_source = v.source "
+            "FROM unnest(CAST(:seqs AS integer[]), CAST(:categories AS text[]), CAST(:sources AS text[])) "
+            "AS v(seq, category, source) WHERE t.upload_id = :upload_id AND t.seq = v.seq "
+            "RETURNING t.seq, t.statement_id, t.date, t.posting_date, t.description, t.amount, t.type, "
+            "t.balance, t.category, t.category_source"
+        ),
+        {
+            "upload_id": upload_id,
+            "seqs": [u[0] for u in updates],
+            "categories": [u[1] for u in updates],
+            "sources": [u[2] for u in updates],
+        },
+    )
+    return [_to_transaction(row, {}) for row in result.all()]
@@ -0,0 +1,89 @@
+"""Atomic increments of an organization's usage counters.
+
+Each request adds to the counters with one `UPDATE … SET col = col + :n`, so
+concurrent uploads and exports from the same org (across workers) can't lose
+each other's increments the way a read-modify-write of the ORM row does, and
+the row is locked only for that statement. The upload update also deducts
+bonus pages and returns the new counters in the same round-trip.
+"""
+
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.transaction import UsageStats
+
+_USAGE_COLUMNS = (
+    "total_uploads", "total_documents", "total_pages", "total_actual_pages", "total_text_pages",
+    "total_image_pages", "total_transactions", "total_exports", "total_bytes_processed",
+    "month_uploads", "month_documents", "month_pages", "month_actual_pages", "month_text_pages",
+    "month_image_pages", "month_transactions", "month_exports", "month_bytes_processed",
+    "page_limit", "bonus_pages", "plan",
+)
+
+# SET expressions all read the row as it was before the update, so the bonus
+# deduction sees the old month_pages: it covers the part of this upload that's
+# over page_limit, capped by the upload's pages and the bonus left.
+_RECORD_UPLOAD = text(
+    "UPDATE organizations SET "
+    "total_uploads = total_uploads + 1, "
+    "total_documents = total_documents + :documents, "
+    "total_pages = total_pages + :pages, "
+    "total_actual_pages = total_actual_pages + :actual_pages, "
+    "total_text_pages = total_text_pages + :text_pages, "
+    "total_image_pages = total_image_pages + :image_pages, "
+    "total_transactions = total_transactions + :transactions, "
+    "total_bytes_processed = total_bytes_processed + :bytes, "
+    "month_uploads = month_uploads + 1, "
+    "month_documents = month_documents + :documents, "
+    "month_pages = month_pages + :pages, "
+    "month_actual_pages = month_actual_pages + :actual_pages, "
+    "month_text_pages = month_text_pages + :text_pages, "
+    "month_image_pages = month_image_pages + :image_pages, "
+    "month_transactions = month_transactions + :transactions, "
+    "month_bytes_processed = month_bytes_processed + :bytes, "
+    "bonus_pages = bonus_pages - CASE WHEN page_limit IS NULL THEN 0 "
+    "ELSE LEAST(GREATEST(month_pages + :pages - page_limit, 0), :pages, bonus_pages) END "
+    f"WHERE id = :org_id RETURNING {', '.join(_USAGE_COLUMNS)}"
+)
+
+_RECORD_EXPORT = text(
+    "UPDATE organizations SET total_exports = total_exports + 1, month_exports = month_exports + 1 "
+    "WHERE id = :org_id"
+)
+
+
+async def record_upload(
+    session: AsyncSession,
+    org_id: uuid.UUID,
+    *,
+    documents: int,
+    pages: int,
+    actual_pages: int,
+    text_pages: int,
+    image_pages: int,
+    transactions: int,
+    bytes_processed: int,
+) -> UsageStats | None:
+    """Count one upload against the org (uncommitted). Returns the updated usage, or None if there's no org."""
+    result = await session.execute(
+        _RECORD_UPLOAD,
+        {
+            "org_id": org_id,
+            "documents": documents,
+            "pages": pages,
+            "actual_pages": actual_pages,
+            "text_pages": text_pages,
+            "image_pages": image_pages,
+            "transactions": transactions,
+            "bytes": bytes_processed,
+        },
+    )
+    row = result.mappings().first()
+    return UsageStats(**row) if row is not None else None
+
+
+async def record_export(session: AsyncSession, org_id: uuid.UUID) -> None:
+    """Count one export against the org (uncommitted)."""
+    await session.execute(_RECORD_EXPORT, {"org_id": org_id})
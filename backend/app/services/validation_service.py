@@ -0,0 +1,117 @@
+"""Sanity checks on LLM-extracted transactions, used to decide cascade escalation."""
+
+import re
+from datetime import date
+
+from app.config import settings
+from app.models.transaction import Transaction
+
+# A line that looks like a transaction row: a date followed somewhere by a monetary amount
+DATE_RE = re.compile(
+    r"\b(\d{4}-\d{2}-\d{2}|\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?|"
+    r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+\d{1,2}|"
+    r"\d{1,2}\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*)\b",
+    re.IGNORECASE,
+)
+AMOUNT_RE = re.compile(r"-?\$?\d{1,3}(?:,\d{3})*\.\d{2}\b")
+
+# Below this many row-like lines, an empty result is plausible (summary page, blank scan)
+_MIN_ROWS_FOR_NONEMPTY = 3
+
+
+def count_row_like_lines(text: str) -> int:
+    """Count lines containing both a date and a monetary amount."""
+    return sum(
+        1 for line in text.splitlines()
+        if DATE_RE.search(line) and AMOUNT_RE.search(line)
+    )
+
+
+def validate_transactions(
+    transactions: list[Transaction],
+    source_text: str | None = None,
+) -> list[str]:
+    """Return a list of human-readable issues; an empty list means the output looks sane.
+
+    Checks:
+    1. Non-empty output when the source text clearly contains transaction rows
+    2. Dates are valid ISO dates and (mostly) ordered, ascending or descending
+    3. Amounts are positive, types are debit/credit, and amounts aren't the balance column
+    4. Running balances are continuous under one debit/credit sign convention
+    """
+    issues: list[str] = []
+
+    if not transactions:
+        if source_text and count_row_like_lines(source_text) >= _MIN_ROWS_FOR_NONEMPTY:
+            issues.append("empty result but source text contains transaction rows")
+        return issues
+
+    max_ratio = settings.cascade_max_error_ratio
+    n = len(transactions)
+
+    # Dates
+    parsed: list[date] = []
+    for tx in transactions:
+        try:
+            parsed.append(date.fromisoformat(tx.date))
+        except ValueError:
+            issues.append(f"invalid date '{tx.date}'")
+            break
+    if len(parsed) == n and n > 1:
+        backwards = sum(1 for a, b in zip(parsed, parsed[1:]) if b < a)
+        forwards = sum(1 for a, b in zip(parsed, parsed[1:]) if b > a)
+        disorder = min(backwards, forwards)
+        if disorder / (n - 1) > max_ratio:
+            issues.append(f"{disorder} out-of-order dates")
+
+    # Amount / type / column sanity
+    bad_amounts = sum(1 for tx in transactions if tx.amount <= 0)
+    if bad_amounts / n > max_ratio:
+        issues.append(f"{bad_amounts} non-positive amounts")
+    bad_types = sum(1 for tx in transactions if tx.type not in ("debit", "credit"))
+    if bad_types:
+        issues.append(f"{bad_types} transactions with invalid type")
+    amount_is_balance = sum(
+        1 for tx in transactions
+        if tx.balance is not None and abs(tx.amount - tx.balance) < 0.005
+    )
+    if n > 1 and amount_is_balance / n > max_ratio:
+        issues.append(f"{amount_is_balance} amounts equal their balance (column confusion)")
+
+    # Balance continuity
+    breaks, checked = _balance_breaks(transactions)
+    if checked and breaks / checked > max_ratio:
+        issues.append(f"{breaks} of {checked} running balances are discontinuous")
+
+    return issues
+
+
+def _balance_breaks(transactions: list[Transaction]) -> tuple[int, int]:
+    """Return (breaks, checked) for the best-fitting balance convention.
+
+    Chequing balances fall on debits, credit card balances rise on debits, and
+    some statements list newest first — try all four combinations and keep the
+    one with the fewest discontinuities. Rows without a balance accumulate into
+    the next balance-bearing row.
+    """
+    tolerance = settings.cascade_balance_tolerance
+    best: tuple[int, int] | None = None
+    for ordered in (transactions, transactions[::-1]):
+        for debit_sign in (-1, 1):
+            breaks = checked = 0
+            running: float | None = None
+            pending = 0.0
+            for tx in ordered:
+                delta = tx.amount * (debit_sign if tx.type == "debit" else -debit_sign)
+                if tx.balance is None:
+                    pending += delta
+                    continue
+                if running is not None:
+                    checked += 1
+                    if abs(running + pending + delta - tx.balance) > tolerance:
+                        breaks += 1
+                running = tx.balance
+                pending = 0.0
+            if best is None or breaks < best[0]:
+                best = (breaks, checked)
+    return best or (0, 0)
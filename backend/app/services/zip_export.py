@@ -0,0 +1,167 @@
+"""Streaming ZIP export: one CSV or XLSX per statement plus a summary.
+
+Transactions are grouped by their source file (Transaction.source, which is
+the statement filename for both client-sent and stored uploads) and each group
+becomes one archive member. Members are rendered in a process pool — the
+exporters are CPU-bound Python, so threads would serialise on the GIL — with
+a bounded window of renders in flight, and written to the archive in order as
+they complete. The archive itself is written to a sink that's drained after
+every member, so the response streams and never holds more than the window's
+rendered members.
+"""
+
+import csv
+import io
+import logging
+import multiprocessing
+import os
+import re
+import zipfile
+from collections.abc import Iterator
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from datetime import datetime
+
+from app.config import settings
+from app.models.transaction import Transaction, TransactionRow
+
+logger = logging.getLogger(__name__)
+
+MEMBER_FORMATS = ("csv", "xlsx")
+SUMMARY_NAME = "summary.csv"
+
+_executor: Executor | None = None
+
+
+def _pool() -> Executor | None:
+    global _executor
+    if settings.export_zip_workers <= 0:
+        return None
+    if _executor is None:
+        # spawn: the server process has threads and an event loop, which fork doesn't copy safely
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.export_zip_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _pack(transactions: list[Transaction]) -> list[tuple]:
+    """Plain tuples for the trip to a worker — far cheaper to pickle than models."""
+    return [tuple(getattr(tx, name) for name in TransactionRow.__slots__) for tx in transactions]
+
+
+def _render(member_format: str, packed: list[tuple]) -> bytes:
+    """Runs in a worker: one member file from packed rows."""
+    from app.services.export_service import generate_csv, generate_excel
+
+    rows = [TransactionRow(*values) for values in packed]
+    chunks = generate_excel(rows) if member_format == "xlsx" else generate_csv(rows)
+    return b"".join(chunks)
+
+
+def group_by_file(transactions: list[Transaction]) -> list[tuple[str, list[Transaction]]]:
+    """(source file, its transactions), in order of first appearance."""
+    groups: dict[str, list[Transaction]] = {}
+    for tx in transactions:
+        groups.setdefault(tx.source or "", []).append(tx)
+    return list(groups.items())
+
+
+def _member_names(files: list[str], member_format: str) -> list[str]:
+    """Archive names: the statement filename with the export extension, made unique."""
+    names: list[str] = []
+    taken = {SUMMARY_NAME}
+    for filename in files:
+        base = os.path.basename(filename.replace("\\", "/"))
+        stem = re.sub(r"[^\w.\- ()&]+", "_", os.path.splitext(base)[0]).strip(" .") or "transactions"
+        name = f"{stem}.{member_format}"
+        n = 2
+        while name in taken:
+            name = f"{stem} ({n}).{member_format}"
+            n += 1
+        taken.add(name)
+        names.append(name)
+    return names
+
+
+def _summary(groups: list[tuple[str, list[Transaction]]], names: list[str]) -> bytes:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["File", "Statement", "Transactions", "Spent", "Received", "First Date", "Last Date"])
+    all_spent = all_received = 0.0
+    count = 0
+    for name, (filename, txs) in zip(names, groups):
+        spent = sum(abs(tx.amount) for tx in txs if tx.type == "debit")
+        received = sum(abs(tx.amount) for tx in txs if tx.type == "credit")
+        dates = sorted(tx.date for tx in txs if tx.date)
+        writer.writerow([
+            name, filename, len(txs), f"{spent:.2f}", f"{received:.2f}",
+            dates[0] if dates else "", dates[-1] if dates else "",
+        ])
+        all_spent += spent
+        all_received += received
+        count += len(txs)
+    writer.writerow(["Total", "", count, f"{all_spent:.2f}", f"{all_received:.2f}", "", ""])
+    return output.getvalue().encode("utf-8")
+
+
+class _Sink:
+    """Write-only target for ZipFile; ZipFile uses data descriptors since it can't seek."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def generate_zip(transactions: list[Transaction], member_format: str = "csv") -> Iterator[bytes]:
+    """Stream a ZIP with one `member_format` file per statement and a summary.csv."""
+    groups = group_by_file(transactions)
+    names = _member_names([filename for filename, _ in groups], member_format)
+    # XLSX members are already deflate-compressed zips
+    compression = zipfile.ZIP_STORED if member_format == "xlsx" else zipfile.ZIP_DEFLATED
+    pool = _pool()
+    window = max(1, settings.export_zip_workers) * 2
+
+    def rendered() -> Iterator[bytes]:
+        if pool is None:
+            for _, txs in groups:
+                yield _render(member_format, _pack(txs))
+            return
+        pending: list[Future] = []
+        for _, txs in groups:
+            pending.append(pool.submit(_render, member_format, _pack(txs)))
+            if len(pending) >= window:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+    sink = _Sink()
+    now = datetime.now().timetuple()[:6]
+    with zipfile.ZipFile(sink, mode="w") as archive:
+        for name, content in zip(names, rendered()):
+            info = zipfile.ZipInfo(name, date_time=now)
+            info.compress_type = compression
+            archive.writestr(info, content)
+            yield sink.drain()
+        info = zipfile.ZipInfo(SUMMARY_NAME, date_time=now)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        archive.writestr(info, _summary(groups, names))
+    yield sink.drain()
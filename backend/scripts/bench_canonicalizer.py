@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark the merchant canonicalizer on synthetic statement descriptions
+(POS prefixes, store numbers, processor prefixes, city/province suffixes,
+reference codes) and report throughput and how many raw variants collapse
+into each merchant.
+
+Usage (from backend/):
+  python -m scripts.bench_canonicalizer --descriptions 300000
+"""
+
+import argparse
+import random
+import time
+
+from app.services.merchant_canonicalizer import canonical_merchant
+from app.services.mock_service import MOCK_MERCHANTS
+
+PREFIXES = ["", "", "POS PURCHASE ", "VISA DEBIT ", "PRE-AUTH ", "IDP PURCHASE ", "SQ *", "TST* "]
+LOCATIONS = ["", "TORONTO ON", "MONTREAL QC", "VANCOUVER BC", "NORTH YORK ON", "CALGARY AB"]
+
+
+def build(n: int, seed: int = 11) -> list[str]:
+    rng = random.Random(seed)
+    merchants = [m for entries in MOCK_MERCHANTS.values() for m, _, _ in entries]
+    descriptions = []
+    for _ in range(n):
+        merchant = rng.choice(merchants)
+        store = rng.choice(["", f"#{rng.randint(1, 9999)}", f"{rng.randint(100, 99999)}", f"W{rng.randint(100, 9999)}"])
+        ref = f"*{rng.randint(10**7, 10**8):X}" if rng.random() < 0.1 else ""
+        descriptions.append(" ".join(p for p in (
+            rng.choice(PREFIXES) + merchant + ref, store, rng.choice(LOCATIONS),
+        ) if p))
+    return descriptions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--descriptions", type=int, default=300_000)
+    args = parser.parse_args()
+
+    descriptions = build(args.descriptions)
+    raw = canonical_merchant.__wrapped__
+
+    t0 = time.perf_counter()
+    for d in descriptions:
+        raw(d)
+    t_uncached = time.perf_counter() - t0
+
+    canonical_merchant.cache_clear()
+    t0 = time.perf_counter()
+    keys = [canonical_merchant(d) for d in descriptions]
+    t_cached = time.perf_counter() - t0
+
+    distinct_raw = len(set(descriptions))
+    distinct_keys = len(set(keys))
+    n = len(descriptions)
+    print(f"{n} descriptions ({distinct_raw} distinct) → {distinct_keys} canonical merchants")
+    print(f"  uncached : {n / t_uncached:>12,.0f} /s")
+    print(f"  memoised : {n / t_cached:>12,.0f} /s  (cache {canonical_merchant.cache_info().hits} hits)")
+    for d in descriptions[:8]:
+        print(f"    {d!r:55} → {canonical_merchant(d)!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark server-side decoding of export / apply-rules payloads: the original
+list-of-objects JSON body (json.loads + pydantic validation, as FastAPI does
+it) against the columnar body as JSON and, if msgpack is installed, as
+MessagePack — each decoded into rows the exporters and rule engine take.
+Reports best-of-N CPU time per 10k rows.
+
+Usage (from backend/):
+  python -m scripts.bench_columnar_payload --rows 10000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from app.models.transaction import ExportRequest, TransactionRow
+from app.services.export_service import generate_csv
+
+try:
+    import msgpack  # type: ignore[import-not-found]
+except ImportError:
+    msgpack = None
+
+FIELDS = TransactionRow.__slots__
+
+
+def make_rows(n: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    merchants = ["TIM HORTONS #1234 TORONTO ON", "AMAZON.CA MKTP", "SHELL C12345", "PAYROLL ACME CORP"]
+    rows = []
+    for i in range(n):
+        credit = rng.random() < 0.2
+        rows.append({
+            "date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "posting_date": None,
+            "description": f"{rng.choice(merchants)} {i}",
+            "amount": round(rng.uniform(1, 2500), 2) * (1 if credit else -1),
+            "type": "credit" if credit else "debit",
+            "balance": round(rng.uniform(0, 20000), 2) if i % 4 else None,
+            "category": "Other",
+            "category_source": "ai",
+            "source": f"statement_{i % 30}.pdf",
+        })
+    return rows
+
+
+def best_ms(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        best = min(best, time.process_time() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    columns = {field: [r[field] for r in rows] for field in FIELDS}
+    object_body = json.dumps({"transactions": rows}).encode()
+    columnar_body = json.dumps({"columns": columns}).encode()
+
+    def objects():
+        return ExportRequest.model_validate(json.loads(object_body)).transactions
+
+    def columnar_json():
+        return ExportRequest.model_validate_json(columnar_body).columns.rows()
+
+    cases = [("objects (JSON)", objects, len(object_body)), ("columnar JSON", columnar_json, len(columnar_body))]
+    if msgpack is not None:
+        packed_body = msgpack.packb({"columns": columns})
+
+        def columnar_msgpack():
+            return ExportRequest.model_validate(msgpack.unpackb(packed_body, raw=False)).columns.rows()
+
+        cases.append(("columnar msgpack", columnar_msgpack, len(packed_body)))
+    else:
+        print("msgpack not installed — skipping the MessagePack case")
+
+    # Same decoded data either way
+    reference = b"".join(generate_csv(objects()))
+    scale = 10000 / args.rows
+    print(f"{args.rows} rows; CPU ms per 10k rows (best of {args.repeat})")
+    for label, fn, size in cases:
+        assert b"".join(generate_csv(fn())) == reference, label
+        print(f"{label:>17}: {best_ms(fn, args.repeat) * scale:7.1f} ms   body {size / 1e6:5.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compact tabular LLM response format against per-object JSON.
+
+Offline (always): serializes N synthetic transactions in both formats and
+reports size, approximate output tokens (~4 chars/token) and decode time.
+
+Live (optional): with ANTHROPIC_API_KEY set and --text pointing at extracted
+statement text, sends the real prompt in both formats and reports measured
+output tokens and latency.
+
+Usage (from backend/):
+  python -m scripts.bench_compact_output --rows 400
+  python -m scripts.bench_compact_output --text statement.txt
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from app.models.transaction import Transaction
+from app.services.compact_output import COMPACT_COLUMNS, category_names_from_block, decode_compact_rows
+from app.services.llm_service import PARSE_PROMPT_TEMPLATE, _build_category_block, _output_contract
+from app.services.mock_service import MOCK_MERCHANTS
+
+
+def _synthetic(n: int) -> list[dict]:
+    rows = []
+    balance = 5000.0
+    for i in range(n):
+        category = random.choice(list(MOCK_MERCHANTS))
+        merchant, lo, hi = random.choice(MOCK_MERCHANTS[category])
+        amount = round(random.uniform(lo, hi), 2)
+        balance = round(balance - amount, 2)
+        rows.append({
+            "date": f"2025-01-{i % 28 + 1:02d}",
+            "posting_date": None,
+            "description": merchant,
+            "amount": amount,
+            "type": "debit",
+            "balance": balance,
+            "category": category,
+        })
+    return rows
+
+
+def offline(n: int) -> None:
+    rows = _synthetic(n)
+    names = category_names_from_block(_build_category_block(None))
+    verbose = json.dumps(rows, indent=2)
+    compact = json.dumps(
+        [COMPACT_COLUMNS]
+        + [[r["date"], r["posting_date"], r["description"], r["amount"], "d", r["balance"],
+            names.index(r["category"])] for r in rows],
+        separators=(",", ":"),
+    )
+
+    t0 = time.perf_counter()
+    [Transaction(**t) for t in json.loads(verbose)]
+    t_verbose = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    decode_compact_rows(json.loads(compact), names)
+    t_compact = time.perf_counter() - t0
+
+    print(f"{n} rows")
+    print(f"  object JSON : {len(verbose):>8} chars  ~{len(verbose) // 4:>6} tokens  decode {t_verbose * 1000:.1f} ms")
+    print(f"  compact rows: {len(compact):>8} chars  ~{len(compact) // 4:>6} tokens  decode {t_compact * 1000:.1f} ms")
+    print(f"  reduction   : {1 - len(compact) / len(verbose):.1%}")
+
+
+async def live(text: str) -> None:
+    import anthropic
+
+    from app.config import settings
+
+    client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
+    for compact in (False, True):
+        category_spec, format_rules, decode = _output_contract(None, compact=compact, categorize=True)
+        prompt = PARSE_PROMPT_TEMPLATE.format(
+            category_spec=category_spec, format_rules=format_rules, text=text[:100000],
+        )
+        t0 = time.perf_counter()
+        message = await client.messages.create(
+            model=settings.llm_fast_model,
+            max_tokens=settings.llm_max_tokens,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        elapsed = time.perf_counter() - t0
+        label = "compact rows" if compact else "object JSON "
+        print(f"  {label}: {message.usage.output_tokens:>6} output tokens  {elapsed:.1f}s  stop={message.stop_reason}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=400)
+    parser.add_argument("--text", help="Extracted statement text for a live API comparison")
+    args = parser.parse_args()
+
+    offline(args.rows)
+    if args.text and os.environ.get("ANTHROPIC_API_KEY"):
+        with open(args.text) as f:
+            asyncio.run(live(f.read()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark the indexed rule-conflict check against the original scan (full
+Levenshtein matrix against every rule in the group), and check both agree on
+whether a new pattern gets a duplicate / overlap / similarity warning.
+
+Usage (from backend/):
+  python -m scripts.bench_conflict_checks --rules 2000 --checks 2000
+"""
+
+import argparse
+import random
+import string
+import time
+import uuid
+
+from app.services.conflict_index import RuleConflictIndex, RuleRef
+from app.services.mock_service import MOCK_MERCHANTS
+
+
+def legacy_levenshtein(a: str, b: str) -> int:
+    if len(a) < len(b):
+        return legacy_levenshtein(b, a)
+    if len(b) == 0:
+        return len(a)
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a):
+        curr = [i + 1]
+        for j, cb in enumerate(b):
+            curr.append(min(prev[j + 1] + 1, curr[j] + 1, prev[j] + (ca != cb)))
+        prev = curr
+    return prev[-1]
+
+
+def legacy_check(pattern: str, category_id: uuid.UUID, rules: list[RuleRef]) -> str | None:
+    """The original check for a "contains" rule: 'duplicate', 'overlap', 'similar' or None."""
+    lower = pattern.strip().lower()
+    for rule in rules:
+        existing_lower = rule.pattern.lower()
+        if rule.category_id == category_id and lower == existing_lower:
+            return "duplicate"
+        if lower in existing_lower or existing_lower in lower:
+            return "overlap"
+        if legacy_levenshtein(lower, existing_lower) <= 2:
+            return "similar"
+    return None
+
+
+def indexed_check(pattern: str, category_id: uuid.UUID, index: RuleConflictIndex) -> str | None:
+    if index.duplicate(pattern, category_id, "contains"):
+        return "duplicate"
+    conflict = index.conflict(pattern, "contains")
+    return conflict[0] if conflict else None
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+
+
+def _mutate(rng: random.Random, text: str) -> str:
+    chars = list(text)
+    for _ in range(rng.randint(1, 3)):
+        i = rng.randrange(len(chars))
+        chars[i] = rng.choice(string.ascii_lowercase)
+    return "".join(chars)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=2000)
+    parser.add_argument("--categories", type=int, default=40)
+    parser.add_argument("--checks", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    category_ids = [uuid.uuid4() for _ in range(args.categories)]
+    merchants = [m.lower() for entries in MOCK_MERCHANTS.values() for m, _, _ in entries]
+    rules = []
+    for _ in range(args.rules):
+        pattern = f"{_word(rng)} {_word(rng)}" if rng.random() < 0.8 else rng.choice(merchants)
+        rules.append(RuleRef(uuid.uuid4(), pattern, "contains", rng.choice(category_ids), "Category"))
+
+    t0 = time.perf_counter()
+    index = RuleConflictIndex()
+    for rule in rules:
+        index.add(rule)
+    t_build = time.perf_counter() - t0
+
+    # Half fresh patterns, half near-duplicates / sub-/super-strings of existing rules
+    checks = []
+    for _ in range(args.checks):
+        base = rng.choice(rules).pattern
+        pattern = rng.choice([
+            f"{_word(rng)} {_word(rng)}", f"{_word(rng)} {_word(rng)}",
+            _mutate(rng, base), base.split()[0], f"{base} {_word(rng)}", base,
+        ])
+        checks.append((pattern, rng.choice(category_ids)))
+
+    t0 = time.perf_counter()
+    legacy = [legacy_check(p, c, rules) for p, c in checks]
+    t_legacy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    indexed = [indexed_check(p, c, index) for p, c in checks]
+    t_indexed = time.perf_counter() - t0
+
+    disagree = sum(1 for a, b in zip(legacy, indexed) if (a is None) != (b is None))
+    warned = sum(1 for r in indexed if r)
+
+    print(f"{args.rules} rules, {args.checks} checks ({warned} warned)")
+    print(f"  legacy scan : {t_legacy * 1000 / args.checks:8.3f} ms/check")
+    print(f"  indexed     : {t_indexed * 1000 / args.checks:8.3f} ms/check  (+{t_build * 1000:.1f} ms build)")
+    print(f"  speedup     : {t_legacy / max(t_indexed, 1e-9):8.1f}x")
+    print(f"  disagree    : {disagree}  (warning vs no warning)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark the char-n-gram nearest-neighbour categorizer: index build time,
+lookup latency, and accuracy on noisy variants (typos, store numbers, POS
+prefixes) of the indexed merchants.
+
+Usage (from backend/):
+  python -m scripts.bench_ngram_categorizer --merchants 20000 --queries 10000
+"""
+
+import argparse
+import random
+import string
+import time
+
+from app.services.merchant_canonicalizer import merchant_key
+from app.services.ngram_categorizer import _seed_index
+
+CATEGORIES = [f"Category {i}" for i in range(30)]
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+
+
+def _noisy(rng: random.Random, merchant: str) -> str:
+    chars = list(merchant)
+    if len(chars) > 6 and rng.random() < 0.5:
+        del chars[rng.randrange(len(chars))]  # dropped letter
+    prefix = rng.choice(["", "POS PURCHASE ", "VISA DEBIT "])
+    return f"{prefix}{''.join(chars).upper()} #{rng.randint(1, 9999)} TORONTO ON"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--merchants", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    labelled = {f"{_word(rng)} {_word(rng)}": rng.choice(CATEGORIES) for _ in range(args.merchants)}
+
+    t0 = time.perf_counter()
+    index = _seed_index()
+    for merchant, label in labelled.items():
+        index.add(merchant, label)
+    t_train = time.perf_counter() - t0
+
+    items = list(labelled.items())
+    queries = [(merchant_key(_noisy(rng, m)), label) for m, label in rng.choices(items, k=args.queries)]
+    unknown = [merchant_key(f"{_word(rng)} {_word(rng)} #12") for _ in range(args.queries // 5)]
+
+    t0 = time.perf_counter()
+    results = [index.nearest(q) for q, _ in queries]
+    t_query = time.perf_counter() - t0
+    false_hits = sum(1 for q in unknown if (hit := index.nearest(q)) and hit[1] >= args.threshold)
+
+    assigned = [(hit, label) for hit, (_, label) in zip(results, queries) if hit and hit[1] >= args.threshold]
+    correct = sum(1 for hit, label in assigned if hit[0] == label)
+
+    print(f"{len(index)} indexed texts, {args.queries} noisy queries, threshold {args.threshold}")
+    print(f"  train      : {t_train * 1000:8.1f} ms")
+    print(f"  lookup     : {t_query * 1e6 / args.queries:8.1f} µs/query ({t_query * 1000:.1f} ms total)")
+    print(f"  coverage   : {len(assigned) / args.queries:8.1%}  (assigned above threshold)")
+    print(f"  precision  : {correct / max(len(assigned), 1):8.1%}")
+    print(f"  unknown    : {false_hits / max(len(unknown), 1):8.1%}  (unseen merchants wrongly assigned)")
+
+
+if __name__ == "__main__":
+    main()
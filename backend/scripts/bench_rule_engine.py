@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiled (Aho-Corasick) rule engine against the original
+per-transaction loop over every category and rule, and check both produce
+identical categories.
+
+Usage (from backend/):
+  python -m scripts.bench_rule_engine --rules 500 --transactions 5000
+"""
+
+import argparse
+import random
+import string
+import time
+from types import SimpleNamespace
+
+from app.models.transaction import Transaction
+from app.services.mock_service import MOCK_MERCHANTS
+from app.services.rule_engine import apply_rules, compile_rules
+
+
+def legacy_apply_rules(transactions, categories):
+    """The original O(transactions × categories × rules) implementation."""
+    sorted_cats = sorted(categories, key=lambda c: c.sort_order)
+    for tx in transactions:
+        desc_lower = tx.description.lower()
+        for cat in sorted_cats:
+            if not cat.rules:
+                continue
+            if any(r.pattern.lower() in desc_lower for r in cat.rules if r.rule_type == "exclude"):
+                continue
+            if any(r.pattern.lower() in desc_lower for r in cat.rules if r.rule_type == "include"):
+                tx.category = cat.name
+                tx.category_source = "rule"
+                break
+    return transactions
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_uppercase, k=rng.randint(3, 9)))
+
+
+def build(n_rules: int, n_categories: int, n_tx: int, seed: int = 7):
+    rng = random.Random(seed)
+    merchants = [m for entries in MOCK_MERCHANTS.values() for m, _, _ in entries]
+    merchants += [f"{_word(rng)} {_word(rng)}" for _ in range(n_rules)]
+
+    categories = [
+        SimpleNamespace(name=f"Category {i}", sort_order=rng.randint(0, n_categories), rules=[])
+        for i in range(n_categories)
+    ]
+    for _ in range(n_rules):
+        merchant = rng.choice(merchants)
+        words = merchant.split()
+        pattern = rng.choice(words) if rng.random() < 0.5 else merchant
+        rule_type = "exclude" if rng.random() < 0.15 else "include"
+        rng.choice(categories).rules.append(SimpleNamespace(
+            rule_type=rule_type, pattern=pattern, match_type="contains",
+            min_amount=None, max_amount=None, tx_type=None,
+        ))
+
+    descriptions = [
+        f"POS PURCHASE {rng.choice(merchants)} #{rng.randint(100, 9999)} TORONTO ON"
+        for _ in range(n_tx)
+    ]
+    return categories, descriptions
+
+
+def _txs(descriptions):
+    return [Transaction(date="2025-01-01", description=d, amount=1.0, type="debit") for d in descriptions]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=500)
+    parser.add_argument("--categories", type=int, default=40)
+    parser.add_argument("--transactions", type=int, default=5000)
+    args = parser.parse_args()
+
+    categories, descriptions = build(args.rules, args.categories, args.transactions)
+
+    legacy_txs = _txs(descriptions)
+    t0 = time.perf_counter()
+    legacy_apply_rules(legacy_txs, categories)
+    t_legacy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    compiled = compile_rules(categories)
+    t_compile = time.perf_counter() - t0
+
+    new_txs = _txs(descriptions)
+    t0 = time.perf_counter()
+    apply_rules(new_txs, compiled)
+    t_new = time.perf_counter() - t0
+
+    mismatches = sum(1 for a, b in zip(legacy_txs, new_txs) if a.category != b.category)
+    matched = sum(1 for t in new_txs if t.category_source == "rule")
+
+    print(f"{args.rules} rules / {args.categories} categories / {args.transactions} transactions ({matched} matched)")
+    print(f"  legacy loop : {t_legacy * 1000:8.1f} ms")
+    print(f"  compiled    : {t_new * 1000:8.1f} ms  (+{t_compile * 1000:.1f} ms compile)")
+    print(f"  speedup     : {t_legacy / max(t_new, 1e-9):8.1f}x")
+    print(f"  mismatches  : {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark the streaming ZIP export (one file per statement + summary.csv)
+with members rendered in the request thread vs. a worker process pool, and
+check the archive: every member present, CRCs valid, CSV members identical to
+a plain CSV export of the same statement.
+
+Usage (from backend/):
+  python -m scripts.bench_zip_export --statements 30 --rows 800 --workers 0 2 4
+"""
+
+import argparse
+import io
+import time
+import zipfile
+
+from app.config import settings
+from app.services import zip_export
+from app.services.export_service import generate_csv
+from scripts.bench_xlsx_export import make_transactions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--statements", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=800, help="transactions per statement")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--formats", nargs="+", default=["csv", "xlsx"])
+    args = parser.parse_args()
+
+    txs = make_transactions(args.statements * args.rows)
+    for i, tx in enumerate(txs):
+        tx.source = f"statement_{i % args.statements:02d}.pdf"
+    groups = dict(zip_export.group_by_file(txs))
+    print(f"{args.statements} statements x {args.rows} transactions")
+
+    for member_format in args.formats:
+        for workers in args.workers:
+            settings.export_zip_workers = workers
+            zip_export.shutdown()
+            if workers:
+                b"".join(zip_export.generate_zip(txs[:workers], member_format))  # start the pool
+            start = time.perf_counter()
+            first_chunk_at = None
+            chunks = []
+            for chunk in zip_export.generate_zip(txs, member_format):
+                if first_chunk_at is None and chunk:
+                    first_chunk_at = time.perf_counter() - start
+                chunks.append(chunk)
+            elapsed = time.perf_counter() - start
+
+            archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+            assert archive.testzip() is None
+            assert len(archive.namelist()) == args.statements + 1
+            if member_format == "csv":
+                assert archive.read("statement_03.csv") == b"".join(generate_csv(groups["statement_03.pdf"]))
+            print(
+                f"{member_format:>4}, {workers} workers: {elapsed * 1000:7.0f} ms total, "
+                f"first bytes after {first_chunk_at * 1000:6.0f} ms"
+            )
+    zip_export.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+from app.services.categorization_service import CATEGORY_KEYWORDS, KeywordCategorizer
+
+# Keywords that overlap: prefixes, suffixes, substrings of each other, and the
+# same keyword under two categories
+OVERLAPPING = {
+    "Dining": ["tim hortons", "uber eats", "eats"],
+    "Transportation": ["uber", "shell", "hell"],
+    "Coffee": ["tim", "hortons", "tim hortons"],
+    "Utilities": ["hell", "hydro"],
+    "Empty": [],
+}
+
+
+def _reference(keywords: dict[str, list[str]], description: str) -> str | None:
+    """The per-keyword loop the automaton replaced: first category with any keyword hit."""
+    lowered = description.lower()
+    for category, words in keywords.items():
+        if any(word and word.lower() in lowered for word in words):
+            return category
+    return None
+
+
+def _descriptions(keywords: dict[str, list[str]], seed: int, count: int = 500) -> list[str]:
+    """Random descriptions stitched from keywords (often several, mixed case) and filler."""
+    rng = random.Random(seed)
+    words = [w for ws in keywords.values() for w in ws] + ["payment", "store 12", "#4411", "\x00"]
+    descriptions = []
+    for _ in range(count):
+        parts = [rng.choice(words) for _ in range(rng.randint(0, 4))]
+        parts = [p.upper() if rng.random() < 0.5 else p for p in parts]
+        descriptions.append(rng.choice(["", " ", "x"]).join(parts))
+    return descriptions
+
+
+@pytest.mark.parametrize("keywords", [OVERLAPPING, CATEGORY_KEYWORDS], ids=["overlapping", "builtin"])
+def test_batch_matches_per_keyword_loop(keywords):
+    categorizer = KeywordCategorizer(keywords)
+    descriptions = _descriptions(keywords, seed=len(keywords))
+    assert categorizer.categorize_many(descriptions) == [_reference(keywords, d) for d in descriptions]
+
+
+@pytest.mark.parametrize("description, expected", [
+    ("TIM HORTONS #1234", "Dining"),      # two categories hit; the earlier one wins
+    ("UBER EATS TORONTO", "Dining"),      # longer keyword in an earlier category
+    ("UBER TRIP", "Transportation"),
+    ("SHELL STATION", "Transportation"),  # "hell" inside "shell" also hits Utilities
+    ("TORONTO HYDRO", "Utilities"),
+    ("HORTONS", "Coffee"),
+    ("PAYROLL", None),
+])
+def test_lowest_ranked_category_wins(description, expected):
+    assert KeywordCategorizer(OVERLAPPING).categorize(description) == expected
+    assert _reference(OVERLAPPING, description) == expected
+
+
+def test_matches_never_span_two_descriptions_of_a_batch():
+    categorizer = KeywordCategorizer(OVERLAPPING)
+    assert categorizer.categorize_many(["PAY TIM", "HORTONS X", "SHE", "LL"]) == [
+        "Coffee", "Coffee", None, None,
+    ]
@@ -0,0 +1,87 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.config import settings
+from app.models.transaction import Transaction
+from app.services import categorization_stage, llm_service, merchant_memory
+
+
+def _tx(description: str, category_source: str = "ai") -> Transaction:
+    return Transaction(
+        date="2024-01-01", description=description, amount=10.0, type="debit",
+        category="Other", category_source=category_source,
+    )
+
+
+@pytest.fixture
+def local_only(monkeypatch):
+    monkeypatch.setattr(settings, "mock_mode", False)
+    monkeypatch.setattr(settings, "merchant_memory_enabled", False)
+    monkeypatch.setattr(settings, "ngram_categorizer_enabled", False)
+    monkeypatch.setattr(settings, "local_categorizer_enabled", True)
+
+
+class _Session:
+    """Records the order of commits relative to the model call."""
+
+    def __init__(self, events: list[str]):
+        self.events = events
+
+    async def commit(self):
+        self.events.append("commit")
+
+    async def rollback(self):
+        self.events.append("rollback")
+
+
+def test_extraction_prompt_leaves_categories_to_the_batch_stage(monkeypatch):
+    assert llm_service._output_contract(None)[0] != ""
+    monkeypatch.setattr(settings, "llm_two_stage_categorization", True)
+    assert llm_service._output_contract(None)[0] == ""
+
+
+def test_only_rows_no_local_resolver_knows_reach_the_llm(local_only, monkeypatch):
+    sent: list[list[str]] = []
+
+    async def categorize_descriptions(descriptions, custom_categories=None):
+        sent.append(descriptions)
+        return ["Business Expense"] * len(descriptions)
+
+    monkeypatch.setattr(categorization_stage, "categorize_descriptions", categorize_descriptions)
+    rows = [
+        _tx("LOBLAWS #1234 TORONTO ON"),
+        _tx("NETFLIX.COM"),
+        _tx("XYZZY HOLDINGS 44"),
+        _tx("XYZZY HOLDINGS 45"),
+        _tx("ACME PAYROLL", category_source="rule"),
+    ]
+    asyncio.run(categorization_stage.categorize_batch(_Session([]), uuid.uuid4(), rows))
+
+    assert sent == [["XYZZY HOLDINGS"]]
+    assert [tx.category for tx in rows[:4]] == ["Groceries", "Subscriptions", "Business Expense", "Business Expense"]
+    assert rows[4].category == "Other"
+
+
+def test_recall_bookkeeping_waits_until_after_the_llm(local_only, monkeypatch):
+    events: list[str] = []
+    monkeypatch.setattr(settings, "merchant_memory_enabled", True)
+
+    async def lookup(session, org_id, transactions, allowed=None):
+        events.append("lookup")
+        return merchant_memory.RecallResult(lookups=1)
+
+    async def record_recall(session, org_id, found):
+        events.append("record_recall")
+
+    async def categorize_descriptions(descriptions, custom_categories=None):
+        events.append("llm")
+        return ["Business Expense"] * len(descriptions)
+
+    monkeypatch.setattr(merchant_memory, "lookup", lookup)
+    monkeypatch.setattr(merchant_memory, "record_recall", record_recall)
+    monkeypatch.setattr(categorization_stage, "categorize_descriptions", categorize_descriptions)
+    asyncio.run(categorization_stage.categorize_batch(_Session(events), uuid.uuid4(), [_tx("XYZZY HOLDINGS 44")]))
+
+    assert events == ["lookup", "commit", "llm", "record_recall"]
@@ -0,0 +1,52 @@
+import asyncio
+
+from app.services import llm_service
+from app.services.compact_output import category_names_from_block, decode_compact_rows, index_category_block
+
+CATEGORIES = [
+    {"name": "Groceries", "description": "supermarkets\nand corner stores"},
+    {"name": "Dining", "description": "restaurants"},
+    {"name": "Fuel"},
+]
+
+
+def test_wrapped_category_description_keeps_indices_aligned():
+    block = llm_service._build_category_block(CATEGORIES)
+    names = category_names_from_block(block)
+    indexed = index_category_block(block).splitlines()
+
+    assert names == ["Groceries", "Dining", "Fuel", "Other"]
+    assert len(indexed) == len(names)
+    for i, name in enumerate(names):
+        assert indexed[i].strip().startswith(f'{i}. "{name}"')
+    assert "supermarkets and corner stores" in indexed[0]
+
+    rows = [["2024-01-01", None, "SHELL", 40.0, "d", None, 2]]
+    assert decode_compact_rows(rows, names)[0].category == "Fuel"
+
+
+class _Message:
+    def __init__(self, text: str):
+        self.content = [type("Block", (), {"text": text})()]
+        self.stop_reason = "end_turn"
+
+
+def test_categories_are_keyed_by_description_number(monkeypatch):
+    prompts: list[str] = []
+    replies = iter([
+        # fast model skips description 1; strong model answers the rest
+        '{"0": 0, "2": 1}',
+        '{"1": 2}',
+    ])
+
+    async def create(client, model, content, prefill=None):
+        prompts.append(content)
+        return _Message(next(replies))
+
+    monkeypatch.setattr(llm_service, "_create_message", create)
+    descriptions = ["LOBLAWS", "SHELL\nSTATION 12", "TIM HORTONS"]
+    result = asyncio.run(llm_service._categorize_with_claude(descriptions, CATEGORIES))
+
+    assert result == ["Groceries", "Fuel", "Dining"]
+    assert len(prompts) == 2
+    assert "1. SHELL STATION 12\n2. TIM HORTONS" in prompts[0]
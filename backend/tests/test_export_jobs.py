@@ -0,0 +1,79 @@
+import asyncio
+import os
+import time
+import uuid
+
+import pytest
+
+from app.config import settings
+from app.models.transaction import Transaction
+from app.routers.export import _job_out
+from app.services import export_jobs
+
+ORG = uuid.uuid4()
+TRANSACTIONS = [
+    Transaction(date="2024-01-03", description="TIM HORTONS #8901", amount=4.25, type="debit"),
+    Transaction(date="2024-01-04", description="PAYROLL", amount=1200.0, type="credit"),
+]
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "export_cache_dir", str(tmp_path))
+    return tmp_path
+
+
+def test_key_covers_org_format_options_and_rows():
+    key = export_jobs.job_key(ORG, "csv", "csv", False, TRANSACTIONS)
+    assert key == export_jobs.job_key(ORG, "csv", "csv", False, [tx.model_copy() for tx in TRANSACTIONS])
+    # Options a format doesn't use don't split its cache
+    assert key == export_jobs.job_key(ORG, "csv", "xlsx", True, TRANSACTIONS)
+
+    different = [
+        export_jobs.job_key(uuid.uuid4(), "csv", "csv", False, TRANSACTIONS),
+        export_jobs.job_key(ORG, "xlsx", "csv", False, TRANSACTIONS),
+        export_jobs.job_key(ORG, "xlsx", "csv", True, TRANSACTIONS),
+        export_jobs.job_key(ORG, "zip", "xlsx", False, TRANSACTIONS),
+        export_jobs.job_key(ORG, "csv", "csv", False, TRANSACTIONS[:1]),
+        export_jobs.job_key(ORG, "csv", "csv", False, [TRANSACTIONS[0].model_copy(update={"category": "Dining"})]),
+    ]
+    assert len({key, *different}) == len(different) + 1
+
+
+def test_cached_job_is_downloaded_under_each_requesters_filename():
+    async def run():
+        first = export_jobs.start(ORG, "csv", "csv", False, TRANSACTIONS)
+        await asyncio.gather(*export_jobs._tasks)
+        second = export_jobs.start(ORG, "csv", "csv", False, TRANSACTIONS)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert second.job_id == first.job_id and second.status == export_jobs.READY
+    assert _job_out(first, "january").filename == "january.csv"
+    out = _job_out(second, "q1 report")
+    assert out.filename == "q1 report.csv"
+    assert out.download_url.endswith("/download?filename=q1+report")
+
+
+def _write(cache_dir, name: str, size: int, age: float) -> None:
+    path = cache_dir / name
+    path.write_bytes(b"x" * size)
+    os.utime(path, (time.time() - age, time.time() - age))
+
+
+def test_eviction_removes_every_file_of_a_job(cache_dir, monkeypatch):
+    monkeypatch.setattr(settings, "export_cache_max_bytes", 150)
+    for key, age in (("old", 300), ("new", 100), ("kept", 0)):
+        _write(cache_dir, f"{key}.json", 10, age)
+        _write(cache_dir, f"{key}.bin", 60, age)
+    _write(cache_dir, "failed.json", 10, 2 * export_jobs._RENDER_TIMEOUT_SECONDS)
+    _write(cache_dir, "failed.err", 10, 2 * export_jobs._RENDER_TIMEOUT_SECONDS)
+    _write(cache_dir, "dead.json", 10, 2 * export_jobs._RENDER_TIMEOUT_SECONDS)
+    _write(cache_dir, "dead.1f2e.tmp", 50, 2 * export_jobs._RENDER_TIMEOUT_SECONDS)
+    _write(cache_dir, "running.json", 10, 60)
+
+    export_jobs.evict(keep="kept")
+
+    assert sorted(p.name for p in cache_dir.iterdir()) == [
+        "kept.bin", "kept.json", "new.bin", "new.json", "running.json",
+    ]
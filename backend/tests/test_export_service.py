@@ -0,0 +1,30 @@
+import io
+
+from openpyxl import load_workbook
+
+from app.models.transaction import Transaction
+from app.services.export_service import generate_excel
+from app.services.zip_export import _pack, _render
+
+TRANSACTIONS = [
+    Transaction(date="2024-01-03", description="TIM HORTONS #8901", amount=4.25, type="debit", balance=95.75),
+    Transaction(date="2024-01-04", description="PAYROLL", amount=1200.0, type="credit"),
+]
+
+
+def _sheets(data: bytes) -> list[str]:
+    return load_workbook(io.BytesIO(data), read_only=True).sheetnames
+
+
+def test_xlsx_export_has_only_the_transactions_sheet_by_default():
+    assert _sheets(b"".join(generate_excel(TRANSACTIONS))) == ["Transactions"]
+    # ZIP members render through the same default
+    assert _sheets(_render("xlsx", _pack(TRANSACTIONS))) == ["Transactions"]
+
+
+def test_merchant_sheet_is_opt_in():
+    data = b"".join(generate_excel(TRANSACTIONS, merchant_sheet=True))
+    assert _sheets(data) == ["Transactions", "By Merchant"]
+    rows = list(load_workbook(io.BytesIO(data), read_only=True)["By Merchant"].values)
+    assert rows[0] == ("Merchant", "Transactions", "Spent", "Received")
+    assert ("TIM HORTONS", 1, 4.25, None) in rows
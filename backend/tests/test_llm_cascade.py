@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.models.transaction import Transaction
+from app.services import llm_service
+from app.services.text_compaction import PAGE_BREAK
+
+FAST = settings.llm_fast_model
+STRONG = settings.llm_strong_model
+
+
+def _page(day: int, rows: int = 3) -> str:
+    lines = ["Date  Description  Amount  Balance"]
+    lines += [f"2024-01-{day:02d}  COFFEE {n}  4.50  {100 - n:.2f}" for n in range(rows)]
+    return "\n".join(lines)
+
+
+def _transactions(day: int, rows: int = 3) -> list[Transaction]:
+    return [
+        Transaction(date=f"2024-01-{day:02d}", description=f"COFFEE {n}", amount=4.50, type="debit", category="Dining")
+        for n in range(rows)
+    ]
+
+
+@pytest.fixture
+def cascade(monkeypatch):
+    monkeypatch.setattr(settings, "mock_mode", False)
+    monkeypatch.setattr(settings, "llm_cascade_enabled", True)
+    monkeypatch.setattr(settings, "llm_text_window_pages", 1)
+    monkeypatch.setattr(settings, "llm_max_concurrency", 2)
+
+
+def test_failing_stage_escalates_to_strong_model(cascade):
+    calls = []
+
+    async def call(model):
+        calls.append(model)
+        return [] if model == FAST else _transactions(1)
+
+    result = asyncio.run(llm_service._run_cascade(call, "test", source_text=_page(1)))
+    assert calls == [FAST, STRONG]
+    assert len(result) == 3
+
+
+def test_valid_stage_output_is_not_escalated(cascade):
+    calls = []
+
+    async def call(model):
+        calls.append(model)
+        return _transactions(1)
+
+    asyncio.run(llm_service._run_cascade(call, "test", source_text=_page(1)))
+    assert calls == [FAST]
+
+
+def test_text_cascade_escalates_only_the_failing_window(cascade, monkeypatch):
+    calls: list[tuple[str, int]] = []
+
+    async def request(client, model, prompt, decode):
+        day = 2 if "2024-01-02" in prompt else 1
+        calls.append((model, day))
+        # The fast model misses every row of the second page
+        return [] if (model, day) == (FAST, 2) else _transactions(day)
+
+    monkeypatch.setattr(llm_service, "_request_transactions", request)
+    text = PAGE_BREAK.join([_page(1), _page(2)])
+    result = asyncio.run(llm_service.parse_transactions(text, "statement.pdf"))
+
+    assert sorted(calls) == [(FAST, 1), (FAST, 2), (STRONG, 2)]
+    assert [tx.date for tx in result] == ["2024-01-01"] * 3 + ["2024-01-02"] * 3
+
+
+def test_later_windows_carry_the_statement_header(cascade, monkeypatch):
+    prompts: list[str] = []
+
+    async def request(client, model, prompt, decode):
+        prompts.append(prompt)
+        return _transactions(1)
+
+    monkeypatch.setattr(llm_service, "_request_transactions", request)
+    second_page = "\n".join(_page(2).splitlines()[1:])  # header line deduped away by compaction
+    asyncio.run(llm_service.parse_transactions(PAGE_BREAK.join([_page(1), second_page]), "statement.pdf"))
+
+    second = next(p for p in prompts if "2024-01-02" in p)
+    assert "Date  Description  Amount  Balance" in second
+    assert "2024-01-01" not in second
+
+
+def test_vision_pages_run_concurrently_within_the_limit(cascade, monkeypatch):
+    in_flight = 0
+    peak = 0
+
+    async def request(client, model, content, decode):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return _transactions(content[0])
+
+    monkeypatch.setattr(llm_service, "_request_transactions", request)
+    monkeypatch.setattr(llm_service, "_vision_content", lambda paths, prompt: [int(p) for p in paths])
+    result = asyncio.run(llm_service.parse_transactions_from_images(["1", "2", "3", "4", "5"], "scan.pdf"))
+
+    assert peak == settings.llm_max_concurrency
+    assert [tx.date[-2:] for tx in result[::3]] == ["01", "02", "03", "04", "05"]
+
+
+class _Message:
+    def __init__(self, text: str, stop_reason: str):
+        self.content = [type("Block", (), {"text": text})()]
+        self.stop_reason = stop_reason
+
+
+class _Client:
+    """Replays canned responses and records each request's assistant prefill."""
+
+    def __init__(self, responses: list[_Message]):
+        self.responses = responses
+        self.prefills: list[str | None] = []
+        self.messages = self
+
+    async def create(self, model, max_tokens, messages):
+        self.prefills.append(messages[1]["content"] if len(messages) > 1 else None)
+        return self.responses.pop(0)
+
+
+def _decode(data: list) -> list[Transaction]:
+    return [Transaction(**t) for t in data]
+
+
+ROW_1 = '{"date": "2024-01-01", "description": "A", "amount": 1.0, "type": "debit"}'
+ROW_2 = '{"date": "2024-01-02", "description": "B", "amount": 2.0, "type": "debit"}'
+
+
+def test_truncated_output_continues_from_last_complete_transaction():
+    client = _Client([
+        _Message(f'[{ROW_1}, {{"date": "2024-01-0', "max_tokens"),
+        _Message(f", {ROW_2}]", "end_turn"),
+    ])
+    result = asyncio.run(llm_service._request_transactions(client, FAST, "prompt", _decode))
+
+    assert client.prefills == [None, f"[{ROW_1}"]
+    assert [tx.description for tx in result] == ["A", "B"]
+
+
+def test_truncation_keeps_complete_transactions_when_continuations_run_out(monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_continuations", 1)
+    client = _Client([
+        _Message(f'[{ROW_1}, {{"date"', "max_tokens"),
+        _Message(f', {ROW_2}, {{"da', "max_tokens"),
+    ])
+    result = asyncio.run(llm_service._request_transactions(client, FAST, "prompt", _decode))
+
+    assert [tx.description for tx in result] == ["A", "B"]
@@ -0,0 +1,49 @@
+import asyncio
+import uuid
+
+from app.models.transaction import Transaction
+from app.services import merchant_memory
+from app.services.merchant_canonicalizer import is_generic_merchant, merchant_key
+
+
+def _tx(description: str, category: str, source: str) -> Transaction:
+    return Transaction(
+        date="2024-01-01", description=description, amount=20.0, type="debit",
+        category=category, category_source=source,
+    )
+
+
+class _Session:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+
+
+def test_generic_transfer_keys_are_detected():
+    assert is_generic_merchant(merchant_key("INTERAC E-TRF 6666"))
+    assert is_generic_merchant(merchant_key("TRANSFER TO ACCT 1234"))
+    assert not is_generic_merchant(merchant_key("INTERAC E-TRF 5555 JOHN SMITH"))
+    assert not is_generic_merchant(merchant_key("BILL PAYMENT ROGERS"))
+
+
+def test_generic_transfer_keys_are_not_learned():
+    session = _Session()
+    written = asyncio.run(merchant_memory.learn(session, uuid.uuid4(), [
+        _tx("INTERAC E-TRF 6666", "Rent & Mortgage", "manual"),
+        _tx("INTERAC E-TRF 7777", "Dining", "manual"),
+        _tx("LOBLAWS #1234", "Groceries", "manual"),
+    ]))
+
+    assert written == 1
+    params = session.statements[0].compile().params
+    assert "loblaws" in params.values()
+    assert "interac e-trf" not in params.values()
+
+
+def test_generic_transfer_keys_are_not_recalled():
+    rows = [_tx("INTERAC E-TRF 6666", "Other", "ai")]
+    # Nothing to look up, so the database is never queried
+    assert asyncio.run(merchant_memory.recall(None, uuid.uuid4(), rows)) == 0
+    assert rows[0].category == "Other"
@@ -0,0 +1,20 @@
+import math
+
+from app.services.ngram_categorizer import _FEATURE_BUCKETS, NgramIndex, vectorize
+
+
+def test_features_are_hashed_into_a_fixed_space():
+    vector = vectorize("tim hortons")
+    assert all(isinstance(f, int) and 0 <= f < _FEATURE_BUCKETS for f in vector)
+    assert math.isclose(sum(w * w for w in vector.values()), 1.0)
+    assert vectorize("tim hortons") == vector
+
+
+def test_nearest_finds_a_noisy_variant():
+    index = NgramIndex()
+    index.add("tim hortons", "Dining")
+    index.add("loblaws", "Groceries")
+
+    label, score = index.nearest("tim horton")
+    assert label == "Dining" and score > 0.8
+    assert index.nearest("tim horton", allowed={"Groceries"}) is None
@@ -0,0 +1,37 @@
+from app.routers.upload import _relevant_pages
+from app.services.page_classifier import find_skippable_pages, page_score
+
+COVER_LETTER = "\n".join([
+    "Dear Customer,",
+    "Your statement for January 2024 is enclosed.",
+    "Questions? Call 1-800-555-0100.",
+])
+DISCLOSURE = "Deposits are insured up to applicable limits. Interest rates are subject to change."
+TRANSACTIONS = "\n".join([
+    "Date      Description            Amount     Balance",
+    "Jan 03    COFFEE SHOP              4.50      100.00",
+])
+TABLE = "Date | Description | Amount\n | SERVICE FEE | 12.00"
+
+
+def test_page_score_counts_dated_amount_lines_and_table_rows():
+    assert page_score(COVER_LETTER) == 0
+    assert page_score(DISCLOSURE) == 0
+    assert page_score(TRANSACTIONS) == 1
+    assert page_score(TABLE) == 1
+
+
+def test_pages_without_transactions_are_skipped():
+    assert find_skippable_pages([COVER_LETTER, TRANSACTIONS, TABLE, DISCLOSURE, ""]) == [0, 3, 4]
+
+
+def test_a_document_with_no_transaction_like_page_is_kept_whole():
+    assert find_skippable_pages([COVER_LETTER, DISCLOSURE]) == []
+
+
+def test_skipped_pages_are_recorded_by_original_page_number():
+    # OCR pages 1, 3, 4 of a scan whose page 2 was blank
+    skipped = [1]
+    kept = _relevant_pages([COVER_LETTER, TRANSACTIONS, DISCLOSURE], [0, 2, 3], skipped)
+    assert kept == [TRANSACTIONS]
+    assert sorted(skipped) == [0, 1, 3]
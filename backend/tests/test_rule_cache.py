@@ -0,0 +1,53 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import rule_cache
+
+USER = uuid.uuid4()
+
+
+class _Session:
+    """Serves a fixed group row to get_group's query."""
+
+    def __init__(self, group):
+        self.group = group
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        return SimpleNamespace(scalar_one_or_none=lambda: self.group)
+
+
+def _group(group_id: uuid.UUID, version: int):
+    return SimpleNamespace(id=group_id, user_id=USER, version=version, is_active=False, categories=[])
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    rule_cache.clear()
+    rule_cache._notified.clear()
+
+
+def test_load_finishing_after_a_newer_notify_is_not_cached():
+    group_id = uuid.uuid4()
+    # The request read version 1; version 2 committed and was announced before it finished
+    rule_cache._on_notify(None, 0, rule_cache.NOTIFY_CHANNEL, f"{group_id}:{USER}:2")
+    stale = _Session(_group(group_id, 1))
+    assert asyncio.run(rule_cache.get_group(stale, USER, group_id)).version == 1
+    assert group_id not in rule_cache._groups
+
+    fresh = _Session(_group(group_id, 2))
+    assert asyncio.run(rule_cache.get_group(fresh, USER, group_id)).version == 2
+    assert asyncio.run(rule_cache.get_group(fresh, USER, group_id)).version == 2
+    assert fresh.queries == 1
+
+
+def test_older_notify_does_not_lower_the_bound():
+    group_id = uuid.uuid4()
+    rule_cache.invalidate(group_id, USER, 5)
+    rule_cache.invalidate(group_id, USER, 3)
+    asyncio.run(rule_cache.get_group(_Session(_group(group_id, 4)), USER, group_id))
+    assert group_id not in rule_cache._groups
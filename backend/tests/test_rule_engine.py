@@ -0,0 +1,78 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.transaction import Transaction
+from app.services.rule_engine import apply_rules, compile_rules, validate_rule
+
+
+@pytest.mark.parametrize("pattern", [
+    r"(\w+\s?)+$",
+    r"(a|aa)+$",
+    r"(.*a){12}",
+    r"(a+)+",
+    r"(?:x*y)*",
+    r"((ab?)c)+",
+    r"((a|b)c){2,}",
+    r"(a)\1",
+    r"(?=tim)",
+])
+def test_catastrophic_regexes_are_rejected(pattern):
+    with pytest.raises(ValueError):
+        validate_rule("regex", pattern)
+
+
+@pytest.mark.parametrize("pattern", [
+    r"^tim hortons #\d+",
+    r"(?:uber|lyft) trip",
+    r"amzn mktp (ca|us)\b",
+    r"\d{4}",
+    r"[a-z]{2,} payroll",
+    r"(ab){3}",
+    r"(inc\.?)? deposit",
+    r"[(+*)]+ fee",
+])
+def test_ordinary_regexes_are_accepted(pattern):
+    validate_rule("regex", pattern)
+
+
+def _rule(match_type: str, pattern: str):
+    return SimpleNamespace(
+        id=pattern, rule_type="include", pattern=pattern, match_type=match_type,
+        min_amount=None, max_amount=None, tx_type=None,
+    )
+
+
+def test_stored_catastrophic_pattern_evaluates_in_linear_time():
+    # Rules saved before the validator tightened still compile; RE2 keeps them fast
+    rules = compile_rules([SimpleNamespace(name="Slow", sort_order=0, rules=[
+        _rule("regex", r"(\w+\s?)+$"),
+        _rule("wildcard", "*a*a*a*a*a*a*a*a*b"),
+    ])])
+    tx = Transaction(date="2024-01-01", description="a" * 50 + "!", amount=1.0, type="debit")
+
+    start = time.perf_counter()
+    apply_rules([tx], rules)
+    assert time.perf_counter() - start < 1.0
+    assert tx.category_source != "rule"
+
+
+def test_regex_and_wildcard_rules_still_match_case_insensitively():
+    rules = compile_rules([SimpleNamespace(name="Coffee", sort_order=0, rules=[
+        _rule("regex", r"tim hortons #\d+"),
+        _rule("wildcard", "STARBUCKS*"),
+    ])])
+    assert rules.match("POS TIM HORTONS #8901") == "Coffee"
+    assert rules.match("starbucks\nstore 12") == "Coffee"
+    assert rules.match("TIM HORTONS") is None
+
+
+def test_literal_free_wildcard_matches_past_the_regex_cap():
+    rules = compile_rules([SimpleNamespace(name="Long", sort_order=0, rules=[
+        _rule("regex", r"^never$"),
+        # At least 600 characters: can't match the 512-character prefix the regexes see
+        _rule("wildcard", "?" * 600 + "*"),
+    ])])
+    assert rules.match("x" * 700) == "Long"
+    assert rules.match("x" * 599) is None
@@ -0,0 +1,103 @@
+from app.services.text_compaction import collapse_whitespace, compact_pages
+
+HEADER = [
+    "FIRST NATIONAL BANK                               Business Chequing",
+    "Account 00123-4567890",
+    "Date      Description                    Withdrawals      Deposits        Balance",
+]
+FOOTER = [
+    "",
+    "Member of the Deposit Insurance Corporation. Questions? Call 1-800-555-0100.",
+]
+
+
+def _page(rows: list[str]) -> str:
+    return "\n".join(HEADER + rows + FOOTER)
+
+
+PAGE_1 = _page([
+    "Jan 03    TRANSFER TO ACCT 1234              250.00                       1,750.00",
+    "          REF 88213",
+    "Jan 05    PAYROLL DEPOSIT                                  2,400.00       4,150.00",
+])
+PAGE_2 = _page([
+    "Jan 09    TRANSFER TO ACCT 1234              100.00                       4,050.00",
+    "          TRANSFER TO ACCT 1234",
+    "Jan 12    INTERAC E-TRF 5555                  40.00                       4,010.00",
+    "          INTERAC E-TRF 6666",
+    "          REF 88213",
+])
+
+
+def _lines(text: str) -> list[str]:
+    return [" ".join(line.split()) for line in text.splitlines()]
+
+
+def test_transaction_and_continuation_lines_survive():
+    result = compact_pages([PAGE_1, PAGE_2])
+    lines = _lines(result.text)
+
+    for page in (PAGE_1, PAGE_2):
+        for line in page.splitlines()[len(HEADER):-len(FOOTER)]:
+            assert " ".join(line.split()) in lines
+    # Continuation lines that repeat other text, even verbatim, are kept
+    assert lines.count("TRANSFER TO ACCT 1234") == 1
+    assert lines.count("INTERAC E-TRF 6666") == 1
+    assert lines.count("REF 88213") == 2
+
+
+def test_repeated_header_and_footer_lines_are_dropped_after_first_page():
+    result = compact_pages([PAGE_1, PAGE_2])
+    lines = _lines(result.text)
+
+    assert lines.count("FIRST NATIONAL BANK Business Chequing") == 1
+    assert lines.count("Date Description Withdrawals Deposits Balance") == 1
+    assert lines.count("Account 00123-4567890") == 1
+    assert sum("Deposit Insurance" in line for line in lines) == 1
+    assert result.dropped_lines == 4
+
+
+def test_lines_that_differ_only_in_digits_are_not_repeats():
+    pages = [
+        "Page 1 of 2\nStatement 1\n" + "Jan 03  COFFEE  4.50  100.00",
+        "Page 2 of 2\nStatement 2\n" + "Jan 04  COFFEE  3.50  96.50",
+    ]
+    lines = _lines(compact_pages(pages).text)
+    assert "Statement 1" in lines and "Statement 2" in lines
+    assert "Page 1 of 2" in lines and "Page 2 of 2" in lines
+
+
+def test_collapse_whitespace_keeps_column_alignment():
+    text = "\n".join([
+        "    Date      Description            Withdrawals        Deposits          Balance",
+        "    Jan 03    COFFEE                        4.50                          100.00",
+        "    Jan 05    REFUND                                       12.00          112.00",
+    ])
+    collapsed = collapse_whitespace(text).splitlines()
+
+    assert len(collapsed[0]) < len(text.splitlines()[0])
+    # Each amount still ends in the same column as its header
+    assert collapsed[1].index("4.50") + 4 == collapsed[0].index("Withdrawals") + len("Withdrawals")
+    assert collapsed[2].index("12.00") + 5 == collapsed[0].index("Deposits") + len("Deposits")
+    assert collapsed[1].rindex("100.00") == collapsed[2].rindex("112.00")
+
+
+def test_free_text_copy_of_a_table_row_is_removed():
+    page = "\n".join([
+        "Jan 03 | COFFEE SHOP | 4.50 | | 100.00",
+        "Jan 03 | COFFEE SHOP | 4.50 | | 95.50",
+        "Jan 04 | PAYROLL | | 1,200.00 | 1,295.50",
+        "Opening balance 104.50",
+        "Jan 03 COFFEE SHOP 4.50 100.00",
+        "Jan 03 COFFEE SHOP 4.50 95.50",
+        "Jan 04 PAYROLL 1,200.00 1,295.50",
+        "Jan 04 PAYROLL 1,200.00 1,295.50",
+        "COFFEE SHOP",
+    ])
+    result = compact_pages([page])
+    lines = result.text.splitlines()
+
+    assert lines[:4] == page.splitlines()[:4]
+    # One copy per table row; the unmatched extra copy and the balance line stay
+    assert lines[4:] == ["Jan 04 PAYROLL 1,200.00 1,295.50"]
+    assert result.dropped_lines == 4
@@ -0,0 +1,95 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, event, text
+
+from app.services import usage_counters
+
+UPLOAD = dict(documents=1, actual_pages=0, text_pages=0, image_pages=0, transactions=0, bytes_processed=0)
+
+
+class _Session:
+    """Runs statements on a SQLite connection (UUIDs bound as text) and records them."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.statements: list[str] = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        params = {k: str(v) if isinstance(v, uuid.UUID) else v for k, v in (params or {}).items()}
+        return self.conn.execute(statement, params)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def _functions(dbapi_conn, _):
+        dbapi_conn.create_function("LEAST", -1, min)
+        dbapi_conn.create_function("GREATEST", -1, max)
+
+    columns = ", ".join(
+        f"{name} TEXT" if name == "plan" else f"{name} INTEGER{'' if name == 'page_limit' else ' NOT NULL DEFAULT 0'}"
+        for name in usage_counters._USAGE_COLUMNS
+    )
+    with engine.connect() as conn:
+        conn.execute(text(f"CREATE TABLE organizations (id TEXT PRIMARY KEY, {columns})"))
+        yield _Session(conn)
+
+
+def _org(session, **values) -> uuid.UUID:
+    org_id = uuid.uuid4()
+    values = {"plan": "free", **values}
+    session.conn.execute(
+        text(f"INSERT INTO organizations (id, {', '.join(values)}) VALUES (:id, :{', :'.join(values)})"),
+        {"id": str(org_id), **values},
+    )
+    return org_id
+
+
+def _upload(session, org_id, pages):
+    return asyncio.run(usage_counters.record_upload(session, org_id, pages=pages, **UPLOAD))
+
+
+def test_each_upload_is_one_relative_update_returning_the_new_counters(session):
+    org_id = _org(session, total_pages=7, month_pages=7)
+
+    _upload(session, org_id, 3)
+    usage = _upload(session, org_id, 4)
+
+    assert len(session.statements) == 2
+    assert all(s.startswith("UPDATE organizations SET") for s in session.statements)
+    assert "total_pages = total_pages + :pages" in session.statements[0]
+    assert (usage.total_uploads, usage.total_pages, usage.month_pages, usage.month_documents) == (2, 14, 14, 2)
+
+
+@pytest.mark.parametrize("month_pages, bonus_pages, pages, bonus_left", [
+    (90, 50, 5, 50),   # still under the limit
+    (90, 50, 30, 30),  # crosses it: only the 20 pages over come out of the bonus
+    (120, 50, 10, 40), # already over: every page does
+    (90, 5, 30, 0),    # never below zero
+])
+def test_bonus_covers_only_pages_over_the_limit(session, month_pages, bonus_pages, pages, bonus_left):
+    org_id = _org(session, month_pages=month_pages, page_limit=100, bonus_pages=bonus_pages)
+    assert _upload(session, org_id, pages).bonus_pages == bonus_left
+
+
+def test_unlimited_plan_keeps_its_bonus(session):
+    org_id = _org(session, month_pages=500, bonus_pages=50)
+    assert _upload(session, org_id, 30).bonus_pages == 50
+
+
+def test_missing_org_returns_none(session):
+    assert _upload(session, uuid.uuid4(), 1) is None
+
+
+def test_export_increments_both_counters(session):
+    org_id = _org(session, total_exports=4, month_exports=1)
+    asyncio.run(usage_counters.record_export(session, org_id))
+    row = session.conn.execute(
+        text("SELECT total_exports, month_exports FROM organizations WHERE id = :id"), {"id": str(org_id)},
+    ).one()
+    assert tuple(row) == (5, 2)
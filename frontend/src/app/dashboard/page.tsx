@@ -54,7 +54,7 @@ export default function Home() {
     newCategory: string;
     categoryId: string;
     oldCategory: string;
-    categorySource: "ai" | "rule" | "manual" | undefined;
+    categorySource: "ai" | "rule" | "manual" | "memory" | "similar" | undefined;
   } | null>(null);
 
   const activeGroup = categoryGroups.find((g) => g.id === activeGroupId);
@@ -293,7 +293,7 @@ export default function Home() {
     handleFieldChange(stmtIndex, txIndex, "category_source", "manual");
 
     // Suggest auto-rule if category was changed and we have an active group
-    if (tx && activeGroup && newCategory !== oldCategory && (source === "ai" || source === "rule")) {
+    if (tx && activeGroup && newCategory !== oldCategory && (source === "ai" || source === "rule" || source === "memory" || source === "similar")) {
       const targetCat = activeGroup.categories.find(
         (c) => c.name === newCategory
       );
@@ -9,7 +9,7 @@ interface AutoRuleToastProps {
   newCategory: string;
   categoryId: string;
   oldCategory: string;
-  categorySource: "ai" | "rule" | "manual" | undefined;
+  categorySource: "ai" | "rule" | "manual" | "memory" | "similar" | undefined;
   onCreated: () => void;
   onDismiss: () => void;
 }
@@ -251,7 +251,7 @@ export function TransactionTable({ transactions, categories, onCategoryChange, o
         header: "Source",
         cell: (info) => {
           const src = info.getValue() || "ai";
-          const label = src === "ai" ? "AI" : src === "rule" ? "Rule" : "Manual";
+          const label = src === "ai" ? "AI" : src === "rule" ? "Rule" : src === "memory" ? "Memory" : src === "similar" ? "Similar" : "Manual";
           return <span className="text-xs text-gray-500">{label}</span>;
         },
       }),
@@ -1,5 +1,5 @@
 import { getSession, signOut } from "next-auth/react";
-import { UploadResponse, ExportRequest, CategoryConfig, UsageStats, BillingStatus, CategoryGroup, SimilarityWarning, Transaction } from "./types";
+import { UploadResponse, ExportRequest, CategoryConfig, UsageStats, BillingStatus, CategoryGroup, SimilarityWarning, Transaction, BulkCategory, BulkImportResult, GroupRuleStats, StoredStatement, ExportJob, TransactionColumns, TransactionPage } from "./types";
 
 async function getAuthHeaders(): Promise<Record<string, string>> {
   const session = await getSession();
@@ -9,6 +9,20 @@ async function getAuthHeaders(): Promise<Record<string, string>> {
   return {};
 }
 
+function toColumns(transactions: Transaction[]): TransactionColumns {
+  return {
+    date: transactions.map((t) => t.date),
+    posting_date: transactions.map((t) => t.posting_date),
+    description: transactions.map((t) => t.description),
+    amount: transactions.map((t) => t.amount),
+    type: transactions.map((t) => t.type),
+    balance: transactions.map((t) => t.balance),
+    category: transactions.map((t) => t.category),
+    category_source: transactions.map((t) => t.category_source ?? "ai"),
+    source: transactions.map((t) => t.source ?? null),
+  };
+}
+
 async function handleResponse(response: Response, fallbackMsg: string): Promise<Response> {
   if (response.status === 401) {
     await signOut({ callbackUrl: "/sign-in" });
@@ -152,28 +166,103 @@ export async function cancelSubscription(): Promise<void> {
 
 export async function exportTransactions(request: ExportRequest): Promise<void> {
   const authHeaders = await getAuthHeaders();
+  const { transactions, ...rest } = request;
 
   const response = await fetch("/api/v1/export", {
     method: "POST",
     headers: { "Content-Type": "application/json", ...authHeaders },
-    body: JSON.stringify(request),
+    body: JSON.stringify(transactions ? { ...rest, columns: toColumns(transactions) } : rest),
   });
 
   await handleResponse(response, "Export failed");
 
-  const blob = await response.blob();
+  const extension = { csv: "csv", quickbooks: "csv", xlsx: "xlsx", parquet: "parquet", arrow: "arrow", zip: "zip" }[request.format];
+  saveBlob(await response.blob(), `${request.filename}${request.format === "quickbooks" ? "_quickbooks" : ""}.${extension}`);
+}
+
+function saveBlob(blob: Blob, filename: string) {
   const url = URL.createObjectURL(blob);
   const a = document.createElement("a");
   a.href = url;
-  a.download = `${request.filename}${request.format === "quickbooks" ? "_quickbooks" : ""}.${request.format === "xlsx" ? "xlsx" : "csv"}`;
+  a.download = filename;
   document.body.appendChild(a);
   a.click();
   document.body.removeChild(a);
   URL.revokeObjectURL(url);
 }
 
+export async function createExportJob(request: ExportRequest): Promise<ExportJob> {
+  const authHeaders = await getAuthHeaders();
+  const { transactions, ...rest } = request;
+  const response = await fetch("/api/v1/export/jobs", {
+    method: "POST",
+    headers: { "Content-Type": "application/json", ...authHeaders },
+    body: JSON.stringify(transactions ? { ...rest, columns: toColumns(transactions) } : rest),
+  });
+  await handleResponse(response, "Export failed");
+  return response.json();
+}
+
+export async function fetchExportJob(jobId: string, filename = "transactions"): Promise<ExportJob> {
+  const authHeaders = await getAuthHeaders();
+  const params = new URLSearchParams({ filename });
+  const response = await fetch(`/api/v1/export/jobs/${jobId}?${params}`, {
+    headers: { ...authHeaders },
+  });
+  await handleResponse(response, "Failed to load export");
+  return response.json();
+}
+
+export async function downloadExportJob(job: ExportJob): Promise<void> {
+  const authHeaders = await getAuthHeaders();
+  const response = await fetch(job.download_url, {
+    headers: { ...authHeaders },
+  });
+  await handleResponse(response, "Download failed");
+  saveBlob(await response.blob(), job.filename);
+}
+
 // ── Category Groups API ───────────────────────────────────────────
 
+export async function fetchUploadStatements(uploadId: string): Promise<StoredStatement[]> {
+  const authHeaders = await getAuthHeaders();
+  const response = await fetch(`/api/v1/uploads/${uploadId}/statements`, {
+    headers: { ...authHeaders },
+  });
+  await handleResponse(response, "Failed to load statements");
+  return response.json();
+}
+
+export async function fetchUploadTransactions(
+  uploadId: string,
+  after = -1,
+  limit = 500,
+  statementId?: string
+): Promise<TransactionPage> {
+  const params = new URLSearchParams({ after: String(after), limit: String(limit) });
+  if (statementId) params.set("statement_id", statementId);
+  const authHeaders = await getAuthHeaders();
+  const response = await fetch(`/api/v1/uploads/${uploadId}/transactions?${params}`, {
+    headers: { ...authHeaders },
+  });
+  await handleResponse(response, "Failed to load transactions");
+  return response.json();
+}
+
+export async function updateUploadCategories(
+  uploadId: string,
+  updates: { seq: number; category: string }[]
+): Promise<{ updated: number }> {
+  const authHeaders = await getAuthHeaders();
+  const response = await fetch(`/api/v1/uploads/${uploadId}/transactions`, {
+    method: "PATCH",
+    headers: { "Content-Type": "application/json", ...authHeaders },
+    body: JSON.stringify({ updates }),
+  });
+  await handleResponse(response, "Failed to save categories");
+  return response.json();
+}
+
 export async function fetchCategoryGroups(): Promise<CategoryGroup[]> {
   const authHeaders = await getAuthHeaders();
   const response = await fetch("/api/v1/category-groups", {
@@ -291,16 +380,82 @@ export async function deleteRule(id: string): Promise<void> {
   await handleResponse(response, "Failed to delete rule");
 }
 
+export async function importCategories(
+  groupId: string,
+  categories: BulkCategory[]
+): Promise<BulkImportResult> {
+  const authHeaders = await getAuthHeaders();
+  const response = await fetch(`/api/v1/category-groups/${groupId}/import`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", ...authHeaders },
+    body: JSON.stringify({ categories }),
+  });
+  await handleResponse(response, "Failed to import categories");
+  return response.json();
+}
+
+export async function importCategoriesCsv(groupId: string, file: File): Promise<BulkImportResult> {
+  const formData = new FormData();
+  formData.append("file", file);
+  const authHeaders = await getAuthHeaders();
+  const response = await fetch(`/api/v1/category-groups/${groupId}/import-csv`, {
+    method: "POST",
+    headers: { ...authHeaders },
+    body: formData,
+  });
+  await handleResponse(response, "Failed to import rules CSV");
+  return response.json();
+}
+
 export async function applyRules(
   groupId: string,
-  transactions: Transaction[]
-): Promise<{ transactions: Transaction[]; rules_applied: number }> {
+  transactions: Transaction[],
+  uploadId?: string
+): Promise<{ transactions: Transaction[]; rules_applied: number; version: number | null }> {
   const authHeaders = await getAuthHeaders();
   const response = await fetch(`/api/v1/category-groups/${groupId}/apply-rules`, {
     method: "POST",
     headers: { "Content-Type": "application/json", ...authHeaders },
-    body: JSON.stringify({ transactions }),
+    // With an upload id the server applies rules to (and saves) its stored copy
+    body: JSON.stringify(uploadId ? { upload_id: uploadId } : { columns: toColumns(transactions) }),
   });
   await handleResponse(response, "Failed to apply rules");
+  const result = await response.json();
+  if (!result.categories) return result;
+  // Columnar requests get back just the per-row categories
+  const { category, category_source } = result.categories;
+  return {
+    transactions: transactions.map((t, i) => ({ ...t, category: category[i], category_source: category_source[i] })),
+    rules_applied: result.rules_applied,
+    version: result.version,
+  };
+}
+
+export async function applyRulesPatch(
+  groupId: string,
+  transactions: Transaction[],
+  sinceVersion: number
+): Promise<{
+  version: number;
+  full: boolean;
+  evaluated: number;
+  changes: { index: number; category: string; category_source: Transaction["category_source"] }[];
+}> {
+  const authHeaders = await getAuthHeaders();
+  const response = await fetch(`/api/v1/category-groups/${groupId}/apply-rules/patch`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", ...authHeaders },
+    body: JSON.stringify({ transactions, since_version: sinceVersion }),
+  });
+  await handleResponse(response, "Failed to apply rule changes");
+  return response.json();
+}
+
+export async function getRuleStats(groupId: string): Promise<GroupRuleStats> {
+  const authHeaders = await getAuthHeaders();
+  const response = await fetch(`/api/v1/category-groups/${groupId}/rules-stats`, {
+    headers: { ...authHeaders },
+  });
+  await handleResponse(response, "Failed to load rule stats");
   return response.json();
 }
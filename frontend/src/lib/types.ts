@@ -30,7 +30,7 @@ export interface Transaction {
   type: "debit" | "credit";
   balance: number | null;
   category: string;
-  category_source?: "ai" | "rule" | "manual";
+  category_source?: "ai" | "rule" | "manual" | "memory" | "similar";
   source?: string;
   sourceColor?: { bg: string; text: string; border: string; activeBg: string };
 }
@@ -39,6 +39,10 @@ export interface CategoryRule {
   id: string;
   rule_type: "include" | "exclude";
   pattern: string;
+  match_type?: "contains" | "wildcard" | "regex" | "merchant";
+  min_amount?: number | null;
+  max_amount?: number | null;
+  tx_type?: "debit" | "credit" | null;
   created_at: string;
 }
 
@@ -54,6 +58,7 @@ export interface CategoryGroup {
   id: string;
   name: string;
   is_active: boolean;
+  version: number;
   categories: CategoryItem[];
   created_at: string;
   updated_at: string;
@@ -65,6 +70,51 @@ export interface SimilarityWarning {
   conflicting_pattern?: string | null;
 }
 
+export interface RuleStats {
+  id: string;
+  category: string;
+  rule_type: "include" | "exclude";
+  pattern: string;
+  match_type: string;
+  hit_count: number;
+  last_hit_at: string | null;
+  created_at: string;
+}
+
+export interface GroupRuleStats {
+  group_id: string;
+  rule_count: number;
+  unused_rules: number;
+  evaluations: number;
+  transactions_evaluated: number;
+  avg_ms_per_evaluation: number;
+  max_ms: number;
+  rules: RuleStats[];
+}
+
+export interface BulkCategory {
+  name: string;
+  description?: string | null;
+  rules?: {
+    rule_type?: "include" | "exclude";
+    pattern: string;
+    match_type?: string;
+    min_amount?: number | null;
+    max_amount?: number | null;
+    tx_type?: "debit" | "credit" | null;
+  }[];
+}
+
+export interface BulkImportResult {
+  group: CategoryGroup;
+  categories_created: number;
+  categories_updated: number;
+  rules_created: number;
+  rules_updated: number;
+  rules_unchanged: number;
+  warnings: (SimilarityWarning & { category: string; pattern?: string | null })[];
+}
+
 export interface StatementResult {
   filename: string;
   transactions: Transaction[];
@@ -75,6 +125,8 @@ export interface StatementResult {
   actual_pages: number;
   processing_type?: "text" | "image" | "ocr" | "spreadsheet";
   ocr_confidence?: number | null;
+  prompt_tokens_saved?: number | null;
+  skipped_pages?: number[];
 }
 
 export interface UsageStats {
@@ -114,10 +166,60 @@ export interface UploadResponse {
   statements: StatementResult[];
   mock_mode: boolean;
   usage: UsageStats | null;
+  upload_id?: string | null;
+}
+
+export interface StoredStatement {
+  id: string;
+  filename: string;
+  transaction_count: number;
+  total_debits: number;
+  total_credits: number;
+  page_count: number;
+  actual_pages: number;
+  processing_type: string;
+}
+
+export interface StoredTransaction extends Transaction {
+  seq: number;
+}
+
+export interface TransactionPage {
+  transactions: StoredTransaction[];
+  next_after: number | null;
+}
+
+/** Transactions as parallel arrays — much cheaper for the server to decode than objects. */
+export interface TransactionColumns {
+  date: string[];
+  posting_date: (string | null)[];
+  description: string[];
+  amount: number[];
+  type: ("debit" | "credit")[];
+  balance: (number | null)[];
+  category: string[];
+  category_source: NonNullable<Transaction["category_source"]>[];
+  source: (string | null)[];
 }
 
 export interface ExportRequest {
-  transactions: Transaction[];
-  format: "csv" | "xlsx" | "quickbooks";
+  transactions?: Transaction[];
+  upload_id?: string;
+  format: "csv" | "xlsx" | "quickbooks" | "parquet" | "arrow" | "zip";
+  /** Per-statement file format inside a "zip" export. */
+  zip_member_format?: "csv" | "xlsx";
+  /** Add a "By Merchant" summary sheet to an "xlsx" export. */
+  merchant_sheet?: boolean;
   filename: string;
 }
+
+export interface ExportJob {
+  job_id: string;
+  status: "running" | "ready" | "failed";
+  format: ExportRequest["format"];
+  filename: string;
+  transaction_count: number;
+  size: number | null;
+  error: string | null;
+  download_url: string;
+}